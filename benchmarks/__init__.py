@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for flake8-pytest-mark. Run them with 'make bench' or 'python -m benchmarks.<name> --help'."""
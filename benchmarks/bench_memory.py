@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""Measure how the memory held by the checker grows with the number of files checked in a single process.
+
+Every corpus size is checked in a fresh subprocess with 'enforce_unique_value' enabled. Peak RSS, the peak and retained
+memory traced by tracemalloc and the allocation sites holding the retained memory are reported, along with the retained
+bytes per tracked unique value and per file. Growth that is superlinear in the number of files fails the benchmark.
+Requires Python 3.
+
+Examples:
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --sizes 1000 10000 --output memory.json
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import ast
+import gc
+import io
+import itertools
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from benchmarks import corpus, harness
+from flake8_pytest_mark import MarkChecker
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BENCHMARK = 'memory'
+TOP_SITES = 10
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def measure_worker(directory, files):
+    """Check the first files of a corpus and measure the memory retained afterwards. Runs in a dedicated process.
+
+    Args:
+        directory (str): The directory of the corpus.
+        files (int): The number of files to check.
+
+    Returns:
+        dict: The measurements.
+    """
+    harness.configure_checker(directory)
+    gc.collect()
+    tracemalloc.start(1)
+    before = tracemalloc.take_snapshot()
+
+    for path in itertools.islice(corpus.iter_corpus_files(directory), files):
+        with io.open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        for _ in MarkChecker(tree, path).run():
+            pass
+        del tree
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    tracked_values = sum(MarkChecker.context.unique_values.counts().values())
+    sites = ['{}:{} {:+d} B'.format(stat.traceback[0].filename, stat.traceback[0].lineno, stat.size_diff)
+             for stat in after.compare_to(before, 'lineno')[:TOP_SITES]]
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {'files': files, 'tracked_values': tracked_values, 'peak_rss_bytes': max_rss,
+            'traced_peak_bytes': traced_peak, 'retained_bytes': retained,
+            'bytes_per_value': float(retained) / tracked_values if tracked_values else 0.0,
+            'bytes_per_file': float(retained) / files if files else 0.0, 'top_sites': sites}
+
+
+def find_superlinear(results, sizes, tolerance):
+    """Find the corpus sizes where the retained memory grew faster than the number of files.
+
+    Args:
+        results (dict): The measurements keyed by 'files_<size>'.
+        sizes (list): The corpus sizes in increasing order.
+        tolerance (float): The relative excess growth tolerated. (0.25 is 25%)
+
+    Returns:
+        list: Descriptions of the superlinear steps.
+    """
+    flagged = []
+    for small, large in zip(sizes, sizes[1:]):
+        before = results['files_{}'.format(small)]['retained_bytes']
+        after = results['files_{}'.format(large)]['retained_bytes']
+        if before <= 0:
+            continue
+        growth = float(after) / before
+        expected = float(large) / small
+        if growth > expected * (1 + tolerance):
+            flagged.append('{} -> {} files: retained memory grew {:.1f}x for {:.1f}x the files'.format(
+                small, large, growth, expected))
+    return flagged
+
+
+def main(argv=None):
+    """Run the benchmark.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit status. (1 if memory grew superlinearly or regressed compared to '--compare')
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Numbers of files to check. (default: 1000 10000 100000)')
+    parser.add_argument('--tests', type=int, default=10, help='Test definitions per module. (default: 10)')
+    parser.add_argument('--decorators', type=int, default=2, help='Decorators per test definition. (default: 2)')
+    parser.add_argument('--duplicate', type=float, default=0.05, help='Fraction of duplicate values. (default: 0.05)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator. (default: 0)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Excess growth tolerated before memory growth is flagged as superlinear, also used by '
+                             '--compare. (default: 0.25)')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the results to the ones recorded in this file.')
+    parser.add_argument('--worker', nargs=2, metavar=('DIRECTORY', 'FILES'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure_worker(args.worker[0], int(args.worker[1]))))
+        return 0
+
+    sizes = sorted(set(args.sizes))
+    parameters = {'sizes': sizes, 'tests': args.tests, 'decorators': args.decorators, 'duplicate': args.duplicate,
+                  'seed': args.seed}
+    directory = tempfile.mkdtemp(prefix='flake8-pytest-mark-bench-')
+    results = {}
+    try:
+        # Smaller sizes check a prefix of the largest corpus.
+        generator = corpus.CorpusGenerator(tests=args.tests, decorators=args.decorators, duplicate=args.duplicate,
+                                           seed=args.seed)
+        corpus.write_corpus(directory, sizes[-1], generator)
+        for size in sizes:
+            out = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_memory',
+                                           '--worker', directory, str(size)])
+            results['files_{}'.format(size)] = json.loads(out.decode('utf-8'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    row = '{:>10} {:>10} {:>14} {:>14} {:>14} {:>10} {:>10}'
+    print(row.format('files', 'values', 'peak rss', 'traced peak', 'retained', 'B/value', 'B/file'))
+    for size in sizes:
+        r = results['files_{}'.format(size)]
+        print(row.format(size, r['tracked_values'], r['peak_rss_bytes'], r['traced_peak_bytes'], r['retained_bytes'],
+                         '{:.1f}'.format(r['bytes_per_value']), '{:.1f}'.format(r['bytes_per_file'])))
+    print('\nallocation sites retaining the most memory after {} files:'.format(sizes[-1]))
+    for site in results['files_{}'.format(sizes[-1])]['top_sites']:
+        print('    {}'.format(site))
+
+    status = 0
+    superlinear = find_superlinear(results, sizes, args.tolerance)
+    for message in superlinear:
+        print('SUPERLINEAR {}'.format(message))
+        status = 1
+    if args.output:
+        harness.write_results(args.output, BENCHMARK, parameters, results)
+    if args.compare:
+        if harness.compare_results(args.compare, BENCHMARK, parameters, results, 'bytes_per_file', args.tolerance,
+                                   higher_is_better=False):
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
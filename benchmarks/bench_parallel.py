@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""Measure how flake8 with the plugin scales with '--jobs' and check that the violations do not depend on it.
+
+The corpus is checked once per job count. Wall time, speedup and efficiency relative to a single job are reported and
+the violations of every job count are compared to the ones of a single job. Any difference fails the benchmark.
+
+Examples:
+    python -m benchmarks.bench_parallel
+    python -m benchmarks.bench_parallel --jobs 1 2 4 --files 500 --output parallel.json
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import shutil
+import sys
+import tempfile
+from benchmarks import corpus, harness
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BENCHMARK = 'parallel'
+MAX_EXAMPLES = 5
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def violation_set(lines):
+    """Reduce flake8 output to the set of violations reported by the plugin.
+
+    Args:
+        lines (list): The output lines of flake8.
+
+    Returns:
+        frozenset: The violation lines with an M3xx to M9xx code.
+    """
+    violations = set()
+    for line in lines:
+        parts = line.split(': ', 1)
+        if len(parts) == 2 and parts[1][:2] in ('M3', 'M4', 'M5', 'M6', 'M7', 'M8', 'M9'):
+            violations.add(line)
+    return frozenset(violations)
+
+
+def measure(directory, jobs, repeat):
+    """Check a corpus at every job count.
+
+    Args:
+        directory (str): The directory of the corpus.
+        jobs (list): The job counts in increasing order, starting with 1.
+        repeat (int): Runs per job count, the fastest is kept.
+
+    Returns:
+        tuple: (dict('results'), dict('violation sets by job count'))
+    """
+    results = {}
+    violations = {}
+    for count in jobs:
+        seconds, lines = harness.best_of(repeat, harness.run_flake8, directory, jobs=count)
+        violations[count] = violation_set(lines)
+        results['jobs_{}'.format(count)] = {'jobs': count, 'seconds': seconds,
+                                            'violations': len(violations[count])}
+
+    serial = results['jobs_1']['seconds']
+    for result in results.values():
+        result['speedup'] = serial / result['seconds']
+        result['efficiency'] = result['speedup'] / result['jobs']
+    return results, violations
+
+
+def find_differences(violations):
+    """Compare the violations of every job count to the ones of a single job.
+
+    Args:
+        violations (dict): { int('jobs'): frozenset('violations') }
+
+    Returns:
+        list: Descriptions of the differences.
+    """
+    differences = []
+    expected = violations[1]
+    for count in sorted(violations):
+        missing = sorted(expected - violations[count])
+        extra = sorted(violations[count] - expected)
+        if missing or extra:
+            differences.append('--jobs {}: {} violations missing and {} unexpected compared to --jobs 1'.format(
+                count, len(missing), len(extra)))
+            differences.extend('    missing    {}'.format(line) for line in missing[:MAX_EXAMPLES])
+            differences.extend('    unexpected {}'.format(line) for line in extra[:MAX_EXAMPLES])
+    return differences
+
+
+def main(argv=None):
+    """Run the benchmark.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit status. (1 if the violations depend on the job count or regressed compared to '--compare')
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='Job counts to run. 1 is always included. (default: 1 2 4 8 16 32)')
+    parser.add_argument('--files', type=int, default=2000, help='Test modules in the corpus. (default: 2000)')
+    parser.add_argument('--tests', type=int, default=10, help='Test definitions per module. (default: 10)')
+    parser.add_argument('--invalid', type=float, default=0.05, help='Fraction of invalid values. (default: 0.05)')
+    parser.add_argument('--duplicate', type=float, default=0.05, help='Fraction of duplicate values. (default: 0.05)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator. (default: 0)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per job count, the best is kept. (default: 1)')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the wall times to the ones recorded in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Slowdown tolerated by --compare before failing. (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    jobs = sorted(set(args.jobs) | {1})
+    parameters = {'jobs': jobs, 'files': args.files, 'tests': args.tests, 'invalid': args.invalid,
+                  'duplicate': args.duplicate, 'seed': args.seed}
+    directory = tempfile.mkdtemp(prefix='flake8-pytest-mark-bench-')
+    try:
+        generator = corpus.CorpusGenerator(tests=args.tests, invalid=args.invalid, duplicate=args.duplicate,
+                                           seed=args.seed)
+        corpus.write_corpus(directory, args.files, generator)
+        results, violations = measure(directory, jobs, args.repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    row = '{:>6} {:>10} {:>9} {:>11} {:>11}'
+    print(row.format('jobs', 'seconds', 'speedup', 'efficiency', 'violations'))
+    for count in jobs:
+        r = results['jobs_{}'.format(count)]
+        print(row.format(count, '{:.3f}'.format(r['seconds']), '{:.2f}x'.format(r['speedup']),
+                         '{:.1%}'.format(r['efficiency']), r['violations']))
+
+    status = 0
+    differences = find_differences(violations)
+    if differences:
+        print('\nFAILED: the violations reported depend on --jobs')
+        for line in differences:
+            print(line)
+        status = 1
+    if args.output:
+        harness.write_results(args.output, BENCHMARK, parameters, results)
+    if args.compare:
+        if harness.compare_results(args.compare, BENCHMARK, parameters, results, 'seconds', args.tolerance,
+                                   higher_is_better=False):
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""Measure the startup cost of the plugin: importing it, registering and parsing its options and a short flake8 run.
+
+Every measurement is taken in a fresh interpreter, the median over the runs is kept.
+
+Examples:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --marks 100 --output startup.json
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks import harness
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BENCHMARK = 'startup'
+# Run in a fresh interpreter with the corpus directory as working directory, prints the durations as JSON.
+PROBE = """
+import json, sys, time
+from flake8.main import options as flake8_options
+from flake8.options import aggregator, config, manager
+start = time.time()
+import flake8_pytest_mark
+imported = time.time()
+option_manager = manager.OptionManager(prog='flake8', version='0')
+flake8_options.register_default_options(option_manager)
+registered = time.time()
+flake8_pytest_mark.MarkChecker.add_options(option_manager)
+added = time.time()
+argv = ['--config', 'setup.cfg', '--select', 'M']
+options, _ = aggregator.aggregate_options(option_manager, config.ConfigFileFinder('flake8', argv, []), argv)
+aggregated = time.time()
+flake8_pytest_mark.MarkChecker.parse_options(options)
+parsed = time.time()
+assert len(flake8_pytest_mark.MarkChecker.context.pytest_marks) == int(sys.argv[1])
+print(json.dumps({'import': imported - start, 'add_options': added - registered,
+                  'options': (aggregated - added) + (parsed - aggregated)}))
+"""
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def write_project(directory, marks):
+    """Write a project with a single small test module, like a typical pre-commit invocation would check.
+
+    Args:
+        directory (str): The directory to write to.
+        marks (int): The number of marks to configure.
+    """
+    with io.open(os.path.join(directory, 'setup.cfg'), 'w', encoding='utf-8') as f:
+        f.write(u'[flake8]\n')
+        f.write(u''.join(u'pytest_mark{} = name=mark{},value_match=uuid\n'.format(i, i) for i in range(1, marks + 1)))
+    with io.open(os.path.join(directory, 'test_example.py'), 'w', encoding='utf-8') as f:
+        f.write(u"@pytest.mark.mark1('6f0b8e52-4c1f-4a8e-9c6b-2a7c1e5d3f90')\ndef test_example():\n    pass\n")
+
+
+def median(values):
+    """Compute the median of a list of numbers.
+
+    Args:
+        values (list): The numbers.
+
+    Returns:
+        float: The median.
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def measure(directory, marks, runs):
+    """Measure the startup of the plugin in fresh interpreters.
+
+    Args:
+        directory (str): The directory of the project.
+        marks (int): The number of marks configured.
+        runs (int): The number of interpreters to start per measurement.
+
+    Returns:
+        dict: { str('measurement'): { str('metric'): number } }
+    """
+    samples = {'import': [], 'add_options': [], 'options': [], 'flake8': []}
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', PROBE, str(marks)], cwd=directory)
+        for name, seconds in json.loads(out.decode('utf-8')).items():
+            samples[name].append(seconds)
+
+        start = time.time()
+        subprocess.call([sys.executable, '-m', 'flake8', '--select', 'M', 'test_example.py'], cwd=directory,
+                        stdout=subprocess.PIPE)
+        samples['flake8'].append(time.time() - start)
+    return {name: {'seconds': median(values)} for name, values in samples.items()}
+
+
+def main(argv=None):
+    """Run the benchmark.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit status. (1 if a measurement regressed compared to '--compare')
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--marks', type=int, default=2, help='Marks to configure. (default: 2)')
+    parser.add_argument('--runs', type=int, default=11, help='Interpreters started per measurement. (default: 11)')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the results to the ones recorded in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Slowdown tolerated by --compare before failing. (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    parameters = {'marks': args.marks}
+    directory = tempfile.mkdtemp(prefix='flake8-pytest-mark-bench-')
+    try:
+        write_project(directory, args.marks)
+        results = measure(directory, args.marks, args.runs)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for name in ('import', 'add_options', 'options', 'flake8'):
+        print('{:<12} {:>10.2f} ms'.format(name, results[name]['seconds'] * 1000))
+    if args.output:
+        harness.write_results(args.output, BENCHMARK, parameters, results)
+    if args.compare:
+        if harness.compare_results(args.compare, BENCHMARK, parameters, results, 'seconds', args.tolerance,
+                                   higher_is_better=False):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""Compare checking a corpus with a pool of threads in one process against a pool of processes.
+
+Both pools call 'executor.check_file' for every file with the context configured from the corpus. Wall time and
+speedup relative to a single thread are reported for every worker count. Threads share the unique value store of the
+run, so they must report the same violations as a single thread; processes each hold their own store and only agree on
+the violations that do not depend on other files. A thread pool reporting different violations fails the benchmark.
+
+Examples:
+    python -m benchmarks.bench_threads
+    python -m benchmarks.bench_threads --workers 1 2 4 --files 500 --output threads.json
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from benchmarks import corpus, harness
+from flake8_pytest_mark import MarkChecker, executor
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BENCHMARK = 'threads'
+MODES = ('threads', 'processes')
+UNIQUE_CODE = 'M3'
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def check_with_threads(paths, workers):
+    """Check files with a pool of threads sharing the context of the run.
+
+    Args:
+        paths (list): The files to check.
+        workers (int): The number of threads.
+
+    Returns:
+        tuple: (float('seconds'), dict('violations by path'))
+    """
+    MarkChecker.context.unique_values.clear()
+    start = time.time()
+    results = executor.check_files(paths, threads=workers)
+    return time.time() - start, results
+
+
+def check_with_processes(paths, workers):
+    """Check files with a pool of forked processes, each inheriting the context of the run like flake8 workers do.
+
+    Args:
+        paths (list): The files to check.
+        workers (int): The number of processes.
+
+    Returns:
+        tuple: (float('seconds'), dict('violations by path'))
+    """
+    MarkChecker.context.unique_values.clear()
+    start = time.time()
+    pool = multiprocessing.Pool(workers)
+    try:
+        results = pool.map(executor.check_file, paths, chunksize=max(1, len(paths) // (workers * 4)))
+    finally:
+        pool.close()
+        pool.join()
+    return time.time() - start, dict(zip(paths, results))
+
+
+def summarize(results):
+    """Count the violations of a check.
+
+    Args:
+        results (dict): { str('path'): list('violations') }
+
+    Returns:
+        tuple: (frozenset, int) the violations that do not depend on other files and the number of uniqueness
+            violations
+    """
+    local = set()
+    unique = 0
+    for path, violations in results.items():
+        for line, col, message in violations:
+            if message.startswith(UNIQUE_CODE):
+                unique += 1
+            else:
+                local.add((path, line, message))
+    return frozenset(local), unique
+
+
+def measure(paths, workers, repeat):
+    """Check the files with every mode and worker count.
+
+    Args:
+        paths (list): The files to check.
+        workers (list): The worker counts in increasing order, starting with 1.
+        repeat (int): Runs per measurement, the fastest is kept.
+
+    Returns:
+        tuple: (dict('results'), list('differences from a single thread'))
+    """
+    results = {}
+    differences = []
+    checks = {'threads': check_with_threads, 'processes': check_with_processes}
+    expected = None
+    for mode in MODES:
+        for count in workers:
+            seconds, violations = harness.best_of(repeat, checks[mode], paths, count)
+            local, unique = summarize(violations)
+            if expected is None:
+                expected = (local, unique)
+            elif mode == 'threads' and (local, unique) != expected:
+                differences.append('{} threads: {} violations and {} uniqueness violations, expected {} and {}'.format(
+                    count, len(local), unique, len(expected[0]), expected[1]))
+            results['{}_{}'.format(mode, count)] = {'mode': mode, 'workers': count, 'seconds': seconds,
+                                                    'violations': len(local), 'unique_violations': unique}
+
+    serial = results['threads_1']['seconds']
+    for result in results.values():
+        result['speedup'] = serial / result['seconds']
+    return results, differences
+
+
+def main(argv=None):
+    """Run the benchmark.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit status. (1 if threads change the violations or regressed compared to '--compare')
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Worker counts to run. 1 is always included. (default: 1 2 4 8)')
+    parser.add_argument('--files', type=int, default=1000, help='Test modules in the corpus. (default: 1000)')
+    parser.add_argument('--tests', type=int, default=10, help='Test definitions per module. (default: 10)')
+    parser.add_argument('--invalid', type=float, default=0.05, help='Fraction of invalid values. (default: 0.05)')
+    parser.add_argument('--duplicate', type=float, default=0.05, help='Fraction of duplicate values. (default: 0.05)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator. (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the best is kept. (default: 3)')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the wall times to the ones recorded in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Slowdown tolerated by --compare before failing. (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    workers = sorted(set(args.workers) | {1})
+    parameters = {'workers': workers, 'files': args.files, 'tests': args.tests, 'invalid': args.invalid,
+                  'duplicate': args.duplicate, 'seed': args.seed}
+    directory = tempfile.mkdtemp(prefix='flake8-pytest-mark-bench-')
+    try:
+        generator = corpus.CorpusGenerator(tests=args.tests, invalid=args.invalid, duplicate=args.duplicate,
+                                           seed=args.seed)
+        corpus.write_corpus(directory, args.files, generator)
+        harness.configure_checker(directory)
+        results, differences = measure(list(corpus.iter_corpus_files(directory)), workers, args.repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    row = '{:>10} {:>8} {:>10} {:>9} {:>11} {:>8}'
+    print(row.format('mode', 'workers', 'seconds', 'speedup', 'violations', 'unique'))
+    for mode in MODES:
+        for count in workers:
+            r = results['{}_{}'.format(mode, count)]
+            print(row.format(mode, count, '{:.3f}'.format(r['seconds']), '{:.2f}x'.format(r['speedup']),
+                             r['violations'], r['unique_violations']))
+
+    status = 0
+    if differences:
+        print('\nFAILED: the violations reported by a thread pool depend on the number of threads')
+        for line in differences:
+            print(line)
+        status = 1
+    if args.output:
+        harness.write_results(args.output, BENCHMARK, parameters, results)
+    if args.compare:
+        if harness.compare_results(args.compare, BENCHMARK, parameters, results, 'seconds', args.tolerance,
+                                   higher_is_better=False):
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
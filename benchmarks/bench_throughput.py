@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Measure how many test definitions per second are checked, in process and through flake8.
+
+Examples:
+    python -m benchmarks.bench_throughput --output throughput.json
+    python -m benchmarks.bench_throughput --compare benchmarks/results/throughput.json
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import shutil
+import sys
+import tempfile
+from benchmarks import corpus, harness
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BENCHMARK = 'throughput'
+
+
+# ======================================================================================================================
+# Functions
+# ======================================================================================================================
+def measure(args, directory):
+    """Generate a corpus and measure the throughput of the checker over it.
+
+    Args:
+        args (argparse.Namespace): The parsed command line.
+        directory (str): An empty directory to write the corpus to.
+
+    Returns:
+        dict: { str('measurement'): { str('metric'): number } }
+    """
+    generator = corpus.CorpusGenerator(tests=args.tests, decorators=args.decorators, kinds=args.kinds,
+                                       invalid=args.invalid, duplicate=args.duplicate, seed=args.seed)
+    summary = corpus.write_corpus(directory, args.files, generator)
+
+    harness.configure_checker(directory)
+    trees = harness.parse_files(corpus.iter_corpus_files(directory))
+    checker_seconds, checker_violations = harness.best_of(args.repeat, harness.check_trees, trees)
+    flake8_seconds, flake8_lines = harness.best_of(args.repeat, harness.run_flake8, directory)
+    if checker_violations != len(flake8_lines):
+        raise RuntimeError('the checker reported {} violations in process but {} through flake8'.format(
+            checker_violations, len(flake8_lines)))
+
+    return {name: {'seconds': seconds, 'tests_per_second': summary.tests / seconds, 'violations': violations}
+            for name, seconds, violations in (('checker', checker_seconds, checker_violations),
+                                              ('flake8', flake8_seconds, len(flake8_lines)))}
+
+
+def main(argv=None):
+    """Run the benchmark.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit status. (1 if a measurement regressed compared to '--compare')
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help='Test modules in the corpus. (default: 200)')
+    parser.add_argument('--tests', type=int, default=20, help='Test definitions per module. (default: 20)')
+    parser.add_argument('--decorators', type=int, default=3, help='Decorators per test definition. (default: 3)')
+    parser.add_argument('--kinds', nargs='+', choices=corpus.KINDS, default=list(corpus.KINDS),
+                        help='Kinds of test definitions to mix. (default: all)')
+    parser.add_argument('--invalid', type=float, default=0.1, help='Fraction of invalid values. (default: 0.1)')
+    parser.add_argument('--duplicate', type=float, default=0.1, help='Fraction of duplicate values. (default: 0.1)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the corpus generator. (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the best is kept. (default: 3)')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the results to the ones recorded in this file.')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Slowdown tolerated by --compare before failing. (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    parameters = {'files': args.files, 'tests': args.tests, 'decorators': args.decorators,
+                  'kinds': sorted(args.kinds), 'invalid': args.invalid, 'duplicate': args.duplicate,
+                  'seed': args.seed}
+    directory = tempfile.mkdtemp(prefix='flake8-pytest-mark-bench-')
+    try:
+        results = measure(args, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    for name in sorted(results):
+        print('{:<10} {:>12.1f} tests/s {:>10.3f}s'.format(name, results[name]['tests_per_second'],
+                                                           results[name]['seconds']))
+    if args.output:
+        harness.write_results(args.output, BENCHMARK, parameters, results)
+    if args.compare:
+        if harness.compare_results(args.compare, BENCHMARK, parameters, results, 'tests_per_second', args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
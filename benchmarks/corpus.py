@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""Generator for synthetic test suites used by the benchmarks."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import os
+import random
+import uuid
+from collections import namedtuple
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+KINDS = ('function', 'method', 'class')
+MARK_NAME = 'test_id'
+VALUE_REGEX = '[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}'
+SETUP_CFG = u"""[flake8]
+pytest_mark1 = name={},value_regex={},enforce_unique_value=true
+""".format(MARK_NAME, VALUE_REGEX)
+
+CorpusSummary = namedtuple('CorpusSummary', ['files', 'tests', 'valid', 'invalid', 'duplicate'])
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class CorpusGenerator(object):
+    """Generates test modules with a configurable shape and mix of mark values. The output only depends on the
+    parameters and the seed so that benchmark runs are comparable.
+    """
+
+    def __init__(self, tests=20, decorators=1, kinds=KINDS, invalid=0.0, duplicate=0.0, seed=0):
+        """Configure the generator.
+
+        Args:
+            tests (int): The number of test functions, methods and classes per file. Files with methods also get a
+                marked container class which is counted as an additional test definition.
+            decorators (int): The number of decorators per test definition, the first one being the checked mark.
+            kinds (tuple): The kinds of test definitions to cycle through. ('function', 'method' and/or 'class')
+            invalid (float): The fraction of mark values not matching the value regex.
+            duplicate (float): The fraction of mark values repeating an earlier value.
+            seed (int): The seed of the random number generator.
+        """
+        if not kinds or set(kinds) - set(KINDS):
+            raise ValueError('kinds must be a non empty subset of {}'.format(KINDS))
+        if invalid < 0 or duplicate < 0 or invalid + duplicate > 1:
+            raise ValueError('invalid and duplicate must be fractions adding up to at most 1')
+
+        self.tests = tests
+        self.decorators = decorators
+        self.kinds = tuple(kinds)
+        self.invalid = invalid
+        self.duplicate = duplicate
+        self._random = random.Random(seed)
+        self._values = []
+        self._counts = dict.fromkeys(('tests', 'valid', 'invalid', 'duplicate'), 0)
+
+    @property
+    def summary_counts(self):
+        """dict: The number of test definitions generated so far, in total and by kind of mark value."""
+        return dict(self._counts)
+
+    def source(self, index):
+        """Generate a single test module.
+
+        Args:
+            index (int): The index of the module, used to make test names readable.
+
+        Returns:
+            str: The source of the module.
+        """
+        lines = [u'import pytest', u'']
+        methods = []
+        for i in range(self.tests):
+            kind = self.kinds[i % len(self.kinds)]
+            name = u'{}_{}'.format(index, i)
+            if kind == 'method':
+                methods.append(name)
+                continue
+            lines.append(u'')
+            lines.extend(self._decorators())
+            if kind == 'function':
+                lines.extend([u'def test_{}():'.format(name), u'    pass', u''])
+            else:
+                lines.extend([u'class TestClass{}(object):'.format(name),
+                              u'    def helper(self):',
+                              u'        pass',
+                              u''])
+
+        if methods:
+            lines.append(u'')
+            lines.extend(self._decorators())
+            lines.append(u'class TestMethods{}(object):'.format(index))
+            for name in methods:
+                lines.append(u'')
+                lines.extend(u'    ' + line for line in self._decorators())
+                lines.extend([u'    def test_{}(self):'.format(name), u'        pass'])
+        return u'\n'.join(lines) + u'\n'
+
+    def _decorators(self):
+        """Generate the decorators of a single test definition.
+
+        Returns:
+            list: The decorator lines.
+        """
+        self._counts['tests'] += 1
+        roll = self._random.random()
+        if roll < self.invalid:
+            value = u'invalid-{}'.format(self._counts['tests'])
+            self._counts['invalid'] += 1
+        elif roll < self.invalid + self.duplicate and self._values:
+            value = self._random.choice(self._values)
+            self._counts['duplicate'] += 1
+        else:
+            value = str(uuid.UUID(int=self._random.getrandbits(128)))
+            self._values.append(value)
+            self._counts['valid'] += 1
+
+        lines = [u"@pytest.mark.{}('{}')".format(MARK_NAME, value)]
+        lines.extend(u"@pytest.mark.tag{}('value {}')".format(i, i) for i in range(1, self.decorators))
+        return lines
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def write_corpus(directory, files, generator):
+    """Write a corpus and the flake8 configuration that checks it.
+
+    Args:
+        directory (str): The directory to write the corpus to. Created if missing.
+        files (int): The number of test modules to write.
+        generator (CorpusGenerator): The generator of the test modules.
+
+    Returns:
+        CorpusSummary: What was written.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with io.open(os.path.join(directory, 'setup.cfg'), 'w', encoding='utf-8') as f:
+        f.write(SETUP_CFG)
+
+    # Spread the modules over sub packages so that directories stay small for very large corpora.
+    for index in range(files):
+        package = os.path.join(directory, 'tests_{:03d}'.format(index // 1000))
+        if not os.path.isdir(package):
+            os.makedirs(package)
+        with io.open(os.path.join(package, 'test_{:06d}.py'.format(index)), 'w', encoding='utf-8') as f:
+            f.write(generator.source(index))
+
+    counts = generator.summary_counts
+    return CorpusSummary(files, counts['tests'], counts['valid'], counts['invalid'], counts['duplicate'])
+
+
+def iter_corpus_files(directory):
+    """Iterate over the test modules of a corpus in a stable order.
+
+    Args:
+        directory (str): The directory the corpus was written to.
+
+    Yields:
+        str: The path of every test module.
+    """
+    for package in sorted(os.listdir(directory)):
+        path = os.path.join(directory, package)
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.py'):
+                    yield os.path.join(path, name)
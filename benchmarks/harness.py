@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers shared by the benchmarks for running the checker and recording comparable results."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import flake8
+from flake8_pytest_mark import MarkChecker
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+RESULTS_VERSION = 1
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def configure_checker(directory, extra_args=()):
+    """Configure 'MarkChecker' from the 'setup.cfg' of a corpus like flake8 would, without checking anything. Only
+    this plugin is registered so that no other installed plugin is loaded.
+
+    Args:
+        directory (str): The directory of the corpus.
+        extra_args (iterable): Additional flake8 command line arguments.
+    """
+    MarkChecker.configure(['--config', os.path.join(directory, 'setup.cfg'), '--select', 'M'] + list(extra_args))
+
+
+def parse_files(paths):
+    """Parse files ahead of a benchmark so that parsing is not measured.
+
+    Args:
+        paths (iterable): The files to parse.
+
+    Returns:
+        list: (str('path'), ast.Module) tuples.
+    """
+    trees = []
+    for path in paths:
+        with io.open(path, 'rb') as f:
+            trees.append((path, ast.parse(f.read(), path)))
+    return trees
+
+
+def check_trees(trees):
+    """Run the checker over parsed files in this process, starting from an empty uniqueness map.
+
+    Args:
+        trees (iterable): (str('path'), ast.Module) tuples.
+
+    Returns:
+        tuple: (float('seconds'), int('violations'))
+    """
+    MarkChecker.context.unique_values.clear()
+    violations = 0
+    start = time.time()
+    for path, tree in trees:
+        for _ in MarkChecker(tree, path).run():
+            violations += 1
+    return time.time() - start, violations
+
+
+def run_flake8(directory, jobs=1, extra_args=()):
+    """Run flake8 over a corpus in a subprocess.
+
+    Args:
+        directory (str): The directory of the corpus.
+        jobs (int): The value of '--jobs'.
+        extra_args (iterable): Additional flake8 command line arguments.
+
+    Returns:
+        tuple: (float('seconds'), list('output lines'))
+    """
+    args = [sys.executable, '-m', 'flake8', '--jobs', str(jobs), '--select', 'M', '--config', 'setup.cfg', '.']
+    start = time.time()
+    process = subprocess.Popen(args + list(extra_args), cwd=directory, stdout=subprocess.PIPE)
+    out, _ = process.communicate()
+    seconds = time.time() - start
+    if process.returncode not in (0, 1):
+        raise RuntimeError('flake8 exited with {}'.format(process.returncode))
+    return seconds, out.decode('utf-8').splitlines()
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """Call a function several times and keep the fastest call.
+
+    Args:
+        repeat (int): The number of calls.
+        func (callable): A function returning a tuple whose first item is a duration in seconds.
+
+    Returns:
+        tuple: The result of the fastest call.
+    """
+    return min((func(*args, **kwargs) for _ in range(repeat)), key=lambda result: result[0])
+
+
+def environment():
+    """Describe the environment a benchmark ran in.
+
+    Returns:
+        dict: The versions and platform.
+    """
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'flake8': flake8.__version__, 'platform': platform.platform(), 'cpus': multiprocessing.cpu_count()}
+
+
+def environment_differences(recorded, current):
+    """Describe how the environment of recorded results differs from the current one.
+
+    Args:
+        recorded (dict): The environment of the recorded results, from 'environment'.
+        current (dict): The current environment.
+
+    Returns:
+        list: str('key: recorded != current') for every difference, in order.
+    """
+    return ['{}: {} != {}'.format(key, recorded.get(key), current.get(key))
+            for key in sorted(set(recorded) | set(current)) if recorded.get(key) != current.get(key)]
+
+
+def write_results(path, benchmark, parameters, results):
+    """Write the results of a benchmark as JSON.
+
+    Args:
+        path (str): The file to write.
+        benchmark (str): The name of the benchmark.
+        parameters (dict): The parameters of the benchmark.
+        results (dict): { str('measurement'): { str('metric'): number } }
+    """
+    document = {'version': RESULTS_VERSION, 'benchmark': benchmark, 'parameters': parameters,
+                'environment': environment(), 'results': results}
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'{}\n'.format(json.dumps(document, indent=2, sort_keys=True)))
+
+
+def compare_results(path, benchmark, parameters, results, metric, tolerance, higher_is_better=True):
+    """Compare results against recorded ones and print the change of every measurement. Timings only say something
+    about the code when both runs share the machine and versions, so results recorded in another environment are
+    compared for information only and never regress.
+
+    Args:
+        path (str): The file holding the recorded results.
+        benchmark (str): The name of the benchmark.
+        parameters (dict): The parameters of the benchmark.
+        results (dict): { str('measurement'): { str('metric'): number } }
+        metric (str): The metric to compare.
+        tolerance (float): The relative change beyond which a measurement is a regression. (0.1 is 10%)
+        higher_is_better (bool): Whether larger values of the metric are improvements.
+
+    Returns:
+        list: The names of the measurements that regressed. (Always empty when the environments differ)
+
+    Raises:
+        ValueError: The recorded results are not comparable.
+    """
+    with io.open(path, encoding='utf-8') as f:
+        recorded = json.load(f)
+    if recorded.get('version') != RESULTS_VERSION or recorded.get('benchmark') != benchmark:
+        raise ValueError("'{}' does not hold version {} results of the {} benchmark".format(
+            path, RESULTS_VERSION, benchmark))
+    if recorded['parameters'] != parameters:
+        raise ValueError("'{}' was recorded with different parameters: {}".format(path, recorded['parameters']))
+
+    differences = environment_differences(recorded.get('environment', {}), environment())
+    if differences:
+        print("'{}' was recorded in another environment ({}), the comparison is for information only. Record results "
+              "on this machine with --output to compare against.".format(path, '; '.join(differences)))
+
+    regressions = []
+    print('{:<30} {:>14} {:>14} {:>9}'.format('measurement', 'recorded', 'current', 'change'))
+    for name in sorted(results):
+        if name not in recorded['results']:
+            continue
+        before = recorded['results'][name][metric]
+        after = results[name][metric]
+        change = (after - before) / before if before else 0.0
+        regressed = not differences and (-change > tolerance if higher_is_better else change > tolerance)
+        if regressed:
+            regressions.append(name)
+        print('{:<30} {:>14.1f} {:>14.1f} {:>+8.1%}{}'.format(
+            name, before, after, change, ' REGRESSION' if regressed else ''))
+    return regressions
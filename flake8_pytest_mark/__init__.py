@@ -4,8 +4,19 @@
 # Imports
 # ======================================================================================================================
 import ast
+import optparse
+import os
 import re
+import sys
+import time
+from collections import deque
 from flake8_pytest_mark import rules
+from flake8_pytest_mark import config
+from flake8_pytest_mark import run_context
+from flake8_pytest_mark import scopes
+from flake8_pytest_mark import session
+from flake8_pytest_mark import symbols
+# The modules of optional features are imported when their option is set, keeping the start of every flake8 run short.
 
 # ======================================================================================================================
 # Globals
@@ -25,10 +36,8 @@ class MarkChecker(object):
 
     name = 'flake8-pytest-mark'
     version = __version__
-    min_mark = 1
-    max_mark = 50
     test_def_regex = re.compile(r'^(test_)|(Test)')
-    pytest_marks = dict.fromkeys(["pytest_mark{}".format(x) for x in range(min_mark, max_mark)], {})
+    context = run_context.RunContext()  # the context of the run configured by 'parse_options'
 
     # noinspection PyUnusedLocal,PyUnusedLocal
     def __init__(self, tree, filename, *args, **kwargs):
@@ -38,11 +47,22 @@ class MarkChecker(object):
             tree (ast.AST): An AST tree. (Required by flake8, but never used by this plug-in)
             filename (str): The name of the file to evaluate.
             args (list): A list of positional arguments.
-            kwargs (dict): A dictionary of keyword arguments.
+            kwargs (dict): A dictionary of keyword arguments. 'context' checks the file as part of another run than
+                the one configured by 'parse_options'.
         """
 
         self.tree = tree
         self.filename = filename
+        self.context = kwargs.get('context') or type(self).context
+        self._file_counts = None    # mark coverage counts of the file when statistics are collected
+        self._counters = None       # instrumentation.Counters of the file when instrumentation or metrics are enabled
+        self._tracer = None         # trace_events.FileTracer of the file when tracing is enabled
+        self._watchdog = None       # watchdog.FileWatchdog of the file when slow files are watched
+        self._marks = self.context.pytest_marks     # the marks applying to the file
+        self._symbols = None        # symbols.SymbolTable of the names the module binds to pytest and its marks
+        self._reporting = False     # whether violations are written to the structured report
+        self._file_violations = 0   # violations reported for the file, limited by pytest_mark_max_violations_per_file
+        self._stopped = None        # (str('code'), int('line')) of the budget violation that stopped the file
 
     @classmethod
     def add_options(cls, parser):
@@ -52,10 +72,84 @@ class MarkChecker(object):
         Args:
             parser (OptionsManager):
         """
-        kwargs = {'action': 'store', 'default': '', 'parse_from_config': True,
-                  'comma_separated_list': True}
-        for num in range(cls.min_mark, cls.max_mark):
-            parser.add_option(None, "--pytest-mark{}".format(num), **kwargs)
+        # The numbered 'pytest_markN' keys are read from the configuration files directly, see 'config.load_marks'.
+        # Their '--pytest-markN' flags are deprecated and only registered when given, until the next release.
+        for number in config.legacy_flag_numbers(sys.argv[1:]):
+            parser.add_option(None, '--pytest-mark{}'.format(number), action='store', default='',
+                              help=optparse.SUPPRESS_HELP)
+        parser.add_option(None, '--pytest-marks', action='store', default='', parse_from_config=True,
+                          help='Marks to validate, each starting with its name parameter. '
+                               '"name=test_id,value_match=uuid name=jira_id,allow_multiple_args=true"')
+        parser.add_option(None, '--pytest-mark-config', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='A TOML file with a [tool.flake8-pytest-mark] table of marks. (default: the closest '
+                               'pyproject.toml)')
+        parser.add_option(None, '--pytest-mark-nested-configs', action='store_true', default=False,
+                          parse_from_config=True,
+                          help='Let the setup.cfg, tox.ini, .flake8 and pyproject.toml files of sub directories '
+                               'override the marks of their parent directory.')
+        parser.add_option(None, '--pytest-mark-changed-since', action='store', default='', parse_from_config=True,
+                          help='Only check files changed since the merge base of this git ref and HEAD. Uniqueness '
+                               'of mark values is still enforced against the unchanged files.')
+        parser.add_option(None, '--pytest-mark-changed-staged', action='store_true', default=False,
+                          parse_from_config=True,
+                          help='Only check files in the git staging area. Uniqueness of mark values is still '
+                               'enforced against the unchanged files.')
+        parser.add_option(None, '--pytest-mark-unique-index', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='A mark value index (see "flake8-pytest-mark build-index") used instead of git to '
+                               'load the mark values of unchanged files in changed files mode.')
+        parser.add_option(None, '--pytest-mark-baseline', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='A baseline file of known violations that will not be reported.')
+        parser.add_option(None, '--pytest-mark-update-baseline', action='store_true', default=False,
+                          help='Record every current violation in the baseline file instead of reporting them.')
+        parser.add_option(None, '--pytest-mark-max-violations-per-file', action='store', type='int', default=0,
+                          parse_from_config=True,
+                          help='Stop checking a file after this many violations. (default: 0, unlimited)')
+        parser.add_option(None, '--pytest-mark-max-violations', action='store', type='int', default=0,
+                          parse_from_config=True,
+                          help='Stop checking after this many violations in the whole run. (default: 0, unlimited)')
+        parser.add_option(None, '--pytest-mark-time-budget', action='store', type='float', default=0,
+                          parse_from_config=True,
+                          help='Stop checking once the run has taken this many seconds. (default: 0, unlimited)')
+        parser.add_option(None, '--pytest-mark-inventory', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='Write every test definition and the values of its configured marks to this JSON '
+                               'lines file.')
+        parser.add_option(None, '--pytest-mark-statistics', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='Write mark coverage statistics per directory to this file at the end of the run. '
+                               '("-" writes to stdout)')
+        parser.add_option(None, '--pytest-mark-statistics-format', action='store', default='table',
+                          choices=['table', 'json'], parse_from_config=True,
+                          help='The format of the mark coverage statistics. (default: table)')
+        parser.add_option(None, '--pytest-mark-report', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='Stream the violations to this file with their mark, offending values and the tests '
+                               'they collide with.')
+        parser.add_option(None, '--pytest-mark-report-format', action='store', default='json',
+                          choices=['json', 'sarif'], parse_from_config=True,     # report.FORMATS
+                          help='The format of the violation report, JSON lines or SARIF 2.1.0. (default: json)')
+        parser.add_option(None, '--pytest-mark-instrument', action='store_true', default=False, parse_from_config=True,
+                          help='Report per rule timing and counters at the end of the run. (Implied by --benchmark)')
+        parser.add_option(None, '--pytest-mark-metrics', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='Write run metrics to this file in the Prometheus text format at the end of the run.')
+        parser.add_option(None, '--pytest-mark-trace', action='store', default='', parse_from_config=True,
+                          normalize_paths=True,
+                          help='Write a timeline of the files, test definitions and rules evaluated to this file in '
+                               'the Chrome trace event format.')
+        parser.add_option(None, '--pytest-mark-slow-file-threshold', action='store', type='float', default=0,
+                          parse_from_config=True,
+                          help='Warn about files that take longer than this many seconds to check. (default: 0, off)')
+        parser.add_option(None, '--pytest-mark-slow-node-threshold', action='store', type='float', default=0,
+                          parse_from_config=True,
+                          help='Warn about test definitions that take longer than this many seconds to check. '
+                               '(default: 0, off)')
+        parser.add_option(None, '--pytest-mark-slowest-files', action='store', type='int', default=0,
+                          parse_from_config=True,
+                          help='Report this many of the slowest files at the end of the run. (default: 0, off)')
 
     @classmethod
     def parse_options(cls, options):
@@ -66,33 +160,139 @@ class MarkChecker(object):
             options (dict): options to be parsed
         """
 
-        d = {}
-        acceptable_params = ['name',
-                             'value_match',
-                             'value_regex',
-                             'allow_duplicate',
-                             'allow_multiple_args',
-                             'enforce_unique_value',
-                             'exclude_classes',
-                             'exclude_methods',
-                             'exclude_functions']
-
-        for pytest_mark, dictionary in cls.pytest_marks.items():
-            # retrieve the marks from the passed options
-            mark_data = getattr(options, pytest_mark)
-            if len(mark_data) != 0:
-                parsed_params = {}
-                for single_line in mark_data:
-                    a = [s.strip() for s in single_line.split('=')]
-                    # whitelist the acceptable params
-                    if a[0] in acceptable_params:
-                        parsed_params[a[0]] = a[1]
-                d[pytest_mark] = parsed_params
-
-        cls.pytest_marks.update(d)
-
-        # delete any empty rules
-        cls.pytest_marks = {x: y for x, y in cls.pytest_marks.items() if len(y) > 0}
+        ctx = cls.create_context(options)
+        session.start()
+
+        if ctx.update_baseline:
+            from flake8_pytest_mark import baseline
+            fingerprints = set()
+            session.subscribe('baseline', fingerprints.add,
+                              lambda: baseline.write_baseline(ctx.baseline_file, fingerprints))
+
+        if options.pytest_mark_inventory:
+            from flake8_pytest_mark import inventory
+            writer = inventory.InventoryWriter(options.pytest_mark_inventory)
+            session.subscribe('inventory', writer.write, writer.close)
+
+        if options.pytest_mark_statistics:
+            from flake8_pytest_mark import mark_stats
+            collector = mark_stats.StatisticsCollector(options.pytest_mark_statistics,
+                                                       options.pytest_mark_statistics_format)
+            session.subscribe('statistics', collector.add, collector.report)
+
+        if options.pytest_mark_report:
+            from flake8_pytest_mark import report
+            writer = report.ReportWriter(options.pytest_mark_report, options.pytest_mark_report_format, __version__,
+                                         report.ReportFilter(options))
+            session.subscribe('violation', writer.write, writer.close)
+
+        if options.pytest_mark_instrument or getattr(options, 'benchmark', False):
+            from flake8_pytest_mark import instrumentation
+            ctx.collect_counters = True
+            summary = instrumentation.InstrumentationReport()
+            session.subscribe('instrumentation', summary.add, summary.report)
+        if options.pytest_mark_metrics:
+            from flake8_pytest_mark import metrics
+            ctx.collect_counters = True
+            writer = metrics.MetricsWriter(options.pytest_mark_metrics, ctx.seeded_unique_values)
+            session.subscribe('instrumentation', writer.add, writer.write)
+
+        if options.pytest_mark_trace:
+            from flake8_pytest_mark import trace_events
+            writer = trace_events.TraceWriter(options.pytest_mark_trace)
+            session.subscribe('trace', writer.write, writer.close)
+
+        if options.pytest_mark_slowest_files:
+            from flake8_pytest_mark import watchdog
+            slowest = watchdog.SlowestFilesReport(options.pytest_mark_slowest_files)
+            session.subscribe('slow_file', slowest.add, slowest.report)
+
+        cls.context = ctx
+
+    @classmethod
+    def create_context(cls, options):
+        """Create the context of a run from the parsed options without opening any of the configured outputs, so the
+        commands checking files outside of flake8 never truncate the reports, inventories or baselines of a project.
+
+        Args:
+            options (optparse.Values): The options parsed by flake8.
+
+        Returns:
+            run_context.RunContext: The marks, the cross file state and the budgets of the run.
+        """
+        ctx = run_context.RunContext()
+        if config.read_legacy_flags(options):
+            sys.stderr.write(u'flake8-pytest-mark: the --pytest-markN flags are deprecated and will be removed in the '
+                             u'next release, use --pytest-marks instead\n')
+        try:
+            ctx.pytest_marks = config.load_marks(options)
+        except config.ConfigError as e:
+            ctx.pytest_marks = {}
+            ctx.config_error = str(e)
+
+        if any('include' in rule_conf or 'exclude' in rule_conf for rule_conf in ctx.pytest_marks.values()):
+            from flake8_pytest_mark import path_filters
+            ctx.path_matcher = path_filters.PathMatcher(ctx.pytest_marks)
+
+        if options.pytest_mark_nested_configs and not getattr(options, 'isolated', False):
+            from flake8_pytest_mark import hierarchy
+            ctx.config_hierarchy = hierarchy.ConfigHierarchy(ctx.pytest_marks, ctx.path_matcher, ctx.config_error)
+
+        if options.pytest_mark_changed_since or options.pytest_mark_changed_staged:
+            cls._load_changed_files(ctx,
+                                    options.pytest_mark_changed_since,
+                                    options.pytest_mark_changed_staged,
+                                    options.pytest_mark_unique_index)
+            ctx.seeded_unique_values = ctx.unique_values.counts()
+
+        ctx.baseline_file = options.pytest_mark_baseline
+        ctx.update_baseline = bool(ctx.baseline_file) and options.pytest_mark_update_baseline
+        if ctx.baseline_file and not ctx.update_baseline:
+            from flake8_pytest_mark import baseline
+            try:
+                ctx.baseline_fingerprints = baseline.load_baseline(ctx.baseline_file)
+            except (IOError, OSError, UnicodeDecodeError) as e:
+                ctx.baseline_error = "baseline file '{}' could not be read: {}".format(ctx.baseline_file, e)
+
+        ctx.max_violations_per_file = options.pytest_mark_max_violations_per_file
+        time_budget = float(options.pytest_mark_time_budget)    # flake8 does not convert float values from configs
+        if options.pytest_mark_max_violations or time_budget:
+            from flake8_pytest_mark import budget
+            ctx.run_budget = budget.RunBudget(options.pytest_mark_max_violations, time_budget)
+
+        ctx.slow_file_threshold = float(options.pytest_mark_slow_file_threshold)
+        ctx.slow_node_threshold = float(options.pytest_mark_slow_node_threshold)
+        return ctx
+
+    @classmethod
+    def configure(cls, argv=(), outputs=True):
+        """Configure the checker from the flake8 configuration of the current directory like flake8 would, for the
+        commands and benchmarks that check files without running flake8. Only this plugin is registered so that no
+        other installed plugin is loaded.
+
+        Args:
+            argv (iterable): Additional flake8 command line arguments, such as '--config'.
+            outputs (bool): Open the configured outputs like a flake8 run does. (False only creates the context)
+
+        Returns:
+            optparse.Values: The parsed flake8 options.
+        """
+        # Imported here, flake8's option machinery is already loaded when flake8 runs the plugin.
+        import flake8
+        from flake8.main import options as flake8_options
+        from flake8.options import aggregator, config as flake8_config, manager
+
+        argv = list(argv)
+        option_manager = manager.OptionManager(prog='flake8', version=flake8.__version__)
+        flake8_options.register_default_options(option_manager)
+        cls.add_options(option_manager)
+        options, _ = aggregator.aggregate_options(option_manager, flake8_config.ConfigFileFinder('flake8', argv, []),
+                                                  argv)
+        if outputs:
+            cls.parse_options(options)
+        else:
+            cls.context = cls.create_context(options)
+        return options
 
     def run(self):
         """Required by flake8
@@ -102,28 +302,397 @@ class MarkChecker(object):
             tuple: (int, int, str, type) the tuple used by flake8 to construct a violation
         """
 
-        rule_funcs = \
-            (rules.rule_m3xx, rules.rule_m5xx, rules.rule_m6xx, rules.rule_m7xx, rules.rule_m8xx, rules.rule_m9xx)
+        context = self.context
+
+        # Files left untouched in changed files mode only contribute their mark values through the seeded index.
+        if context.changed_files is not None and os.path.realpath(self.filename) not in context.changed_files:
+            return
 
-        if len(self.pytest_marks) == 0:
+        self._reporting = session.is_subscribed('violation')
+        pytest_marks, self._marks, config_error = context.resolve_marks(self.filename)
+        if config_error:
+            yield self._reported((0, 0, "M405 invalid configuration: {}".format(config_error), type(self)))
+        elif len(pytest_marks) == 0:
             message = "M401 no configuration found for {}, " \
                       "please provide configured marks in a flake8 config".format(self.name)
-            yield (0, 0, message, type(self))
-
-        for node in ast.walk(self.tree):
-            if type(node) in (ast.FunctionDef, ast.ClassDef) and self.test_def_regex.match(node.name):
-                for rule_func in rule_funcs:
-                    for rule_name, rule_conf in self.pytest_marks.items():
-                        # Skip nodes that fail process evaluation
-                        if not self._process_node_evaluation(rule_conf, node):
+            yield self._reported((0, 0, message, type(self)))
+        if context.baseline_error:
+            yield self._reported((0, 0, "M405 invalid configuration: {}".format(context.baseline_error), type(self)))
+
+        self._file_counts = {} if session.is_subscribed('statistics') else None
+        self._counters = None
+        if context.collect_counters:
+            from flake8_pytest_mark import instrumentation
+            self._counters = instrumentation.Counters()
+        self._tracer = None
+        if session.is_subscribed('trace'):
+            from flake8_pytest_mark import trace_events
+            self._tracer = trace_events.FileTracer(self.filename)
+        self._watchdog = None
+        if context.slow_file_threshold or context.slow_node_threshold or session.is_subscribed('slow_file'):
+            from flake8_pytest_mark import watchdog
+            self._watchdog = watchdog.FileWatchdog(self.filename, context.slow_file_threshold,
+                                                   context.slow_node_threshold)
+
+        for err in self._check_tree():
+            yield err
+        # Mark the inventory of a file a budget stopped as incomplete, rather than silently ending it early.
+        if self._stopped is not None and session.is_subscribed('inventory'):
+            from flake8_pytest_mark import inventory
+            session.emit('inventory', inventory.build_stopped_record(self.filename, *self._stopped))
+
+        # Nothing else can collide with the values of a file scoped mark once the file is checked.
+        for rule_conf in self._marks.values():
+            if rule_conf.get('unique_scope') == 'file':
+                context.unique_values.release(rule_conf['name'], scopes.scope_key('file', self.filename))
+
+        if self._counters is not None:
+            # Every worker inherits the values seeded before the run, so only the values it claimed itself are sent.
+            seeded = context.seeded_unique_values
+            unique_values = {mark: count - seeded.get(mark, 0)
+                             for mark, count in context.unique_values.counts().items()}
+            session.emit('instrumentation', self._counters.as_record(unique_values))
+        if self._tracer is not None:
+            session.emit('trace', self._tracer.finish())
+        if self._watchdog is not None:
+            session.emit('slow_file', self._watchdog.finish())
+
+        if self._file_counts or (self._file_counts is not None and self._stopped is not None):
+            session.emit('statistics', {'directory': os.path.dirname(self.filename), 'counts': self._file_counts,
+                                        'stopped': self._stopped[0] if self._stopped else None})
+        session.flush()
+
+    def _check_tree(self):
+        """Evaluate the rules against every test definition in the tree while enforcing the configured budgets.
+
+        Yields:
+            tuple: (int, int, str, type) the tuple used by flake8 to construct a violation
+        """
+
+        self._stopped = None
+        run_budget = self.context.run_budget
+        if run_budget is not None and run_budget.out_of_violations():
+            self._stopped = ('M403', 1)
+            return
+
+        self._symbols = symbols.SymbolTable(self.tree)
+        baseline_file = self.context.baseline_file
+        baseline_path = None
+        if baseline_file:
+            from flake8_pytest_mark import baseline
+            baseline_path = baseline.relative_path(self.filename, baseline_file)
+        marks = sorted(set(rule_conf['name'] for rule_conf in self._marks.values()))
+        record_inventory = session.is_subscribed('inventory')
+        if record_inventory:
+            from flake8_pytest_mark import inventory
+        counters = self._counters
+        self._file_violations = 0
+
+        # Marks applied by the module and by classes are only propagated when a mark accepts them.
+        inheriting = any(self._get_value_default_to_false('allow_inherited', rule_conf)
+                         for rule_conf in self._marks.values())
+        walk = self._walk_with_qualnames(self.tree, self._symbols if inheriting else None)
+
+        for node, qualname, inherited, mark_index in walk:
+            if counters is not None:
+                counters.nodes['nodes visited'] += 1
+            if inheriting and isinstance(node, (ast.Module, ast.ClassDef)):
+                # The values of inherited marks are checked once, where 'pytestmark' assigns them.
+                pytestmark, pytestmark_index = self._pytestmark_of(node, qualname)
+                if pytestmark is not None:
+                    for err in self._limited(self._check_node(pytestmark, pytestmark.name, baseline_path,
+                                                              pytestmark_index), pytestmark.lineno):
+                        yield err
+                    if self._stopped:
+                        return
+            if type(node) not in (ast.FunctionDef, ast.ClassDef) or not self.test_def_regex.match(node.name):
+                continue
+            if counters is not None:
+                counters.nodes['test definitions'] += 1
+
+            if mark_index is None:
+                mark_index = self._symbols.index(node.decorator_list)
+            if record_inventory:
+                session.emit('inventory', inventory.build_record(node, qualname, self.get_node_kind(node),
+                                                                 self.filename, marks, mark_index))
+
+            if run_budget is not None and run_budget.out_of_time():
+                if run_budget.claim_summary():
+                    message = "M404 stopped checking after exceeding the time budget of {} seconds " \
+                              "(pytest_mark_time_budget)".format(run_budget.time_limit)
+                    yield self._reported((node.lineno, 0, message, type(self)))
+                self._stopped = ('M404', node.lineno)
+                return
+
+            node_start = time.time() if self._tracer is not None or self._watchdog is not None else None
+            for err in self._limited(self._check_node(node, qualname, baseline_path, mark_index, inherited),
+                                     node.lineno):
+                yield err
+            if self._stopped:
+                return
+            if node_start is not None:
+                node_end = time.time()
+                if self._tracer is not None:
+                    self._tracer.add_span(qualname, 'node', node_start, node_end, {'line': node.lineno})
+                if self._watchdog is not None:
+                    self._watchdog.end_node(qualname, node.lineno, node_end - node_start)
+
+    def _limited(self, results, lineno):
+        """Enforce the violation budgets on the violations found for a node. Once a budget is exhausted '_stopped' is
+        set to the code of its violation and the file is not checked further.
+
+        Args:
+            results (generator): The results of '_check_node'.
+            lineno (int): The line the budget violations are reported on.
+
+        Yields:
+            tuple: (int, int, str, type) the tuple used by flake8 to construct a violation
+        """
+        run_budget = self.context.run_budget
+        max_violations_per_file = self.context.max_violations_per_file
+        for err, rule_func, mark in results:
+            if max_violations_per_file and self._file_violations >= max_violations_per_file:
+                message = "M402 stopped checking this file after {} violations " \
+                          "(pytest_mark_max_violations_per_file)".format(max_violations_per_file)
+                yield self._reported((lineno, 0, message, type(self)))
+                self._stopped = ('M402', lineno)
+                return
+            if run_budget is not None and not run_budget.consume():
+                if run_budget.claim_summary():
+                    message = "M403 stopped checking after {} violations " \
+                              "(pytest_mark_max_violations)".format(run_budget.max_violations)
+                    yield self._reported((lineno, 0, message, type(self)))
+                self._stopped = ('M403', lineno)
+                return
+            self._file_violations += 1
+            if self._counters is not None:
+                self._counters.add_reported(rule_func, mark)
+            yield self._reported(err, mark)
+
+    def _pytestmark_of(self, node, qualname):
+        """Find the marks a module or a class assigns to 'pytestmark'.
+
+        Args:
+            node (ast.AST): The module or the class.
+            qualname (str): The dotted name of the class. (None for the module)
+
+        Returns:
+            tuple: (symbols.PytestMark, dict) the assignment and its marks grouped by mark, (None, None) if the node
+                assigns no mark to 'pytestmark'
+        """
+        if isinstance(node, ast.Module):
+            index = self._symbols.module_mark_index
+        else:
+            index = self._symbols.pytestmark_index(node.body)
+        if not index:
+            return None, None
+        name = symbols.PYTESTMARK if qualname is None else '{}.{}'.format(qualname, symbols.PYTESTMARK)
+        lineno = min(expression.lineno for expressions in index.values() for expression in expressions)
+        return symbols.PytestMark(name, lineno), index
+
+    def _check_node(self, node, qualname, baseline_path, mark_index=None, inherited=frozenset()):
+        """Evaluate every rule of the marks applying to the file against a single test definition.
+
+        Args:
+            node (ast.stmt): The test definition, or a symbols.PytestMark to only check the values of the marks with
+                'allow_inherited' it assigns.
+            qualname (str): The dotted name of the test definition.
+            baseline_path (str): The path of the file relative to the baseline file. (None if no baseline is used)
+            mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark.
+            inherited (frozenset): The marks applied to the node by its module and its enclosing classes.
+
+        Yields:
+            tuple: (tuple, callable, str) the violation tuple for flake8, the rule function that produced it and the
+                name of the mark it was produced for
+        """
+
+        pytestmark = isinstance(node, symbols.PytestMark)
+        if pytestmark:
+            rule_funcs = (rules.rule_m3xx, rules.rule_m6xx, rules.rule_m7xx, rules.rule_m8xx, rules.rule_m9xx)
+        else:
+            rule_funcs = \
+                (rules.rule_m3xx, rules.rule_m5xx, rules.rule_m6xx, rules.rule_m7xx, rules.rule_m8xx, rules.rule_m9xx)
+        states = {} if self._file_counts is not None and not pytestmark else None     # { str('mark'): str('state') }
+        timed = self._counters is not None or self._tracer is not None or self._watchdog is not None
+
+        for rule_func in rule_funcs:
+            for rule_name, rule_conf in self._marks.items():
+                if pytestmark:
+                    if not self._get_value_default_to_false('allow_inherited', rule_conf):
+                        continue
+                # Skip nodes that fail process evaluation
+                elif not self._process_node_evaluation(rule_conf, node):
+                    if self._counters is not None:
+                        self._counters.nodes['rule evaluations skipped'] += 1
+                    continue
+
+                if states is not None:
+                    states.setdefault(rule_conf['name'], 'marked')
+
+                errors = rule_func(node=node,
+                                   rule_name=rule_name,
+                                   rule_conf=rule_conf,
+                                   class_type=type(self),
+                                   filename=self.filename,
+                                   mark_index=mark_index,
+                                   inherited_marks=inherited,
+                                   unique_values=self.context.unique_values,
+                                   allowlists=self.context.allowlists,
+                                   retired_values=self.context.retired_values)
+                if timed:
+                    errors = self._time_rule(rule_func, rule_conf['name'], errors)
+
+                for err in errors:
+                    if states is not None and rule_func in (rules.rule_m5xx, rules.rule_m6xx) and \
+                            states[rule_conf['name']] == 'marked':
+                        states[rule_conf['name']] = 'unmarked' if rule_func is rules.rule_m5xx else 'invalid'
+                    if baseline_path is not None:
+                        from flake8_pytest_mark import baseline
+                        fp = baseline.fingerprint(baseline_path, qualname, err[2].split(' ', 1)[0], rule_conf['name'])
+                        if self.context.update_baseline:
+                            session.emit('baseline', fp)
+                            continue
+                        if self._counters is not None:
+                            self._counters.baseline['lookups'] += 1
+                        if fp in self.context.baseline_fingerprints:
+                            if self._counters is not None:
+                                self._counters.baseline['hits'] += 1
                             continue
+                    yield err, rule_func, rule_conf['name']
+
+        if states is not None:
+            from flake8_pytest_mark import mark_stats
+            for mark, state in states.items():
+                mark_stats.count_node(self._file_counts, mark, state)
+
+    def _reported(self, err, mark=None):
+        """Write a violation to the structured report when one is requested.
+
+        Args:
+            err (tuple): (int, int, str, type) the violation tuple.
+            mark (str): The name of the mark the violation was reported for. (None for run violations)
+
+        Returns:
+            tuple: The violation tuple, unchanged.
+        """
+        if self._reporting:
+            from flake8_pytest_mark import report
+            session.emit('violation', report.build_record(self.filename, err, mark))
+        return err
+
+    def _time_rule(self, rule_func, mark, errors):
+        """Evaluate a rule while recording its duration for instrumentation, tracing and the slow file watchdog.
+
+        Args:
+            rule_func (callable): The rule function that created the generator.
+            mark (str): The name of the mark the rule is evaluated for.
+            errors (generator): The not yet started generator returned by the rule function.
+
+        Returns:
+            list: The violations produced by the rule.
+        """
+        start = time.time()
+        errors = list(errors)
+        end = time.time()
+        if self._counters is not None:
+            self._counters.add_rule(rule_func, mark, end - start, len(errors))
+        if self._tracer is not None:
+            self._tracer.add_rule(rule_func, mark, start, end, len(errors))
+        if self._watchdog is not None:
+            self._watchdog.add_rule(rule_func, mark, end - start)
+        return errors
+
+    @classmethod
+    def _walk_with_qualnames(cls, tree, symbols=None):
+        """Walk an AST in the same order as 'ast.walk' while tracking the dotted name of each definition and the marks
+        it inherits. The marks of the module and of every class are computed once, when the walk enters them.
 
-                        for err in rule_func(node=node,
-                                             rule_name=rule_name,
-                                             rule_conf=rule_conf,
-                                             class_type=type(self),
-                                             filename=self.filename):
-                            yield err
+        Args:
+            tree (ast.AST): The tree to walk.
+            symbols (symbols.SymbolTable): The table of the module, used to propagate the marks applied by 'pytestmark'
+                and class decorators. (None propagates nothing)
+
+        Yields:
+            tuple: (ast.AST, str, frozenset, dict) a node, its qualified name 'TestClass.test_method' (None for other
+                nodes), the marks inherited from the module and the enclosing classes and, for classes when marks are
+                propagated, their decorators grouped by mark (None otherwise)
+        """
+        todo = deque([(tree, '', symbols.module_marks if symbols is not None else frozenset())])
+        while todo:
+            node, prefix, inherited = todo.popleft()
+            qualname = None
+            index = None
+            contained = inherited
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                qualname = prefix + node.name
+                prefix = qualname + '.'
+                if symbols is not None and isinstance(node, ast.ClassDef):
+                    index = symbols.index(node.decorator_list)
+                    contained = inherited | symbols.class_marks(node, index)
+            todo.extend((child, prefix, contained) for child in ast.iter_child_nodes(node))
+            yield node, qualname, inherited, index
+
+    @classmethod
+    def get_node_kind(cls, node):
+        """Classify a test definition node.
+
+        Args:
+            node (ast.stmt): The node under evaluation.
+
+        Returns:
+            str: One of 'class', 'method' or 'function'.
+        """
+        if cls._is_class_def(node):
+            return 'class'
+        return 'method' if cls._is_method_def(node) else 'function'
+
+    @classmethod
+    def _load_changed_files(cls, ctx, base_ref, staged, index_path):
+        """Restrict checking to the files changed relative to a git ref and seed the unique value map with the mark
+        values of every unchanged file.
+
+        Args:
+            ctx (run_context.RunContext): The context of the run.
+            base_ref (str): The git ref to compare against.
+            staged (bool): Compare the staged set instead of a base ref.
+            index_path (str): An optional index file to load unchanged mark values from instead of git.
+        """
+        from flake8_pytest_mark import changed_files
+        root, ref, changed = changed_files.get_changed_files(base_ref, staged)
+        ctx.changed_files = frozenset(os.path.realpath(os.path.join(root, p)) for p in changed)
+
+        enforced = [(rule_name, rule_conf) for rule_name, rule_conf in ctx.pytest_marks.items()
+                    if cls._get_value_default_to_false('enforce_unique_value', rule_conf)]
+        if not enforced:
+            return
+
+        marks = set(rule_conf['name'] for _, rule_conf in enforced)
+        if index_path:
+            records = changed_files.read_index(index_path)
+        else:
+            records = changed_files.iter_mark_records_at_ref(root, ref, marks)
+
+        exclusion_keys = {'class': 'exclude_classes', 'method': 'exclude_methods', 'function': 'exclude_functions'}
+        for record in records:
+            if record.path in changed or record.mark not in marks:
+                continue
+            file_path = os.path.relpath(os.path.join(root, record.path))
+            if not file_path.startswith(os.pardir):
+                file_path = os.path.join(os.curdir, file_path)     # match the paths reported by flake8
+            for rule_name, rule_conf in ctx.resolve_marks(file_path)[1].items():
+                if rule_conf['name'] == record.mark and \
+                        cls._get_value_default_to_false('enforce_unique_value', rule_conf) and \
+                        not cls._get_value_default_to_false(exclusion_keys[record.kind], rule_conf):
+                    if rule_conf.get('unique_scope') == 'file':
+                        continue    # an unchanged file cannot collide with the changed ones
+                    try:
+                        scope_key = scopes.scope_key(rule_conf.get('unique_scope'), file_path)
+                    except ValueError:
+                        continue    # reported by the rule for the changed files
+                    ctx.unique_values.register(record.mark,
+                                               record.value,
+                                               rules._ValueInfo(record.name, record.lineno, file_path),
+                                               scope_key)
 
     @classmethod
     def _process_node_evaluation(cls, rule_conf, node):
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import hashlib
+import io
+import mmap
+import os
+import threading
+from flake8_pytest_mark import config
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+SET_INDEX_MAX_BYTES = 4 * 1024 * 1024   # smaller files are loaded in a frozenset, larger ones are searched on disk
+CACHE_SUFFIX = '.allowlist'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class SetIndex(object):
+    """An allowlist held in memory."""
+
+    def __init__(self, values):
+        """Create the index.
+
+        Args:
+            values (iterable): The allowed values.
+        """
+        self._values = frozenset(values)
+
+    def __contains__(self, value):
+        return value in self._values
+
+    def __len__(self):
+        return len(self._values)
+
+
+class SortedFileIndex(object):
+    """An allowlist searched in a memory mapped file of sorted, unique, newline terminated UTF-8 values. Opening it
+    costs the same whatever its size, and the pages of the file are shared by every process of the run.
+    """
+
+    def __init__(self, path):
+        """Map the file.
+
+        Args:
+            path (str): A file written by 'write_sorted'.
+        """
+        with io.open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, value):
+        """Binary search the lines of the file. O(log n) comparisons.
+
+        Args:
+            value (str): The value to look up.
+
+        Returns:
+            bool: True if the value is allowed.
+        """
+        target = value.encode('utf-8')
+        data = self._map
+        lo, hi = 0, len(data)   # lo always is the start of a line
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b'\n', lo, mid) + 1 or lo
+            end = data.find(b'\n', start)
+            line = data[start:end]
+            if line == target:
+                return True
+            if line < target:
+                lo = end + 1
+            else:
+                hi = start
+        return False
+
+    def __len__(self):
+        return self._map[:].count(b'\n')
+
+
+class AllowlistCache(object):
+    """The allowlists of a run, each loaded the first time a rule needs it. Subclasses cache other kinds of value files
+    by overriding '_load'.
+    """
+
+    def __init__(self, cache_dir=None):
+        """Create an empty cache.
+
+        Args:
+            cache_dir (str): Where sorted copies of large files are kept. (Defaults to the user cache directory)
+        """
+        self.cache_dir = cache_dir
+        self._indexes = {}      # { str('path'): the loaded index }
+        self._errors = {}       # { str('path'): str('why the file could not be loaded') }
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Get the index of a file, loading it if needed.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            tuple: (object, str) the index, or None and why the file could not be loaded
+        """
+        index = self._indexes.get(path)
+        if index is None and path not in self._errors:
+            with self._lock:
+                if path not in self._indexes and path not in self._errors:
+                    try:
+                        self._indexes[path] = self._load(path)
+                    except (IOError, OSError, UnicodeDecodeError) as e:
+                        self._errors[path] = str(e)
+            index = self._indexes.get(path)
+        return index, self._errors.get(path)
+
+    def _load(self, path):
+        """Load the index of a file.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            SetIndex or SortedFileIndex: The index.
+        """
+        return load_index(path, self.cache_dir)
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def load_index(path, cache_dir=None):
+    """Load an allowlist file, holding one value per line. Blank lines and lines starting with '#' are ignored.
+
+    Files up to 'SET_INDEX_MAX_BYTES' are loaded in a frozenset. Larger files are sorted once into the cache directory,
+    keyed by their path, size and modification time, and searched through a memory map.
+
+    Args:
+        path (str): The allowlist file.
+        cache_dir (str): Where sorted copies are kept. (Defaults to the user cache directory)
+
+    Returns:
+        SetIndex or SortedFileIndex: The index.
+
+    Raises:
+        IOError: The file cannot be read.
+    """
+    stat = os.stat(path)
+    if stat.st_size <= SET_INDEX_MAX_BYTES:
+        return SetIndex(read_values(path))
+
+    fields = (os.path.realpath(path), repr(stat.st_mtime), str(stat.st_size))
+    key = hashlib.sha1('\0'.join(fields).encode('utf-8')).hexdigest()
+    sorted_path = os.path.join(cache_dir or config._default_cache_dir(), key + CACHE_SUFFIX)
+    if not os.path.isfile(sorted_path):
+        values = read_values(path)
+        try:
+            write_sorted(sorted_path, values)
+        except (IOError, OSError):
+            return SetIndex(values)     # no cache directory, fall back to memory
+    return SortedFileIndex(sorted_path)
+
+
+def read_values(path):
+    """Read the values of an allowlist file.
+
+    Args:
+        path (str): The allowlist file.
+
+    Returns:
+        set: The values.
+    """
+    values = set()
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                values.add(line)
+    return values
+
+
+def write_sorted(path, values):
+    """Write values sorted by their UTF-8 bytes, one per line, atomically.
+
+    Args:
+        path (str): The file to write.
+        values (iterable): The unique values.
+    """
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.current_thread().ident)
+    with io.open(temp_path, 'wb') as f:
+        for value in sorted(value.encode('utf-8') for value in values):
+            f.write(value + b'\n')
+    os.rename(temp_path, path)
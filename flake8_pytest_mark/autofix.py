@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import difflib
+import fnmatch
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from collections import namedtuple
+from flake8_pytest_mark import MarkChecker, changed_files, rules, symbols
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+FilePlan = namedtuple('FilePlan', ['path', 'digest', 'slots', 'values', 'import_line', 'error'])
+# import_line: (int('line'), bool('followed by a definition')) where 'import pytest' is needed, otherwise None
+Slot = namedtuple('Slot', ['line', 'indent', 'mark', 'decorator', 'registry'])
+FixResult = namedtuple('FixResult', ['path', 'added', 'diff', 'error'])
+SOURCE_ENCODING = 'utf-8'
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def configure(argv=()):
+    """Configure 'MarkChecker' from the flake8 configuration of the current directory, leaving the reports,
+    inventories and baselines the configuration names untouched.
+
+    Args:
+        argv (iterable): Additional flake8 command line arguments, such as '--config'.
+
+    Returns:
+        optparse.Values: The parsed flake8 options.
+    """
+    return MarkChecker.configure(argv, outputs=False)
+
+
+def iter_python_files(paths, exclude=()):
+    """Expand files and directories to the Python files they contain, skipping the excluded ones like flake8 does.
+
+    Args:
+        paths (iterable): Files and directories.
+        exclude (iterable): Glob patterns matched against the base name and the path of files and directories.
+
+    Yields:
+        str: Every Python file, in a stable order.
+    """
+    def excluded(path):
+        path = os.path.normpath(path)
+        return any(fnmatch.fnmatch(os.path.basename(path), pattern) or fnmatch.fnmatch(path, pattern)
+                   for pattern in exclude)
+
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(name for name in dirnames if not excluded(os.path.join(directory, name)))
+            for name in sorted(filenames):
+                if name.endswith('.py') and not excluded(os.path.join(directory, name)):
+                    yield os.path.join(directory, name)
+
+
+def plan_file(path, context=None):
+    """Find the test definitions of a file missing a mark that can be generated, with a single parse. A mark can be
+    generated when it is validated with 'value_match=uuid' alone. The definitions are the ones 'rules.rule_m5xx'
+    reports.
+
+    Args:
+        path (str): The file.
+        context (run_context.RunContext): The context of the run. (Defaults to the one configured by 'configure')
+
+    Returns:
+        FilePlan: Where to insert marks and the values the file already uses for them.
+    """
+    context = context or MarkChecker.context
+    try:
+        with io.open(path, 'rb') as f:
+            content = f.read()
+        source = content.decode(SOURCE_ENCODING)
+        tree = ast.parse(content, path)
+    except (IOError, OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+        return FilePlan(path, None, [], {}, None, '{}: {}'.format(type(e).__name__, e))
+
+    _, applicable, error = context.resolve_marks(path)
+    if error:
+        return FilePlan(path, None, [], {}, None, error)
+    fixable = sorted((rule_name, rule_conf) for rule_name, rule_conf in applicable.items() if _is_generated(rule_conf))
+    if not fixable:
+        return FilePlan(path, None, [], {}, None, None)
+
+    table = symbols.SymbolTable(tree)
+    lines = source.splitlines(True)
+    prefix, import_line = _mark_prefix(tree, table)
+    inheriting = any(MarkChecker._get_value_default_to_false('allow_inherited', rule_conf) for _, rule_conf in fixable)
+    slots = []
+    values = {}
+    for node, _, inherited, mark_index in MarkChecker._walk_with_qualnames(tree, table if inheriting else None):
+        if inheriting and isinstance(node, (ast.Module, ast.ClassDef)):
+            # Values assigned by 'pytestmark' are claimed too.
+            pytestmark_index = table.module_mark_index if isinstance(node, ast.Module) else \
+                table.pytestmark_index(node.body)
+            for _, rule_conf in fixable:
+                for expression in pytestmark_index.get(rule_conf['name'], []):
+                    values.setdefault(rule_conf['name'], []).extend(rules._get_decorator_args(expression))
+        if type(node) not in (ast.FunctionDef, ast.ClassDef) or not MarkChecker.test_def_regex.match(node.name):
+            continue
+        if mark_index is None:
+            mark_index = table.index(node.decorator_list)
+        line = min([decorator.lineno for decorator in node.decorator_list] + [node.lineno]) - 1
+        indent = lines[line][:len(lines[line]) - len(lines[line].lstrip())]
+        for rule_name, rule_conf in fixable:
+            for decorator in mark_index.get(rule_conf['name'], []):
+                values.setdefault(rule_conf['name'], []).extend(rules._get_decorator_args(decorator))
+            if not MarkChecker._process_node_evaluation(rule_conf, node):
+                continue
+            if any(rules.rule_m5xx(node=node, rule_name=rule_name, rule_conf=rule_conf, class_type=MarkChecker,
+                                   mark_index=mark_index, inherited_marks=inherited)):
+                slots.append(Slot(line, indent, rule_conf['name'], '@{}.{}'.format(prefix, rule_conf['name']),
+                                  rule_conf.get('retired_values_file')))
+
+    digest = hashlib.sha1(content).hexdigest()
+    return FilePlan(path, digest, slots, values, import_line if slots else None, None)
+
+
+def index_values(paths, marks):
+    """Collect the values of marks used by files that are not fixed, so that generated values never collide with them.
+
+    Args:
+        paths (iterable): The files.
+        marks (set): The names of the marks.
+
+    Returns:
+        dict: { str('mark'): set('values') }
+    """
+    values = {}
+    for path in paths:
+        try:
+            with io.open(path, 'rb') as f:
+                source = f.read()
+        except (IOError, OSError):
+            continue    # reported by flake8 when the file is checked
+        for record in changed_files.iter_mark_records(source, path, marks):
+            values.setdefault(record.mark, set()).add(record.value)
+    return values
+
+
+def assign_values(plans, context=None, indexed=None):
+    """Generate a fresh UUID for every slot of the plans. A value is never one used by the planned files or by the
+    indexed files, one collected for the M3XX checks of the run in any 'unique_scope' partition or one listed in the
+    retired value registry of the mark.
+
+    Args:
+        plans (list): The FilePlan of every file.
+        context (run_context.RunContext): The context of the run. (Defaults to the one configured by 'configure')
+        indexed (dict): { str('mark'): set('values') } the values of the files that are not fixed, from
+            'index_values'. (Defaults to none)
+
+    Returns:
+        dict: { str('path'): list('values') } a value for every slot, in order.
+    """
+    context = context or MarkChecker.context
+    taken = {}      # { str('mark'): set('values') }
+    for mark, values in (indexed or {}).items():
+        taken.setdefault(mark, context.unique_values.claimed(mark)).update(values)
+    for plan in plans:
+        for mark, values in plan.values.items():
+            taken.setdefault(mark, context.unique_values.claimed(mark)).update(values)
+
+    assigned = {}
+    for plan in plans:
+        for slot in plan.slots:
+            used = taken.setdefault(slot.mark, context.unique_values.claimed(slot.mark))
+            retired = context.retired_values.get(slot.registry)[0] if slot.registry else None
+            value = str(uuid.uuid4())
+            while value in used or (retired is not None and value in retired):
+                value = str(uuid.uuid4())
+            used.add(value)
+            assigned.setdefault(plan.path, []).append(value)
+    return assigned
+
+
+def apply_plan(plan, values, dry_run=False):
+    """Insert the marks of a plan, rewriting the file once with its own line endings.
+
+    Args:
+        plan (FilePlan): The plan of the file.
+        values (list): The value of every slot, in order.
+        dry_run (bool): Only compute the diff, leave the file untouched.
+
+    Returns:
+        FixResult: The number of marks added and the unified diff of the change.
+    """
+    with io.open(plan.path, 'rb') as f:
+        content = f.read()
+    if hashlib.sha1(content).hexdigest() != plan.digest:
+        return FixResult(plan.path, 0, '', 'the file changed since it was planned')
+
+    lines = content.decode(SOURCE_ENCODING).splitlines(True)
+    newline = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+    insertions = {}     # { int('line'): list('inserted lines') }
+    for slot, value in zip(plan.slots, values):
+        decorator = u"{}{}('{}'){}".format(slot.indent, slot.decorator, value, newline)
+        insertions.setdefault(slot.line, []).append(decorator)
+    if plan.import_line is not None:
+        line, before_definition = plan.import_line
+        # Two blank lines keep a following definition separated like pycodestyle expects.
+        text = [u'import pytest' + newline] + [newline] * (2 if before_definition else 0)
+        insertions[line] = text + insertions.get(line, [])
+
+    fixed = []
+    for number, line in enumerate(lines):
+        fixed.extend(insertions.get(number, ()))
+        fixed.append(line)
+
+    diff = ''.join(difflib.unified_diff(lines, fixed, 'a/' + _diff_path(plan.path), 'b/' + _diff_path(plan.path)))
+    if not dry_run:
+        temp_path = '{}.{}.{}.tmp'.format(plan.path, os.getpid(), threading.current_thread().ident)
+        with io.open(temp_path, 'wb') as f:
+            f.write(u''.join(fixed).encode(SOURCE_ENCODING))
+        shutil.copymode(plan.path, temp_path)
+        os.rename(temp_path, plan.path)
+    return FixResult(plan.path, len(plan.slots), diff, None)
+
+
+def fix_files(paths, jobs=1, dry_run=False, argv=(), index_paths=()):
+    """Add the missing generated marks to many files. Files are planned in a process pool, values are then assigned
+    in this process so that they are unique across the run, and every file that needs marks is rewritten once by the
+    pool.
+
+    Args:
+        paths (iterable): The files to fix.
+        jobs (int): The number of processes. (1 fixes the files in this process)
+        dry_run (bool): Only compute the diffs, leave the files untouched.
+        argv (iterable): The flake8 arguments 'MarkChecker' was configured with, used to configure the workers.
+        index_paths (iterable): Files that are not fixed but whose values generated values must not collide with.
+
+    Returns:
+        list: The FixResult of every file that needs marks or could not be fixed, in the order of the paths.
+    """
+    paths = list(paths)
+    pool = multiprocessing.Pool(jobs, configure, (list(argv),)) if jobs > 1 and len(paths) > 1 else None
+    try:
+        mapper = pool.map if pool is not None else lambda func, items: list(map(func, items))
+        plans = mapper(plan_file, paths)
+        marks = set(slot.mark for plan in plans for slot in plan.slots)
+        values = assign_values(plans, indexed=index_values(index_paths, marks) if marks else None)
+        todo = [(plan, values[plan.path], dry_run) for plan in plans if plan.slots and plan.error is None]
+        applied = dict((result.path, result) for result in mapper(_apply_plan_args, todo))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    results = []
+    for plan in plans:
+        if plan.error is not None:
+            results.append(FixResult(plan.path, 0, '', plan.error))
+        elif plan.path in applied:
+            results.append(applied[plan.path])
+    return results
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _is_generated(rule_conf):
+    """Check if the values of a mark can be generated: UUIDs that no regex or allowlist constrains further.
+
+    Args:
+        rule_conf (dict): The configuration of the mark.
+
+    Returns:
+        bool: True if a fresh UUID is a valid value.
+    """
+    return rule_conf.get('value_match') == 'uuid' and 'value_regex' not in rule_conf and \
+        'value_allowlist_file' not in rule_conf
+
+
+def _mark_prefix(tree, table):
+    """Choose how inserted marks refer to 'pytest.mark', following the imports of the module.
+
+    Args:
+        tree (ast.Module): The module.
+        table (symbols.SymbolTable): The table of the module.
+
+    Returns:
+        tuple: (str, tuple) the expression of 'pytest.mark' and, if pytest must be imported, the line index to insert
+            'import pytest' at and whether it is followed by a definition (None if pytest is imported)
+    """
+    imported = set()
+    for statement in symbols._iter_module_statements(tree):
+        if isinstance(statement, ast.Import):
+            imported.update(alias.asname or alias.name for alias in statement.names if alias.name == symbols.PYTEST)
+    if symbols.PYTEST in imported:
+        return symbols.PYTEST + '.' + symbols.MARK, None
+    if imported:
+        return sorted(imported)[0] + '.' + symbols.MARK, None
+    if table.mark_generators:
+        return sorted(table.mark_generators)[0], None
+
+    # After the docstring and the future imports. Test definitions are module statements or nested in one, so a
+    # module needing marks always has such a statement.
+    for position, statement in enumerate(getattr(tree, 'body', [])):
+        docstring = position == 0 and isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Str)
+        future = isinstance(statement, ast.ImportFrom) and statement.module == '__future__'
+        if not docstring and not future:
+            line = min([d.lineno for d in getattr(statement, 'decorator_list', [])] + [statement.lineno]) - 1
+            return symbols.PYTEST + '.' + symbols.MARK, (line, isinstance(statement, (ast.FunctionDef, ast.ClassDef)))
+    return symbols.PYTEST + '.' + symbols.MARK, None
+
+
+def _apply_plan_args(args):
+    """Call 'apply_plan' with a tuple of arguments, as 'Pool.map' passes a single argument.
+
+    Args:
+        args (tuple): (FilePlan, list, bool) the arguments of 'apply_plan'.
+
+    Returns:
+        FixResult: The result of 'apply_plan'.
+    """
+    return apply_plan(*args)
+
+
+def _diff_path(path):
+    """Get the path shown in diffs, relative to the current directory with forward slashes.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        str: The path.
+    """
+    return os.path.relpath(path).replace(os.sep, '/')
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import errno
+import hashlib
+import io
+import os
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BASELINE_HEADER = '# flake8-pytest-mark baseline v1'
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def fingerprint(path, qualname, code, mark):
+    """Build a stable fingerprint for a violation that does not depend on line numbers.
+
+    Args:
+        path (str): The path of the file relative to the baseline file.
+        qualname (str): The dotted name of the test definition. 'TestClass.test_method'
+        code (str): The violation code. 'M501'
+        mark (str): The name of the mark the violation was reported for.
+
+    Returns:
+        str: A 16 character hexadecimal fingerprint.
+    """
+    key = u'\0'.join((path, qualname, code, mark)).encode('utf-8')
+    return hashlib.sha1(key).hexdigest()[:16]
+
+
+def relative_path(filename, baseline_file):
+    """Express a file path relative to the directory of the baseline file so fingerprints do not depend on where
+    flake8 was invoked from.
+
+    Args:
+        filename (str): The path of the file being checked.
+        baseline_file (str): The path of the baseline file.
+
+    Returns:
+        str: The relative path using forward slashes.
+    """
+    path = os.path.relpath(os.path.abspath(filename), os.path.dirname(os.path.abspath(baseline_file)))
+    return path.replace(os.sep, '/')
+
+
+def load_baseline(baseline_file):
+    """Load the fingerprints of a baseline file into a set. A missing baseline file is an empty baseline, so a run
+    configured with a baseline that was not written yet reports every violation.
+
+    Args:
+        baseline_file (str): The path of the baseline file.
+
+    Returns:
+        frozenset: The fingerprints of the known violations.
+
+    Raises:
+        IOError: The baseline file exists but could not be read.
+        UnicodeDecodeError: The baseline file is not a baseline.
+    """
+    try:
+        with io.open(baseline_file, encoding='ascii') as f:
+            return frozenset(line.rstrip() for line in f if not line.startswith('#'))
+    except (IOError, OSError) as e:
+        if e.errno == errno.ENOENT:
+            return frozenset()
+        raise
+
+
+def write_baseline(baseline_file, fingerprints):
+    """Write fingerprints to a baseline file sorted one per line.
+
+    Args:
+        baseline_file (str): The path of the baseline file.
+        fingerprints (iterable): The fingerprints of the known violations.
+    """
+    with io.open(baseline_file, 'w', encoding='ascii') as f:
+        f.write(u'{}\n'.format(BASELINE_HEADER))
+        for fp in sorted(set(fingerprints)):
+            f.write(u'{}\n'.format(fp))
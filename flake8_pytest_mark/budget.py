@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import time
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class RunBudget(object):
+    """Limits shared by every file checked during a single flake8 run.
+
+    The counters live in shared memory created by the main process, so they are shared with the worker processes
+    forked by flake8 when '--jobs' is used.
+    """
+
+    def __init__(self, max_violations=0, time_limit=0):
+        """Create the run budget. Must be called before flake8 forks its workers.
+
+        Args:
+            max_violations (int): The maximum number of violations to report for the run. (0 is unlimited)
+            time_limit (float): The number of seconds after which no more rules are evaluated. (0 is unlimited)
+        """
+        self.max_violations = max_violations
+        self.time_limit = time_limit
+        self._deadline = time.time() + time_limit if time_limit else None
+        import multiprocessing  # deferred, only runs with a budget need shared counters
+        self._violations = multiprocessing.Value('l', 0)
+        self._summary_reported = multiprocessing.Value('b', 0)
+
+    def out_of_time(self):
+        """Check whether the time budget has been spent.
+
+        Returns:
+            bool: True if the deadline has passed.
+        """
+        return self._deadline is not None and time.time() > self._deadline
+
+    def out_of_violations(self):
+        """Check whether the violation budget has been spent.
+
+        Returns:
+            bool: True if the maximum number of violations has already been reported.
+        """
+        return bool(self.max_violations) and self._violations.value >= self.max_violations
+
+    def consume(self):
+        """Account for a violation about to be reported.
+
+        Returns:
+            bool: True if the violation fits within the budget and may be reported.
+        """
+        if not self.max_violations:
+            return True
+        with self._violations.get_lock():
+            if self._violations.value >= self.max_violations:
+                return False
+            self._violations.value += 1
+            return True
+
+    def claim_summary(self):
+        """Claim the right to report the single summary violation of the run.
+
+        Returns:
+            bool: True for the first caller of the run, False for every later caller.
+        """
+        with self._summary_reported.get_lock():
+            claimed = not self._summary_reported.value
+            self._summary_reported.value = 1
+            return claimed
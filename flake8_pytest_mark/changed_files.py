@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import io
+import json
+import subprocess
+import threading
+from collections import namedtuple
+from flake8_pytest_mark import rules
+from flake8_pytest_mark.symbols import SymbolTable
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+MarkRecord = namedtuple('MarkRecord', ['mark', 'value', 'path', 'lineno', 'name', 'kind'])
+INDEX_HEADER = '# flake8-pytest-mark unique value index v1'
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def get_changed_files(base_ref=None, staged=False, cwd=None):
+    """Determine which files differ from a git ref.
+
+    When 'staged' is true the staged set is compared against 'HEAD', otherwise the working tree (including untracked
+    files) is compared against the merge base of 'base_ref' and 'HEAD'.
+
+    Args:
+        base_ref (str): The git ref to compare against. (Ignored when 'staged' is true)
+        staged (bool): Compare the staged set instead of a base ref.
+        cwd (str): A directory inside the git repository. (Defaults to the current working directory)
+
+    Returns:
+        tuple: (str, str, set) the repository root, the ref holding the content of unchanged files and the set of
+            changed paths relative to the repository root.
+    """
+    root = get_repo_root(cwd)
+    if staged:
+        ref = 'HEAD'
+        changed = _git_paths(['diff', '--cached', '--name-only', '-z'], root)
+    else:
+        ref = _git(['merge-base', base_ref, 'HEAD'], root).strip()
+        changed = _git_paths(['diff', '--name-only', '-z', ref], root)
+        changed.update(_git_paths(['ls-files', '--others', '--exclude-standard', '-z'], root))
+    return root, ref, changed
+
+
+def get_repo_root(cwd=None):
+    """Find the root of the git repository containing a directory.
+
+    Args:
+        cwd (str): A directory inside the git repository. (Defaults to the current working directory)
+
+    Returns:
+        str: The root of the repository.
+    """
+    return _git(['rev-parse', '--show-toplevel'], cwd).strip()
+
+
+def resolve_ref(root, ref):
+    """Resolve a git ref to a commit hash.
+
+    Args:
+        root (str): The root of the git repository.
+        ref (str): The git ref to resolve.
+
+    Returns:
+        str: The commit hash.
+    """
+    return _git(['rev-parse', '--verify', ref], root).strip()
+
+
+def iter_mark_records_at_ref(root, ref, marks=None):
+    """Extract the pytest mark values of every Python file stored at a git ref without checking it out.
+
+    The file contents are streamed through a single 'git cat-file --batch' process.
+
+    Args:
+        root (str): The root of the git repository.
+        ref (str): The git ref to read files from.
+        marks (set): Only extract values for these mark names. (Defaults to all marks)
+
+    Yields:
+        MarkRecord: A mark value found on a test definition.
+    """
+    paths = [p for p in _git_paths(['ls-tree', '-r', '--name-only', '-z', ref], root) if p.endswith('.py')]
+    needles = [b'pytest'] if marks is None else [('.' + m).encode('utf-8') for m in marks]
+    for path, content in _iter_blobs(root, ref, sorted(paths)):
+        # Skip parsing files that cannot possibly contain a relevant mark
+        if any(needle in content for needle in needles):
+            for record in iter_mark_records(content, path, marks):
+                yield record
+
+
+def iter_mark_records(source, path, marks=None):
+    """Extract the pytest mark values from the source of a single file.
+
+    Args:
+        source (str): The source code of the file.
+        path (str): The path to record for the file.
+        marks (set): Only extract values for these mark names. (Defaults to all marks)
+
+    Yields:
+        MarkRecord: A mark value found on a test definition.
+    """
+    # Imported here to avoid a circular import with the package module.
+    from flake8_pytest_mark import MarkChecker
+
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return
+
+    symbols = SymbolTable(tree)
+    for node in ast.walk(tree):
+        if type(node) in (ast.FunctionDef, ast.ClassDef) and MarkChecker.test_def_regex.match(node.name):
+            kind = MarkChecker.get_node_kind(node)
+            for decorator in node.decorator_list:
+                mark = symbols.resolve(decorator) if isinstance(decorator, ast.Call) else None
+                if mark is None or (marks is not None and mark not in marks):
+                    continue
+                for value in rules._get_decorator_args(decorator):
+                    yield MarkRecord(mark, value, path, node.lineno, node.name, kind)
+
+
+def write_index(path, records, ref=''):
+    """Write mark records to a sorted index file.
+
+    Args:
+        path (str): The path of the index file to write.
+        records (iterable): The MarkRecord objects to store.
+        ref (str): The git ref the records were extracted from.
+    """
+    lines = sorted(json.dumps(list(record)) for record in records)
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'{} ref={}\n'.format(INDEX_HEADER, ref))
+        for line in lines:
+            f.write(u'{}\n'.format(line))
+
+
+def read_index(path):
+    """Read mark records from an index file created by 'write_index'.
+
+    Args:
+        path (str): The path of the index file to read.
+
+    Yields:
+        MarkRecord: A mark value stored in the index.
+    """
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            yield MarkRecord(*json.loads(line))
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _git(args, cwd=None):
+    """Run a git command and return its output.
+
+    Args:
+        args (list): The arguments to pass to git.
+        cwd (str): The directory to run the command in.
+
+    Returns:
+        str: The decoded standard output of the command.
+    """
+    return subprocess.check_output(['git'] + args, cwd=cwd).decode('utf-8')
+
+
+def _git_paths(args, cwd=None):
+    """Run a git command that produces a NUL separated list of paths.
+
+    Args:
+        args (list): The arguments to pass to git. (Must include '-z')
+        cwd (str): The directory to run the command in.
+
+    Returns:
+        set: The paths reported by git.
+    """
+    return set(p for p in _git(args, cwd).split('\0') if p)
+
+
+def _iter_blobs(root, ref, paths):
+    """Read the contents of many files at a git ref with one batched 'git cat-file' process.
+
+    Args:
+        root (str): The root of the git repository.
+        ref (str): The git ref to read files from.
+        paths (list): Paths relative to the repository root.
+
+    Yields:
+        tuple: (str, bytes) the path and the contents of the file.
+    """
+    proc = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        for p in paths:
+            proc.stdin.write('{}:{}\n'.format(ref, p).encode('utf-8'))
+        proc.stdin.close()
+
+    # Requests are written from a separate thread so that a full output pipe can never deadlock the exchange.
+    writer = threading.Thread(target=feed)
+    writer.daemon = True
+    writer.start()
+    try:
+        for p in paths:
+            header = proc.stdout.readline().split()
+            if not header or header[-1] == b'missing':
+                continue
+            content = proc.stdout.read(int(header[2]))
+            proc.stdout.read(1)     # trailing newline
+            yield p, content
+    finally:
+        writer.join()
+        proc.stdout.close()
+        proc.wait()
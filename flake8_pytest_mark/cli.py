@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+from flake8_pytest_mark import changed_files, registry
+
+
+# ======================================================================================================================
+# Commands
+# ======================================================================================================================
+def build_index(args):
+    """Write the mark values of every Python file stored at a git ref to an index file.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    root = changed_files.get_repo_root()
+    ref = changed_files.resolve_ref(root, args.ref)
+    changed_files.write_index(args.output, changed_files.iter_mark_records_at_ref(root, ref), ref)
+    return 0
+
+
+def retire_values(args):
+    """Merge the values that are no longer used into a retired value registry.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    if args.since is None and args.values is None:
+        sys.stderr.write('retire-values: give --since, --values or both\n')
+        return 2
+    if args.since is not None and not args.mark:
+        sys.stderr.write('retire-values: --since needs the --mark to retire values of\n')
+        return 2
+
+    values = []
+    if args.since is not None:
+        root = changed_files.get_repo_root()
+        marks = set(args.mark)
+        current = set(record.value for record in changed_files.iter_mark_records_at_ref(root, args.ref, marks))
+        values.extend(record.value for record in changed_files.iter_mark_records_at_ref(root, args.since, marks)
+                      if record.value not in current)
+    if args.values == '-':
+        values.extend(line.decode('utf-8') if isinstance(line, bytes) else line for line in sys.stdin)
+    elif args.values is not None:
+        with io.open(args.values, encoding='utf-8') as f:
+            values.extend(f)
+
+    added = registry.append_values(args.registry, values)
+    print('{} values retired in {}'.format(added, args.registry))
+    return 0
+
+
+def fix(args):
+    """Add a generated value to every test definition missing a mark validated with 'value_match=uuid'.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        int: The exit code.
+    """
+    # Imported here, loading flake8's option machinery is only needed by this command.
+    from flake8_pytest_mark import autofix
+
+    argv = ['--config', args.config] if args.config else []
+    options = autofix.configure(argv)
+    paths = list(autofix.iter_python_files(args.paths or ['.'], options.exclude))
+    # The values of the files left out of a partial fix are still taken.
+    fixed = set(os.path.abspath(path) for path in paths)
+    index_paths = [path for path in autofix.iter_python_files(['.'], options.exclude)
+                   if os.path.abspath(path) not in fixed] if args.paths else []
+    results = autofix.fix_files(paths, jobs=args.jobs, dry_run=args.dry_run, argv=argv, index_paths=index_paths)
+
+    status = 0
+    added = 0
+    files = 0
+    for result in results:
+        if result.error is not None:
+            sys.stderr.write('{}: {}\n'.format(result.path, result.error))
+            status = 1
+            continue
+        added += result.added
+        files += 1
+        if args.dry_run:
+            sys.stdout.write(result.diff)
+    sys.stderr.write('{} {} marks to {} files\n'.format('Would add' if args.dry_run else 'Added', added, files))
+    return status
+
+
+# ======================================================================================================================
+# Main
+# ======================================================================================================================
+def main(argv=None):
+    """Entry point for the 'flake8-pytest-mark' command.
+
+    Args:
+        argv (list): The command line arguments. (Defaults to sys.argv)
+
+    Returns:
+        int: The exit code.
+    """
+    parser = argparse.ArgumentParser(prog='flake8-pytest-mark')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    index_parser = subparsers.add_parser('build-index',
+                                         help='index the mark values of a git ref for changed files mode')
+    index_parser.add_argument('-o', '--output', required=True, help='the index file to write')
+    index_parser.add_argument('--ref', default='HEAD', help='the git ref to index (default: HEAD)')
+    index_parser.set_defaults(func=build_index)
+
+    retire_parser = subparsers.add_parser('retire-values',
+                                          help='add values that may not be reused to a retired value registry')
+    retire_parser.add_argument('registry', help='the registry file to update, created if missing')
+    retire_parser.add_argument('--mark', action='append', default=[],
+                               help='the mark whose values are retired with --since, may be repeated')
+    retire_parser.add_argument('--since', help='retire the values used at this git ref but no longer used at --ref')
+    retire_parser.add_argument('--ref', default='HEAD', help='the git ref holding the current values (default: HEAD)')
+    retire_parser.add_argument('--values', help="a file of values to retire, one per line ('-' reads standard input)")
+    retire_parser.set_defaults(func=retire_values)
+
+    fix_parser = subparsers.add_parser('fix', help="add generated values for missing 'value_match=uuid' marks")
+    fix_parser.add_argument('paths', nargs='*', help='the files and directories to fix (default: .)')
+    fix_parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                            help='the number of processes (default: the number of CPUs)')
+    fix_parser.add_argument('--dry-run', action='store_true', help='print a unified diff instead of rewriting files')
+    fix_parser.add_argument('--config', help='the flake8 configuration file (default: found like flake8 does)')
+    fix_parser.set_defaults(func=fix)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
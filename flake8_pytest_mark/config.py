@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+from flake8 import utils
+from flake8_pytest_mark import scopes
+
+try:
+    import configparser
+except ImportError:     # pragma: no cover (Python 2)
+    import ConfigParser as configparser
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+ACCEPTABLE_PARAMS = ('name',
+                     'value_match',
+                     'value_regex',
+                     'value_allowlist_file',
+                     'retired_values_file',
+                     'allow_duplicate',
+                     'allow_multiple_args',
+                     'allow_inherited',
+                     'enforce_unique_value',
+                     'unique_scope',
+                     'exclude_classes',
+                     'exclude_methods',
+                     'exclude_functions',
+                     'include',
+                     'exclude')
+BOOLEAN_PARAMS = ('allow_duplicate',
+                  'allow_multiple_args',
+                  'allow_inherited',
+                  'enforce_unique_value',
+                  'exclude_classes',
+                  'exclude_methods',
+                  'exclude_functions')
+LIST_PARAMS = ('include', 'exclude')
+PATH_PARAMS = ('value_allowlist_file', 'retired_values_file')
+VALUE_MATCHES = ('uuid',)
+LEGACY_OPTION_REGEX = re.compile(r'^pytest_mark(\d+)$')
+LEGACY_FLAG_REGEX = re.compile(r'^--pytest-mark(\d+)(=|$)')     # deprecated, accepted until the next release
+PROGRAM_NAME = 'flake8'
+TABLE_NAME = 'flake8-pytest-mark'
+PYPROJECT = 'pyproject.toml'
+LOCAL_CONFIGS = ('setup.cfg', 'tox.ini', '.flake8')     # read in this order by flake8, later files win
+CACHE_VERSION = 1
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class ConfigError(ValueError):
+    """Raised when a structured configuration file is invalid."""
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def load_marks(options):
+    """Load every configured mark.
+
+    Marks come from the numbered 'pytest_markN' keys of the flake8 configuration, for any N, from the definitions of
+    the 'pytest_marks' option and from the '[tool.flake8-pytest-mark]' table of a TOML file. Marks without an explicit
+    number are numbered after the highest number used so far so that the violation codes of numbered marks never
+    change.
+
+    Args:
+        options (optparse.Values): The options parsed by flake8.
+
+    Returns:
+        dict: { str('pytest_markN'): dict('rule_conf') }
+
+    Raises:
+        ConfigError: The TOML configuration is invalid.
+    """
+    path = getattr(options, 'pytest_mark_config', '')
+    if not path and not getattr(options, 'isolated', False):
+        path = find_pyproject(os.getcwd())
+    structured = load_structured_marks(path) if path else []
+    marks = merge_marks({}, read_legacy_marks(options), getattr(options, 'pytest_marks', ''), structured, path)
+    return {'pytest_mark{}'.format(n): params for n, params in marks.items()}
+
+
+def merge_marks(inherited, legacy, definitions, structured, source):
+    """Merge the marks of a configuration over inherited marks. A mark replaces the inherited mark with the same
+    number and an empty numbered key removes it.
+
+    Args:
+        inherited (dict): { int('number'): dict('rule_conf') } the marks to start from.
+        legacy (dict): { int('number'): str('raw value') } the numbered 'pytest_markN' keys.
+        definitions (str): The value of the 'pytest_marks' option.
+        structured (list): [int('number') or None, dict('rule_conf')] the marks of a TOML file.
+        source (str): The TOML file, used in error messages.
+
+    Returns:
+        dict: { int('number'): dict('rule_conf') }
+
+    Raises:
+        ConfigError: A TOML mark reuses the number of a mark of the same configuration.
+    """
+    marks = dict(inherited)
+    own = set()
+    for number, value in legacy.items():
+        params = parse_params(utils.parse_comma_separated_list(value))
+        if params:
+            marks[number] = params
+            own.add(number)
+        else:
+            marks.pop(number, None)
+
+    number = max(marks) if marks else 0
+    for params in parse_mark_definitions(definitions):
+        number += 1
+        marks[number] = params
+        own.add(number)
+
+    for explicit, params in structured:
+        if explicit is not None:
+            if explicit in own:
+                raise ConfigError("{}: mark number {} is already used by pytest_mark{}".format(
+                    source, explicit, explicit))
+            marks[explicit] = params
+            own.add(explicit)
+    for explicit, params in structured:
+        if explicit is None:
+            number = max(marks) + 1 if marks else 1
+            marks[number] = params
+
+    return marks
+
+
+def parse_mark_definitions(value):
+    """Parse the value of the 'pytest_marks' option. Every 'name' parameter starts a new mark definition.
+
+    Args:
+        value (str): Comma or whitespace separated parameters. 'name=test_id,value_match=uuid name=jira'
+
+    Returns:
+        list: The parameters of every mark, in order.
+    """
+    definitions = []
+    for item in utils.parse_comma_separated_list(value):
+        if item.split('=', 1)[0].strip() == 'name' or not definitions:
+            definitions.append([])
+        definitions[-1].append(item)
+    return [params for params in (parse_params(items) for items in definitions) if params]
+
+
+def parse_params(items):
+    """Parse the parameters of a single mark, ignoring unknown ones. Path globs accumulate over repeated
+    'include' and 'exclude' parameters.
+
+    Args:
+        items (list): 'key=value' strings.
+
+    Returns:
+        dict: The accepted parameters.
+    """
+    params = {}
+    for item in items:
+        a = [s.strip() for s in item.split('=', 1)]
+        if len(a) == 2 and a[0] in LIST_PARAMS:
+            params.setdefault(a[0], []).append(a[1])
+        elif len(a) == 2 and a[0] in ACCEPTABLE_PARAMS:
+            params[a[0]] = a[1]
+    return params
+
+
+def read_legacy_marks(options):
+    """Read the numbered 'pytest_markN' keys from the configuration files used by flake8. They are not registered as
+    options, which removes the limit on their number. The deprecated '--pytest-markN' flags are applied on top.
+
+    Args:
+        options (optparse.Values): The options parsed by flake8.
+
+    Returns:
+        dict: { int('number'): str('raw value') }
+    """
+    values = {}
+    for parser in _flake8_config_parsers(options):
+        if not parser.has_section(PROGRAM_NAME):
+            continue
+        for key, value in parser.items(PROGRAM_NAME):
+            match = LEGACY_OPTION_REGEX.match(key.replace('-', '_'))
+            if match:
+                values[int(match.group(1))] = value
+    values.update(read_legacy_flags(options))
+    return values
+
+
+def read_legacy_flags(options):
+    """Read the deprecated '--pytest-markN' command line flags, which override the numbered keys of the
+    configuration files.
+
+    Args:
+        options (optparse.Values): The options parsed by flake8.
+
+    Returns:
+        dict: { int('number'): str('raw value') } the flags given on the command line.
+    """
+    values = {}
+    for key, value in vars(options).items():
+        match = LEGACY_OPTION_REGEX.match(key)
+        if match and value:
+            values[int(match.group(1))] = value
+    return values
+
+
+def legacy_flag_numbers(argv):
+    """Find the deprecated '--pytest-markN' flags given on a command line, so that only those are registered.
+
+    Args:
+        argv (iterable): The command line arguments.
+
+    Returns:
+        list: int('number') the numbers of the flags, in order.
+    """
+    return sorted(set(int(match.group(1)) for match in map(LEGACY_FLAG_REGEX.match, argv) if match))
+
+
+def read_directory_config(directory):
+    """Read the marks configured by a single directory, ignoring its parents. Used to resolve the configurations of
+    the sub projects of a monorepo.
+
+    Args:
+        directory (str): The directory.
+
+    Returns:
+        tuple: (dict('legacy'), str('definitions'), list('structured'), str('TOML file')) the arguments of
+            'merge_marks' after the inherited marks. (None if the directory configures no marks)
+
+    Raises:
+        ConfigError: The TOML configuration is invalid.
+    """
+    parser = configparser.RawConfigParser()
+    parser.read([os.path.join(directory, name) for name in LOCAL_CONFIGS])
+    legacy = {}
+    definitions = ''
+    if parser.has_section(PROGRAM_NAME):
+        for key, value in parser.items(PROGRAM_NAME):
+            key = key.replace('-', '_')
+            match = LEGACY_OPTION_REGEX.match(key)
+            if match:
+                legacy[int(match.group(1))] = value
+            elif key == 'pytest_marks':
+                definitions = value
+
+    path = os.path.join(directory, PYPROJECT)
+    structured = load_structured_marks(path) if os.path.isfile(path) else []
+    if not legacy and not definitions and not structured:
+        return None
+    return legacy, definitions, structured, path
+
+
+def find_pyproject(directory):
+    """Find the closest 'pyproject.toml' in a directory or its parents.
+
+    Args:
+        directory (str): The directory to start from.
+
+    Returns:
+        str: The path of the file. (None if there is none)
+    """
+    directory = os.path.abspath(directory)
+    while True:
+        path = os.path.join(directory, PYPROJECT)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def load_structured_marks(path, cache_dir=None):
+    """Load the marks of a TOML configuration file. The validated marks are cached on disk, keyed by the path, size
+    and modification time of the file, so that unchanged files are neither parsed nor validated again.
+
+    Args:
+        path (str): A 'pyproject.toml' or a dedicated TOML file.
+        cache_dir (str): The cache directory. (Defaults to 'flake8-pytest-mark' in the user cache directory)
+
+    Returns:
+        list: [int('number') or None, dict('rule_conf')] for every mark, in order.
+
+    Raises:
+        ConfigError: The file is invalid.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ConfigError('{}: {}'.format(path, e.strerror))
+    fields = (str(CACHE_VERSION), os.path.realpath(path), repr(stat.st_mtime), str(stat.st_size))
+    key = hashlib.sha1('\0'.join(fields).encode('utf-8')).hexdigest()
+    cache_path = os.path.join(cache_dir or _default_cache_dir(), '{}.json'.format(key))
+
+    try:
+        with io.open(cache_path, encoding='utf-8') as f:
+            return json.load(f)['marks']
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+
+    marks = compile_marks(_read_table(path), path)
+    _write_cache(cache_path, {'source': os.path.realpath(path), 'marks': marks})
+    return marks
+
+
+def compile_marks(table, source):
+    """Validate the '[tool.flake8-pytest-mark]' table and convert its marks to the format used by the rules.
+
+    Args:
+        table (dict): The parsed table. (None if the file has no table)
+        source (str): The file the table was read from, used in error messages.
+
+    Returns:
+        list: [int('number') or None, dict('rule_conf')] for every mark, in order.
+
+    Raises:
+        ConfigError: The table is invalid.
+    """
+    if table is None:
+        return []
+    unknown = sorted(set(table) - {'marks'})
+    if unknown:
+        raise ConfigError('{}: unknown keys in [tool.{}]: {}'.format(source, TABLE_NAME, ', '.join(unknown)))
+    marks = table.get('marks', [])
+    if not isinstance(marks, list) or not all(isinstance(mark, dict) for mark in marks):
+        raise ConfigError('{}: [tool.{}] marks must be an array of tables ([[tool.{}.marks]])'.format(
+            source, TABLE_NAME, TABLE_NAME))
+
+    compiled = []
+    for index, mark in enumerate(marks):
+        where = '{}: marks[{}]'.format(source, index)
+        unknown = sorted(set(mark) - set(ACCEPTABLE_PARAMS) - {'number'})
+        if unknown:
+            raise ConfigError('{}: unknown keys: {}'.format(where, ', '.join(unknown)))
+        if not isinstance(mark.get('name'), string_types) or not mark['name']:
+            raise ConfigError('{}: name must be a non empty string'.format(where))
+
+        number = mark.get('number')
+        if number is not None and (isinstance(number, bool) or not isinstance(number, int) or number < 1):
+            raise ConfigError('{}: number must be a positive integer'.format(where))
+        if 'value_match' in mark and mark['value_match'] not in VALUE_MATCHES:
+            raise ConfigError('{}: value_match must be one of {}'.format(where, ', '.join(VALUE_MATCHES)))
+        if 'unique_scope' in mark and mark['unique_scope'] not in scopes.SCOPES:
+            raise ConfigError('{}: unique_scope must be one of {}'.format(where, ', '.join(scopes.SCOPES)))
+        if 'value_regex' in mark:
+            try:
+                re.compile(mark['value_regex'])
+            except (TypeError, re.error) as e:
+                raise ConfigError('{}: value_regex is not a valid regular expression: {}'.format(where, e))
+        for key in PATH_PARAMS:
+            if key in mark:
+                if not isinstance(mark[key], string_types) or not mark[key]:
+                    raise ConfigError('{}: {} must be a non empty path'.format(where, key))
+                # Relative to the file holding the table, wherever flake8 runs from.
+                mark = dict(mark)
+                mark[key] = os.path.join(os.path.dirname(os.path.abspath(source)), mark[key])
+
+        rule_conf = {}
+        for key, value in mark.items():
+            if key in BOOLEAN_PARAMS:
+                if not isinstance(value, bool):
+                    raise ConfigError('{}: {} must be true or false'.format(where, key))
+                rule_conf[key] = 'true' if value else 'false'
+            elif key in LIST_PARAMS:
+                if isinstance(value, string_types):
+                    value = [value]
+                if not isinstance(value, list) or not all(isinstance(v, string_types) and v for v in value):
+                    raise ConfigError('{}: {} must be a path glob or an array of path globs'.format(where, key))
+                rule_conf[key] = value
+            elif key != 'number':
+                rule_conf[key] = value
+        compiled.append([number, rule_conf])
+
+    numbers = [number for number, _ in compiled if number is not None]
+    if len(numbers) != len(set(numbers)):
+        raise ConfigError('{}: mark numbers must be unique'.format(source))
+    return compiled
+
+
+def load_toml_parser():
+    """Import the first TOML parser available. Deferred until a TOML file holds a table, since most runs never read one.
+
+    Returns:
+        module: A module with a 'loads' function. (None if no parser is installed)
+    """
+    for name in ('tomllib', 'tomli', 'toml'):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    return None
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _flake8_config_parsers(options):
+    """Read the configuration files flake8 reads, found by flake8 itself so that the numbered keys always come from the
+    same files, with the same precedence, as every other option.
+
+    Args:
+        options (optparse.Values): The options parsed by flake8.
+
+    Returns:
+        list: configparser.RawConfigParser the files, from the lowest to the highest precedence.
+    """
+    config_file = getattr(options, 'config', None)
+    append_config = getattr(options, 'append_config', None) or []
+    isolated = getattr(options, 'isolated', False)
+    # Imported here, the discovery of configuration files is not part of flake8's public API and differs by version.
+    try:
+        from flake8.options.config import load_config   # flake8 >= 5
+    except ImportError:
+        load_config = None
+    if load_config is not None:
+        return [load_config(config_file, append_config, isolated=isolated)[0]]
+
+    from flake8.options.config import ConfigFileFinder
+    if isolated:
+        return []
+    if config_file:
+        parser = configparser.RawConfigParser()
+        parser.read(config_file)
+        return [parser]
+    # Local configuration overrides user configuration.
+    finder = ConfigFileFinder(PROGRAM_NAME, [], append_config)
+    return [finder.user_config(), finder.local_configs()]
+
+
+def _read_table(path):
+    """Read the '[tool.flake8-pytest-mark]' table of a TOML file. A dedicated file may also hold the table at its top
+    level.
+
+    Args:
+        path (str): The TOML file.
+
+    Returns:
+        dict: The table. (None if the file has no table)
+
+    Raises:
+        ConfigError: The file cannot be parsed.
+    """
+    with io.open(path, encoding='utf-8') as f:
+        text = f.read()
+    dedicated = os.path.basename(path) != PYPROJECT
+    if not dedicated and TABLE_NAME not in text:
+        return None     # most projects do not configure the plugin in pyproject.toml, no parser needed
+    toml_parser = load_toml_parser()
+    if toml_parser is None:
+        raise ConfigError("{}: reading TOML requires 'tomli' (pip install flake8-pytest-mark[toml])".format(path))
+
+    try:
+        document = toml_parser.loads(text)
+    except Exception as e:  # each TOML library raises its own error type
+        raise ConfigError('{}: {}'.format(path, e))
+
+    table = document.get('tool', {}).get(TABLE_NAME)
+    if table is None and dedicated:
+        table = document
+    return table
+
+
+def _default_cache_dir():
+    """Get the cache directory of the plug-in.
+
+    Returns:
+        str: The directory.
+    """
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), TABLE_NAME)
+
+
+def _write_cache(cache_path, document):
+    """Write a cache entry atomically, ignoring failures since the cache is only an optimization.
+
+    Args:
+        cache_path (str): The cache entry.
+        document (dict): The JSON serializable entry.
+    """
+    temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(cache_path)):
+            os.makedirs(os.path.dirname(cache_path))
+        with io.open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(u'{}\n'.format(json.dumps(document, sort_keys=True)))
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        pass
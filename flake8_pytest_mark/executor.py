@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import io
+from multiprocessing.pool import ThreadPool
+from flake8_pytest_mark import MarkChecker, scopes
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def check_file(path, context=None):
+    """Check a single file in this thread.
+
+    Args:
+        path (str): The file to check.
+        context (run_context.RunContext): The context of the run. (Defaults to the one configured by flake8)
+
+    Returns:
+        list: (int('line'), int('column'), str('message')) the violations, like flake8 reports them.
+    """
+    try:
+        with io.open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+    except (IOError, OSError) as e:
+        return [(0, 0, 'E902 {}: {}'.format(type(e).__name__, e))]
+    except (SyntaxError, ValueError) as e:
+        return [(getattr(e, 'lineno', 0) or 0, 0, 'E999 {}: {}'.format(type(e).__name__, e))]
+
+    checker = MarkChecker(tree, path, context=context)
+    return [(line, col, message) for line, col, message, _ in checker.run()]
+
+
+def check_files(paths, context=None, threads=1):
+    """Check files concurrently in this process with a pool of threads. Checkers only share the context of the run,
+    whose unique value store is safe to update from several threads. On interpreters with a global interpreter lock
+    the threads take turns, so this mainly serves services checking several runs in one process and free threaded
+    builds.
+
+    When unique marks are configured with a 'unique_scope' other than 'global', the files are checked a scope at a
+    time, several scopes in parallel, and the values of a scope are released as soon as its files are checked. The
+    store then holds the values of the scopes in progress instead of the values of the whole run.
+
+    Args:
+        paths (iterable): The files to check.
+        context (run_context.RunContext): The context of the run. (Defaults to the one configured by flake8)
+        threads (int): The number of threads. (1 checks the files in this thread)
+
+    Returns:
+        dict: { str('path'): list('violations') } as returned by 'check_file'.
+    """
+    paths = list(paths)
+    context = context or MarkChecker.context
+    groups = _group_by_scope(paths, context)
+
+    def check_group(group):
+        results = [check_file(path, context) for path in group]
+        _release_scopes(group, context)
+        return results
+
+    if threads <= 1:
+        results = [check_group(group) for group in groups]
+    else:
+        pool = ThreadPool(threads)
+        try:
+            # Small chunks keep the threads busy when file and scope sizes vary.
+            results = pool.map(check_group, groups, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    return {path: result for group, group_results in zip(groups, results)
+            for path, result in zip(group, group_results)}
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _scoped_marks(path, context):
+    """Select the unique marks applying to a file that are partitioned by scope.
+
+    Args:
+        path (str): The file.
+        context (run_context.RunContext): The context of the run.
+
+    Returns:
+        list: (str('mark'), str('scope')) the partitioned marks.
+    """
+    unique = [(rule_conf['name'], rule_conf.get('unique_scope')) for rule_conf in
+              context.resolve_marks(path)[1].values() if rule_conf.get('enforce_unique_value', '').lower() == 'true']
+    return [(mark, scope) for mark, scope in unique if scope in scopes.SCOPES and scope != scopes.GLOBAL]
+
+
+def _group_by_scope(paths, context):
+    """Group files by the widest scope their unique marks are partitioned by, so that every partition is only filled
+    by the files of one group. Without partitioned marks each file is a group, checked in any order.
+
+    Args:
+        paths (list): The files to check.
+        context (run_context.RunContext): The context of the run.
+
+    Returns:
+        list: list(str('path')) the groups, keeping the order of the files.
+    """
+    groups, by_key = [], {}
+    for path in paths:
+        scope = scopes.coarsest(scope for _, scope in _scoped_marks(path, context))
+        key = (path,) if scope is None else (scope, scopes.scope_key(scope, path))
+        group = by_key.get(key)
+        if group is None:
+            group = by_key[key] = []
+            groups.append(group)
+        group.append(path)
+    return groups
+
+
+def _release_scopes(group, context):
+    """Release the partitions filled by a group of files once they are all checked.
+
+    Args:
+        group (list): The files of a group created by '_group_by_scope'.
+        context (run_context.RunContext): The context of the run.
+    """
+    released = set()
+    for path in group:
+        for mark, scope in _scoped_marks(path, context):
+            key = (mark, scopes.scope_key(scope, path))
+            if key not in released:
+                released.add(key)
+                context.unique_values.release(*key)
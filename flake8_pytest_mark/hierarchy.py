@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import os
+import threading
+from collections import namedtuple
+from flake8_pytest_mark import config
+from flake8_pytest_mark import path_filters
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+RulePlan = namedtuple('RulePlan', ['marks', 'matcher', 'error', 'numbered'])
+# marks: { str('pytest_markN'): dict('rule_conf') }
+# matcher: path_filters.PathMatcher when marks are restricted by path, otherwise None
+# error: why the configuration of the directory could not be loaded, otherwise ''
+# numbered: { int('number'): dict('rule_conf') } the marks inherited by sub directories
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class ConfigHierarchy(object):
+    """Resolves the marks of every directory below the root from the nearest configurations, each directory inheriting
+    the marks of its parent and overriding them. Plans are cached per directory, so resolving the plan of a file is a
+    dictionary lookup once its directory has been seen, and directories without a configuration of their own share the
+    plan of their parent.
+    """
+
+    def __init__(self, pytest_marks, matcher=None, error='', root=None):
+        """Start from the marks configured for the root.
+
+        Args:
+            pytest_marks (dict): { str('pytest_markN'): dict('rule_conf') } the marks of the flake8 configuration.
+            matcher (path_filters.PathMatcher): The path filters of those marks. (None if they apply everywhere)
+            error (str): Why the root configuration could not be loaded.
+            root (str): The directory the flake8 configuration applies to. (Defaults to the working directory)
+        """
+        self.root = os.path.abspath(root or os.getcwd())
+        numbered = {int(config.LEGACY_OPTION_REGEX.match(name).group(1)): rule_conf
+                    for name, rule_conf in pytest_marks.items()}
+        self.root_plan = RulePlan(pytest_marks, matcher, error, numbered)
+        self._plans = {self.root: self.root_plan}     # { str('directory'): RulePlan }
+        self._lock = threading.RLock()  # plans of new directories are resolved by one thread at a time
+
+    def plan_for(self, filename):
+        """Get the plan of the directory of a file. Files outside the root use the root plan.
+
+        Args:
+            filename (str): The file as named by flake8.
+
+        Returns:
+            RulePlan: The plan.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        plan = self._plans.get(directory)
+        if plan is None:
+            with self._lock:
+                plan = self._plans.get(directory) or self._resolve(directory)
+        return plan
+
+    def _resolve(self, directory):
+        """Resolve and cache the plan of a directory and of its parents below the root.
+
+        Args:
+            directory (str): The absolute directory.
+
+        Returns:
+            RulePlan: The plan.
+        """
+        relative = os.path.relpath(directory, self.root)
+        if relative == os.curdir or relative.split(os.sep)[0] == os.pardir:
+            plan = self.root_plan
+        else:
+            parent = self._plans.get(os.path.dirname(directory)) or self._resolve(os.path.dirname(directory))
+            plan = parent
+            try:
+                own = config.read_directory_config(directory) if not parent.error else None
+                if own is not None:
+                    legacy, definitions, structured, source = own
+                    numbered = config.merge_marks(parent.numbered, legacy, definitions, structured, source)
+                    plan = self._compile(numbered, relative, parent.numbered)
+            except config.ConfigError as e:
+                plan = RulePlan({}, None, str(e), {})
+        self._plans[directory] = plan
+        return plan
+
+    def _compile(self, numbered, relative, inherited):
+        """Compile the plan of a directory with a configuration of its own.
+
+        Args:
+            numbered (dict): { int('number'): dict('rule_conf') } the merged marks.
+            relative (str): The directory relative to the root.
+            inherited (dict): { int('number'): dict('rule_conf') } the marks of the parent, whose path globs are
+                already relative to the root.
+
+        Returns:
+            RulePlan: The plan.
+        """
+        prefix = relative.replace(os.sep, '/') + '/'
+        rebased = {}
+        for number, rule_conf in numbered.items():
+            own = inherited.get(number) is not rule_conf
+            if own and any(key in rule_conf for key in config.LIST_PARAMS + config.PATH_PARAMS):
+                # Paths in a directory configuration are relative to the directory.
+                rule_conf = dict(rule_conf)
+                for key in config.LIST_PARAMS:
+                    if key in rule_conf:
+                        rule_conf[key] = [prefix + glob.lstrip('/') for glob in rule_conf[key]]
+                for key in config.PATH_PARAMS:
+                    if rule_conf.get(key):
+                        rule_conf[key] = os.path.join(self.root, relative, rule_conf[key])
+            rebased[number] = rule_conf
+        numbered = rebased
+
+        marks = {'pytest_mark{}'.format(number): rule_conf for number, rule_conf in numbered.items()}
+        matcher = None
+        if any('include' in rule_conf or 'exclude' in rule_conf for rule_conf in marks.values()):
+            matcher = path_filters.PathMatcher(marks, self.root)
+        return RulePlan(marks, matcher, '', numbered)
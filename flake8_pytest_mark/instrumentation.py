@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import os
+import sys
+from timeit import default_timer
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+NODE_COUNTERS = ('files', 'nodes visited', 'test definitions', 'rule evaluations skipped')
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class Counters(object):
+    """Timing and counters collected while checking a single file."""
+
+    def __init__(self):
+        """Create empty counters and start timing the file."""
+        self.nodes = dict.fromkeys(NODE_COUNTERS, 0)
+        self.nodes['files'] = 1
+        self.rules = {}     # { str('family'): { str('mark'): [int('calls'), float('seconds'), int('violations')] } }
+        self.reported = {}  # { str('family'): { str('mark'): int('violations') } } after baseline suppression
+        self.baseline = {'lookups': 0, 'hits': 0}
+        self._start = default_timer()
+
+    def add_rule(self, rule_func, mark, seconds, violations):
+        """Record a single evaluation of a rule.
+
+        Args:
+            rule_func (callable): The rule function that was evaluated.
+            mark (str): The name of the mark the rule was evaluated for.
+            seconds (float): The duration of the evaluation.
+            violations (int): The number of violations produced.
+        """
+        stats = self.rules.setdefault(rule_family(rule_func), {}).setdefault(mark, [0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += violations
+
+    def add_reported(self, rule_func, mark):
+        """Record a violation that is reported to flake8.
+
+        Args:
+            rule_func (callable): The rule function that produced the violation.
+            mark (str): The name of the mark the violation was reported for.
+        """
+        marks = self.reported.setdefault(rule_family(rule_func), {})
+        marks[mark] = marks.get(mark, 0) + 1
+
+    def as_record(self, unique_values=None):
+        """Stop timing the file and convert the counters to a JSON serializable record.
+
+        Args:
+            unique_values (dict): The number of unique values this process tracks per mark.
+
+        Returns:
+            dict: The counters of the file.
+        """
+        return {'seconds': default_timer() - self._start, 'nodes': self.nodes, 'rules': self.rules,
+                'reported': self.reported, 'baseline': self.baseline, 'unique_values': unique_values or {},
+                'pid': os.getpid()}
+
+
+class InstrumentationReport(object):
+    """Merges the counters of every file checked during a run and prints them in the style of 'flake8 --benchmark'."""
+
+    def __init__(self, stream=None):
+        """Create an empty report.
+
+        Args:
+            stream (file): The stream to print the report to. (Defaults to stdout)
+        """
+        self.stream = stream
+        self.seconds = 0.0
+        self.nodes = dict.fromkeys(NODE_COUNTERS, 0)
+        self.rules = {}
+
+    def add(self, record):
+        """Merge the counters of a single file.
+
+        Args:
+            record (dict): A record created by 'Counters.as_record'.
+        """
+        self.seconds += record['seconds']
+        for name, value in record['nodes'].items():
+            self.nodes[name] += value
+        for family, marks in record['rules'].items():
+            for mark, values in marks.items():
+                totals = self.rules.setdefault(family, {}).setdefault(mark, [0, 0.0, 0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+
+    def benchmarks(self):
+        """List the merged counters.
+
+        Returns:
+            list: (str, int or float) tuples of statistic name and value.
+        """
+        results = [('pytest-mark seconds', self.seconds)]
+        results.extend(('pytest-mark {}'.format(name), self.nodes[name]) for name in NODE_COUNTERS)
+        for family in sorted(self.rules):
+            marks = self.rules[family]
+            results.append(('pytest-mark {} seconds'.format(family), sum(v[1] for v in marks.values())))
+            for mark in sorted(marks):
+                calls, seconds, violations = marks[mark]
+                results.append(('pytest-mark {}[{}] calls'.format(family, mark), calls))
+                results.append(('pytest-mark {}[{}] seconds'.format(family, mark), seconds))
+                results.append(('pytest-mark {}[{}] violations'.format(family, mark), violations))
+        return results
+
+    def report(self):
+        """Print the merged counters using the same formats as 'flake8 --benchmark'."""
+        stream = self.stream or sys.stdout
+        for statistic, value in self.benchmarks():
+            if isinstance(value, float):
+                stream.write(u'{value:<10.3} {statistic}\n'.format(value=value, statistic=statistic))
+            else:
+                stream.write(u'{value:<10} {statistic}\n'.format(value=value, statistic=statistic))
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def rule_family(rule_func):
+    """Get the rule family of a rule function.
+
+    Args:
+        rule_func (callable): A rule function. 'rule_m5xx'
+
+    Returns:
+        str: The rule family. 'm5xx'
+    """
+    return rule_func.__name__.replace('rule_', '', 1)
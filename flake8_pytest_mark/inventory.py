@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import json
+from flake8_pytest_mark import rules
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class InventoryWriter(object):
+    """Streams inventory records to a JSON lines file as they are received."""
+
+    def __init__(self, path):
+        """Open the inventory file for writing, truncating any previous inventory.
+
+        Args:
+            path (str): The path of the inventory file.
+        """
+        self._file = io.open(path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        """Write a single inventory record.
+
+        Args:
+            record (dict): A record created by 'build_record'.
+        """
+        self._file.write(u'{}\n'.format(json.dumps(record, sort_keys=True)))
+
+    def close(self):
+        """Close the inventory file."""
+        self._file.close()
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def build_record(node, qualname, kind, filename, marks, mark_index=None):
+    """Describe a test definition and the values of every configured mark applied to it.
+
+    Args:
+        node (ast.stmt): The test definition.
+        qualname (str): The dotted name of the test definition.
+        kind (str): One of 'class', 'method' or 'function'.
+        filename (str): The name of the file containing the test definition.
+        marks (iterable): The names of the configured marks.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark. (Defaults
+            to resolving the decorators of the node)
+
+    Returns:
+        dict: The inventory record. Marks that are not applied have a value of None.
+    """
+    mark_values = {}
+    for mark in marks:
+        decorators = rules._marked_decorators(node, mark, mark_index)
+        if decorators:
+            mark_values[mark] = [value for decorator in decorators for value in rules._get_decorator_args(decorator)]
+        else:
+            mark_values[mark] = None
+    return {'path': filename, 'qualname': qualname, 'kind': kind, 'line': node.lineno, 'marks': mark_values}
+
+
+def build_stopped_record(filename, code, lineno):
+    """Describe where a budget stopped checking a file, so consumers know the records of the file are incomplete.
+
+    Args:
+        filename (str): The name of the file.
+        code (str): The code of the budget violation. ('M402', 'M403' or 'M404')
+        lineno (int): The line checking stopped at.
+
+    Returns:
+        dict: The record marking the end of the truncated inventory of the file.
+    """
+    return {'path': filename, 'line': lineno, 'stopped': code}
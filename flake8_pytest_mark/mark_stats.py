@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import json
+import os
+import sys
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+STATES = ('marked', 'unmarked', 'invalid')
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class DirectoryTree(object):
+    """A prefix tree of directories holding the mark coverage counts of everything below each directory."""
+
+    def __init__(self, name='.'):
+        """Create an empty tree node.
+
+        Args:
+            name (str): The path of the directory represented by the node.
+        """
+        self.name = name
+        self.children = {}
+        self.counts = {}    # { str('mark'): [int('marked'), int('unmarked'), int('invalid')] }
+
+    def add(self, directory, counts):
+        """Add the counts of a single file to its directory and every parent directory.
+
+        Args:
+            directory (str): The directory containing the file.
+            counts (dict): The counts of the file in the same format as the 'counts' attribute.
+        """
+        node = self
+        node._merge(counts)
+        for part in [p for p in os.path.normpath(directory).split(os.sep) if p not in ('', '.')]:
+            if part not in node.children:
+                path = part if node.name == '.' else '/'.join((node.name, part))
+                node.children[part] = DirectoryTree(path)
+            node = node.children[part]
+            node._merge(counts)
+
+    def walk(self):
+        """Iterate over the tree depth first in sorted order.
+
+        Yields:
+            DirectoryTree: Every node in the tree.
+        """
+        yield self
+        for name in sorted(self.children):
+            for node in self.children[name].walk():
+                yield node
+
+    def _merge(self, counts):
+        """Add counts to this node.
+
+        Args:
+            counts (dict): Counts in the same format as the 'counts' attribute.
+        """
+        for mark, values in counts.items():
+            totals = self.counts.setdefault(mark, [0] * len(STATES))
+            for i, value in enumerate(values):
+                totals[i] += value
+
+
+class StatisticsCollector(object):
+    """Aggregates the per file mark coverage counts sent by the workers and reports them at the end of the run."""
+
+    def __init__(self, path, output_format='table'):
+        """Create the collector.
+
+        Args:
+            path (str): The file to write the report to. ('-' writes to stdout)
+            output_format (str): Either 'table' or 'json'.
+        """
+        self.path = path
+        self.output_format = output_format
+        self.tree = DirectoryTree()
+        self.stopped = {}   # { str('budget violation code'): int('files') } files only partially counted
+
+    def add(self, record):
+        """Handle the counts of a single file.
+
+        Args:
+            record (dict): {'directory': str, 'counts': dict, 'stopped': str} as sent by the worker. ('stopped' is the
+                code of the budget violation that stopped checking the file, None when it was checked completely)
+        """
+        self.tree.add(record['directory'], record['counts'])
+        if record.get('stopped'):
+            self.stopped[record['stopped']] = self.stopped.get(record['stopped'], 0) + 1
+
+    def report(self):
+        """Write the report."""
+        if self.path == '-':
+            self._write(sys.stdout)
+        else:
+            with io.open(self.path, 'w', encoding='utf-8') as f:
+                self._write(f)
+
+    def _write(self, stream):
+        """Write the report to a stream.
+
+        Args:
+            stream (file): A text stream.
+        """
+        if self.output_format == 'json':
+            directories = {}
+            for node in self.tree.walk():
+                directories[node.name] = {mark: dict(zip(STATES, values)) for mark, values in node.counts.items()}
+            statistics = {'directories': directories}
+            if self.stopped:
+                statistics['stopped'] = self.stopped
+            stream.write(u'{}\n'.format(json.dumps(statistics, sort_keys=True)))
+            return
+
+        row = u'{:<40} {:<20} {:>8} {:>8} {:>8} {:>8}\n'
+        stream.write(row.format('directory', 'mark', *(STATES + ('coverage',))))
+        for node in self.tree.walk():
+            for mark in sorted(node.counts):
+                marked, unmarked, invalid = node.counts[mark]
+                total = marked + unmarked + invalid
+                coverage = u'{:.1f}%'.format(100.0 * marked / total) if total else u'-'
+                stream.write(row.format(node.name, mark, marked, unmarked, invalid, coverage))
+        for code in sorted(self.stopped):
+            stream.write(u'partial: {} stopped checking {} file(s) early\n'.format(code, self.stopped[code]))
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def count_node(file_counts, mark, state):
+    """Count a test definition for a mark.
+
+    Args:
+        file_counts (dict): The counts of the file.
+        mark (str): The name of the mark.
+        state (str): One of 'marked', 'unmarked' or 'invalid'.
+    """
+    file_counts.setdefault(mark, [0] * len(STATES))[STATES.index(state)] += 1
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import os
+import time
+from flake8_pytest_mark.instrumentation import InstrumentationReport
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+PREFIX = 'flake8_pytest_mark'
+FILE_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class MetricsWriter(InstrumentationReport):
+    """Merges the counters of every file checked during a run and writes them as a Prometheus text file (suitable for
+    the node exporter textfile collector).
+    """
+
+    def __init__(self, path, seeded_unique_values=None):
+        """Create an empty set of metrics. The run duration is measured from the creation of the writer.
+
+        Args:
+            path (str): The path of the metrics file.
+            seeded_unique_values (dict): { str('mark'): int('count') } the values seeded by changed files mode before
+                the workers started, which the records of the workers leave out. (Defaults to none)
+        """
+        super(MetricsWriter, self).__init__()
+        self.path = path
+        self.started = time.time()
+        self.reported = {}
+        self.baseline = {'lookups': 0, 'hits': 0}
+        self.seeded_unique_values = seeded_unique_values or {}
+        self.unique_values = {}     # { int('pid'): { str('mark'): int('count') } } claimed by the process itself
+        self.buckets = [0] * len(FILE_DURATION_BUCKETS)
+
+    def add(self, record):
+        """Merge the counters of a single file.
+
+        Args:
+            record (dict): A record created by 'Counters.as_record'.
+        """
+        super(MetricsWriter, self).add(record)
+        for family, marks in record['reported'].items():
+            for mark, count in marks.items():
+                totals = self.reported.setdefault(family, {})
+                totals[mark] = totals.get(mark, 0) + count
+        for name, value in record['baseline'].items():
+            self.baseline[name] += value
+        # Each record holds the values a process tracks after checking a file, less the values released once their
+        # scope was checked, so the latest record of each process holds its current size.
+        self.unique_values[record['pid']] = record['unique_values']
+        for i, bound in enumerate(FILE_DURATION_BUCKETS):
+            if record['seconds'] <= bound:
+                self.buckets[i] += 1
+
+    def write(self):
+        """Write the metrics file atomically so that a collector never reads a partial file."""
+        temp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        with io.open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(u''.join(self.lines()))
+        os.rename(temp_path, self.path)
+
+    def lines(self):
+        """Render the metrics in the Prometheus text format.
+
+        Returns:
+            list: The lines of the metrics file.
+        """
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(u'# HELP {}_{} {}\n'.format(PREFIX, name, help_text))
+            lines.append(u'# TYPE {}_{} {}\n'.format(PREFIX, name, metric_type))
+            for suffix, labels, value in samples:
+                lines.append(u'{}_{}{}{} {}\n'.format(PREFIX, name, suffix, _format_labels(labels), value))
+
+        metric('files_total', 'counter', 'Files checked.', [('', {}, self.nodes['files'])])
+        metric('nodes_visited_total', 'counter', 'AST nodes visited.', [('', {}, self.nodes['nodes visited'])])
+        metric('test_definitions_total', 'counter', 'Test definitions checked.',
+               [('', {}, self.nodes['test definitions'])])
+        metric('violations_total', 'counter', 'Violations reported by rule family and mark.',
+               [('', {'family': family, 'mark': mark}, count)
+                for family in sorted(self.reported) for mark, count in sorted(self.reported[family].items())])
+        metric('rule_seconds_total', 'counter', 'Time spent evaluating rules by rule family and mark.',
+               [('', {'family': family, 'mark': mark}, repr(values[1]))
+                for family in sorted(self.rules) for mark, values in sorted(self.rules[family].items())])
+
+        unique_values = dict(self.seeded_unique_values)
+        for marks in self.unique_values.values():
+            for mark, count in marks.items():
+                unique_values[mark] = unique_values.get(mark, 0) + count
+        metric('unique_values', 'gauge', 'Mark values tracked for uniqueness, summed over worker processes.',
+               [('', {'mark': mark}, count) for mark, count in sorted(unique_values.items())])
+
+        metric('baseline_lookups_total', 'counter', 'Violations looked up in the baseline.',
+               [('', {}, self.baseline['lookups'])])
+        metric('baseline_hits_total', 'counter', 'Violations suppressed by the baseline.',
+               [('', {}, self.baseline['hits'])])
+        hit_ratio = float(self.baseline['hits']) / self.baseline['lookups'] if self.baseline['lookups'] else 0.0
+        metric('baseline_hit_ratio', 'gauge', 'Fraction of violations suppressed by the baseline.',
+               [('', {}, repr(hit_ratio))])
+
+        histogram = [('_bucket', {'le': repr(bound)}, count)
+                     for bound, count in zip(FILE_DURATION_BUCKETS, self.buckets)]
+        histogram.append(('_bucket', {'le': '+Inf'}, self.nodes['files']))
+        histogram.append(('_sum', {}, repr(self.seconds)))
+        histogram.append(('_count', {}, self.nodes['files']))
+        metric('file_duration_seconds', 'histogram', 'Time spent checking each file.', histogram)
+
+        metric('run_duration_seconds', 'gauge', 'Wall clock duration of the run.',
+               [('', {}, repr(time.time() - self.started))])
+        metric('last_run_timestamp_seconds', 'gauge', 'Time the run finished.', [('', {}, repr(time.time()))])
+        return lines
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _format_labels(labels):
+    """Format a label set.
+
+    Args:
+        labels (dict): The label names and values.
+
+    Returns:
+        str: The formatted label set. '{family="m5xx",mark="test_id"}' (empty if there are no labels)
+    """
+    if not labels:
+        return u''
+    escaped = [u'{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in sorted(labels.items())]
+    return u'{' + u','.join(escaped) + u'}'
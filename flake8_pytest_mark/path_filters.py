@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import os
+import re
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+GLOB_CHARACTERS = re.compile(r'[*?\[]')
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class PathTrie(object):
+    """A prefix tree of the literal leading directories of path globs. Only the globs stored along the path of a file
+    need to be evaluated for that file.
+    """
+
+    def __init__(self):
+        """Create an empty tree node."""
+        self.children = {}
+        self.entries = []   # [ (str('rule_name'), bool('include'), compiled regex or None for a literal prefix) ]
+
+    def add(self, components, entry):
+        """Store an entry under a literal prefix.
+
+        Args:
+            components (list): The literal leading path components of the glob.
+            entry (tuple): The entry to store.
+        """
+        node = self
+        for component in components:
+            node = node.children.setdefault(component, PathTrie())
+        node.entries.append(entry)
+
+    def candidates(self, components):
+        """Collect the entries whose literal prefix is a prefix of a path.
+
+        Args:
+            components (list): The components of the path.
+
+        Yields:
+            tuple: Every candidate entry.
+        """
+        node = self
+        for entry in node.entries:
+            yield entry
+        for component in components:
+            node = node.children.get(component)
+            if node is None:
+                return
+            for entry in node.entries:
+                yield entry
+
+
+class PathMatcher(object):
+    """Selects the marks that apply to a file from their 'include' and 'exclude' path globs."""
+
+    def __init__(self, pytest_marks, root=None):
+        """Compile the path globs of every mark.
+
+        Args:
+            pytest_marks (dict): { str('pytest_markN'): dict('rule_conf') }
+            root (str): The directory globs are relative to. (Defaults to the working directory)
+        """
+        self.root = os.path.abspath(root or os.getcwd())
+        self.pytest_marks = pytest_marks
+        self.universal = {}     # marks applying to every file
+        self.included = set()   # marks restricted to the files matching one of their include globs
+        self.trie = PathTrie()
+
+        for rule_name, rule_conf in pytest_marks.items():
+            includes = rule_conf.get('include') or []
+            excludes = rule_conf.get('exclude') or []
+            if not includes and not excludes:
+                self.universal[rule_name] = rule_conf
+                continue
+            if includes:
+                self.included.add(rule_name)
+            for include, globs in ((True, includes), (False, excludes)):
+                for glob in globs:
+                    prefix, regex = compile_glob(glob)
+                    self.trie.add(prefix, (rule_name, include, regex))
+
+    def marks_for(self, filename):
+        """Select the marks that apply to a file.
+
+        Args:
+            filename (str): The file as named by flake8.
+
+        Returns:
+            dict: { str('pytest_markN'): dict('rule_conf') } restricted to the applicable marks.
+        """
+        path = relative_path(filename, self.root)
+        included = set()
+        excluded = set()
+        for rule_name, include, regex in self.trie.candidates(path.split('/')):
+            if regex is None or regex.match(path):
+                (included if include else excluded).add(rule_name)
+
+        marks = dict(self.universal)
+        for rule_name, rule_conf in self.pytest_marks.items():
+            if rule_name in self.universal or rule_name in excluded:
+                continue
+            if rule_name in included or rule_name not in self.included:
+                marks[rule_name] = rule_conf
+        return marks
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def compile_glob(glob):
+    """Split a path glob into its literal leading directories and a regex for the rest. A glob also matches every
+    path below the paths it matches, so 'integration' and 'integration/*' both cover 'integration/api/test_a.py'.
+
+    Args:
+        glob (str): A '/' separated glob supporting '*', '?', '[...]' and '**' for any number of directories.
+
+    Returns:
+        tuple: (list('literal components'), compiled regex or None when the glob is a literal path)
+    """
+    components = [c for c in glob.replace(os.sep, '/').strip('/').split('/') if c not in ('', '.')]
+    prefix = []
+    while components and not GLOB_CHARACTERS.search(components[0]):
+        prefix.append(components.pop(0))
+    if not components:
+        return prefix, None
+
+    pattern = ''.join(re.escape(c) + '/' for c in prefix)
+    for i, component in enumerate(components):
+        last = i == len(components) - 1
+        if component == '**':
+            pattern += '.*' if last else '(?:[^/]+/)*'
+        else:
+            pattern += _translate_component(component) + ('' if last else '/')
+    return prefix, re.compile('^{}(?:/.*)?$'.format(pattern))
+
+
+def relative_path(filename, root):
+    """Express a file relative to the root of the globs.
+
+    Args:
+        filename (str): The file as named by flake8. './integration/test_a.py'
+        root (str): The absolute directory globs are relative to.
+
+    Returns:
+        str: The '/' separated relative path. 'integration/test_a.py'
+    """
+    return os.path.relpath(os.path.abspath(filename), root).replace(os.sep, '/')
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _translate_component(component):
+    """Translate a single path component glob to a regex that does not cross directories.
+
+    Args:
+        component (str): The glob of a path component. 'test_*.py'
+
+    Returns:
+        str: The regex.
+    """
+    pattern = ''
+    i = 0
+    while i < len(component):
+        c = component[i]
+        i += 1
+        if c == '*':
+            pattern += '[^/]*'
+        elif c == '?':
+            pattern += '[^/]'
+        elif c == '[':
+            end = component.find(']', i + 1)
+            if end == -1:
+                pattern += re.escape(c)
+            else:
+                body = component[i:end]
+                pattern += '[^{}]'.format(body[1:]) if body.startswith('!') else '[{}]'.format(body)
+                i = end + 1
+        else:
+            pattern += re.escape(c)
+    return pattern
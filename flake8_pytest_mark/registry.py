@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import hashlib
+import heapq
+import io
+import math
+import os
+import struct
+import threading
+from flake8_pytest_mark import allowlist, config
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+BLOOM_MAGIC = b'FPMBLOOM'
+BLOOM_HEADER = struct.Struct('<8sQI?')     # magic, size in bits, hash count, whether a sorted copy was written
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_SUFFIX = '.bloom'
+SORTED_SUFFIX = '.sorted'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class BloomFilter(object):
+    """A set of values answering 'maybe present' or 'certainly absent' with a fixed number of bits per value."""
+
+    def __init__(self, size, hashes, bits=None):
+        """Create a filter.
+
+        Args:
+            size (int): The number of bits.
+            hashes (int): The number of bits set per value.
+            bits (bytearray): The bits of a filter read from a file. (Defaults to all bits cleared)
+        """
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray((size + 7) // 8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, count, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+        """Create a filter sized for a number of values.
+
+        Args:
+            count (int): The number of values the filter will hold.
+            false_positive_rate (float): The fraction of absent values reported as maybe present.
+
+        Returns:
+            BloomFilter: The empty filter.
+        """
+        count = max(count, 1)
+        size = max(int(math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2)), 8)
+        return cls(size, max(int(round(size / float(count) * math.log(2))), 1))
+
+    def add(self, value):
+        """Add a value.
+
+        Args:
+            value (str): The value.
+        """
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def write(self, path, sorted_copy):
+        """Write the filter atomically.
+
+        Args:
+            path (str): The file to write.
+            sorted_copy (bool): Whether the values were sorted into a copy next to the filter.
+        """
+        temp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.current_thread().ident)
+        with io.open(temp_path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.size, self.hashes, sorted_copy))
+            f.write(bytes(self.bits))
+        os.rename(temp_path, path)
+
+    @classmethod
+    def read(cls, path):
+        """Read a filter written by 'write'.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            tuple: (BloomFilter, bool) the filter, or None if the file is not a filter, and whether the values were
+                sorted into a copy
+        """
+        with io.open(path, 'rb') as f:
+            header = f.read(BLOOM_HEADER.size)
+            if len(header) != BLOOM_HEADER.size:
+                return None, False
+            magic, size, hashes, sorted_copy = BLOOM_HEADER.unpack(header)
+            bits = bytearray(f.read())
+        if magic != BLOOM_MAGIC or len(bits) != (size + 7) // 8:
+            return None, False
+        return cls(size, hashes, bits), sorted_copy
+
+    def _positions(self, value):
+        """Get the bits of a value by double hashing a single digest.
+
+        Args:
+            value (str): The value.
+
+        Returns:
+            list: The bit positions.
+        """
+        first, second = struct.unpack('<QQ', hashlib.md5(value.encode('utf-8')).digest())
+        second |= 1     # odd, so the positions do not repeat when the size is even
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+
+class RetiredRegistry(object):
+    """The values retired from a mark, looked up in a Bloom filter first. Only the values the filter cannot rule out,
+    the retired ones and about one percent of the others, are searched for in the sorted registry.
+    """
+
+    def __init__(self, bloom, sorted_path):
+        """Create the registry.
+
+        Args:
+            bloom (BloomFilter): The filter holding every retired value.
+            sorted_path (str): The retired values, sorted and unique, mapped on the first lookup the filter passes.
+        """
+        self.bloom = bloom
+        self.sorted_path = sorted_path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, value):
+        if value not in self.bloom:
+            return False
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = allowlist.SortedFileIndex(self.sorted_path)
+        return value in self._index
+
+
+class RegistryCache(allowlist.AllowlistCache):
+    """The retired value registries of a run, each loaded the first time a rule needs it."""
+
+    def _load(self, path):
+        """Load a registry.
+
+        Args:
+            path (str): The registry file.
+
+        Returns:
+            RetiredRegistry: The registry.
+        """
+        return load_registry(path, self.cache_dir)
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def load_registry(path, cache_dir=None):
+    """Load a registry file, holding one retired value per line.
+
+    The Bloom filter is built once per version of the file, keyed by its path, size and modification time, and kept in
+    the cache directory. Building it validates that the file is sorted and unique, as 'append_values' writes it;
+    otherwise a sorted copy is kept next to the filter.
+
+    Args:
+        path (str): The registry file.
+        cache_dir (str): Where the filter is kept. (Defaults to the user cache directory)
+
+    Returns:
+        RetiredRegistry or allowlist.SetIndex: The registry, held in memory when the cache directory is not writable.
+
+    Raises:
+        IOError: The file cannot be read.
+    """
+    stat = os.stat(path)
+    fields = (os.path.realpath(path), repr(stat.st_mtime), str(stat.st_size))
+    cache_dir = cache_dir or config._default_cache_dir()
+    base = os.path.join(cache_dir, hashlib.sha1('\0'.join(fields).encode('utf-8')).hexdigest())
+    try:
+        bloom, sorted_copy = BloomFilter.read(base + BLOOM_SUFFIX)
+    except (IOError, OSError):
+        bloom, sorted_copy = None, False
+    if bloom is not None and (not sorted_copy or os.path.isfile(base + SORTED_SUFFIX)):
+        return RetiredRegistry(bloom, base + SORTED_SUFFIX if sorted_copy else path)
+
+    values, ordered = _read_registry(path)
+    bloom = BloomFilter.for_capacity(len(values))
+    for value in values:
+        bloom.add(value)
+    sorted_path = path
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        if not ordered:
+            sorted_path = base + SORTED_SUFFIX
+            allowlist.write_sorted(sorted_path, set(values))
+        bloom.write(base + BLOOM_SUFFIX, not ordered)
+    except (IOError, OSError):
+        if not ordered:
+            return allowlist.SetIndex(values)   # no cache directory, fall back to memory
+    return RetiredRegistry(bloom, sorted_path)
+
+
+def append_values(path, values):
+    """Merge values into a registry file, keeping it sorted and unique. The registry is streamed, so appending to a
+    registry of millions of values only holds the new values in memory.
+
+    Args:
+        path (str): The registry file, created if missing.
+        values (iterable): The values to retire.
+
+    Returns:
+        int: The number of values that were not retired yet.
+    """
+    new_values = sorted(set(value.strip().encode('utf-8') for value in values if value.strip()))
+    existing = _iter_sorted_lines(path) if os.path.isfile(path) else iter(())
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = os.path.join(directory, '.{}.{}.tmp'.format(os.path.basename(path), os.getpid()))
+    added = 0
+    previous = None
+    with io.open(temp_path, 'wb') as f:
+        for value, is_new in heapq.merge(((value, False) for value in existing),
+                                         ((value, True) for value in new_values)):
+            if value == previous:
+                continue
+            previous = value
+            added += is_new
+            f.write(value + b'\n')
+    os.rename(temp_path, path)
+    return added
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _read_registry(path, collect=True):
+    """Read the values of a registry file.
+
+    Args:
+        path (str): The registry file.
+        collect (bool): Whether to return the values, or only check their order.
+
+    Returns:
+        tuple: (list, bool) the values (None when not collected) and whether the file only holds sorted unique
+            values, one per line
+    """
+    values = [] if collect else None
+    ordered = True
+    previous = None
+    with io.open(path, 'rb') as f:
+        for line in f:
+            value = line.strip()
+            if not value or value.startswith(b'#'):
+                ordered = False
+                continue
+            if line != value + b'\n' or (previous is not None and value <= previous):
+                ordered = False
+                if not collect:
+                    break
+            previous = value
+            if collect:
+                values.append(value.decode('utf-8'))
+    return values, ordered
+
+
+def _iter_sorted_lines(path):
+    """Iterate over the values of a registry file in byte order, streaming it unless it was edited by hand.
+
+    Args:
+        path (str): The registry file.
+
+    Yields:
+        bytes: Every value, sorted.
+    """
+    if _read_registry(path, collect=False)[1]:
+        with io.open(path, 'rb') as f:
+            for line in f:
+                yield line[:-1]
+    else:
+        for value in sorted(set(value.encode('utf-8') for value in _read_registry(path)[0])):
+            yield value
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import json
+import os
+from flake8 import style_guide
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+FORMATS = ('json', 'sarif')
+FAMILIES = {'M3': 'unique value',
+            'M4': 'run',
+            'M5': 'missing mark',
+            'M6': 'invalid value',
+            'M7': 'value type',
+            'M8': 'duplicate mark',
+            'M9': 'argument count'}
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_VERSION = '2.1.0'
+TOOL_NAME = 'flake8-pytest-mark'
+TOOL_URI = 'https://github.com/zreichert/pytest_mark_checker'
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class ReportWriter(object):
+    """Streams violation records to a report file as they are received, so the report is never held in memory."""
+
+    def __init__(self, path, report_format='json', version='', report_filter=None):
+        """Open the report file for writing, truncating any previous report.
+
+        Args:
+            path (str): The path of the report file.
+            report_format (str): 'json' writes a JSON object per line, 'sarif' writes a SARIF 2.1.0 log.
+            version (str): The version of the plug-in, recorded in SARIF logs.
+            report_filter (ReportFilter): Leaves out the violations flake8 does not report. (None writes every
+                violation)
+        """
+        self.report_format = report_format
+        self.report_filter = report_filter
+        self._file = io.open(path, 'w', encoding='utf-8')
+        self._count = 0
+        if report_format == 'sarif':
+            driver = {'name': TOOL_NAME, 'version': version, 'informationUri': TOOL_URI}
+            # The results array is left open, 'close' completes the log.
+            self._file.write(u'{{"$schema": {}, "version": {}, "runs": [{{"tool": {}, "results": [\n'.format(
+                json.dumps(SARIF_SCHEMA), json.dumps(SARIF_VERSION), json.dumps({'driver': driver}, sort_keys=True)))
+
+    def write(self, record):
+        """Write a single violation record.
+
+        Args:
+            record (dict): A record created by 'build_record'.
+        """
+        if self.report_filter is not None and not self.report_filter.accepts(record):
+            return
+        if self.report_format == 'sarif':
+            prefix = u',\n' if self._count else u''
+            self._file.write(prefix + json.dumps(sarif_result(record), sort_keys=True))
+        else:
+            self._file.write(u'{}\n'.format(json.dumps(record, sort_keys=True)))
+        self._count += 1
+
+    def close(self):
+        """Complete and close the report file."""
+        if self.report_format == 'sarif':
+            self._file.write(u'\n]}]}\n')
+        self._file.close()
+
+
+class ReportFilter(object):
+    """Takes the decisions flake8 takes before printing a violation, so that the report holds the violations of the
+    output: codes that are not selected or are ignored, including per file ignores, and lines with a '# noqa' comment
+    are left out.
+    """
+
+    def __init__(self, options):
+        """Build the style guides of the run.
+
+        Args:
+            options (optparse.Values): The options parsed by flake8.
+        """
+        self.disable_noqa = getattr(options, 'disable_noqa', False)
+        self._decider = style_guide.DecisionEngine(options)
+        self._guides = None
+        if getattr(options, 'per_file_ignores', None) and hasattr(style_guide, 'StyleGuideManager'):
+            self._guides = style_guide.StyleGuideManager(options, None, self._decider)
+
+    def accepts(self, record):
+        """Decide whether flake8 reports a violation.
+
+        Args:
+            record (dict): A record created by 'build_record'.
+
+        Returns:
+            bool: True if flake8 reports the violation.
+        """
+        decider = self._decider
+        if self._guides is not None:
+            decider = self._guides.style_guide_for(record['path']).decider
+        if decider.decision_for(record['code']) != style_guide.Decision.Selected:
+            return False
+        violation = style_guide.Violation(record['code'], record['path'], record['line'], record['column'],
+                                          record['message'], None)
+        return not violation.is_inline_ignored(self.disable_noqa)
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def build_record(filename, violation, mark=None):
+    """Describe a violation.
+
+    Args:
+        filename (str): The name of the file containing the violation.
+        violation (tuple): (int, int, str, type) the violation tuple, a rules.Violation carries the offending values
+            and the related tests.
+        mark (str): The name of the mark the violation was reported for. (None for run violations)
+
+    Returns:
+        dict: The violation record.
+    """
+    line, col, text = violation[0], violation[1], violation[2]
+    code, _, message = text.partition(' ')
+    related = [{'value': value, 'name': info.name, 'path': info.file_path, 'line': info.lineno}
+               for value, info in getattr(violation, 'related', ())]
+    return {'path': filename, 'line': line, 'column': col + 1, 'code': code, 'family': code[:2], 'mark': mark,
+            'message': message, 'values': list(getattr(violation, 'values', ())), 'related': related}
+
+
+def sarif_result(record):
+    """Convert a violation record to a SARIF result.
+
+    Args:
+        record (dict): A record created by 'build_record'.
+
+    Returns:
+        dict: The SARIF result.
+    """
+    result = {'ruleId': record['code'],
+              'level': 'warning',
+              'message': {'text': record['message']},
+              'locations': [_sarif_location(record['path'], record['line'], record['column'])],
+              'properties': {'family': record['family'],
+                             'category': FAMILIES.get(record['family'], ''),
+                             'mark': record['mark'],
+                             'values': record['values']}}
+    if record['related']:
+        result['relatedLocations'] = []
+        for number, related in enumerate(record['related'], 1):
+            location = _sarif_location(related['path'], related['line'])
+            location['id'] = number
+            location['message'] = {'text': "'{}' is already used by {}".format(related['value'], related['name'])}
+            result['relatedLocations'].append(location)
+    return result
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _sarif_location(path, line, column=None):
+    """Build a SARIF physical location.
+
+    Args:
+        path (str): The file, relative to the current directory or absolute.
+        line (int): The line. Violations of a whole file, on line 0, are reported on line 1.
+        column (int): The 1-based column. (None for the whole line)
+
+    Returns:
+        dict: The SARIF location.
+    """
+    region = {'startLine': max(line, 1)}
+    if column is not None:
+        region['startColumn'] = max(column, 1)
+    uri = os.path.normpath(path).replace(os.sep, '/')
+    return {'physicalLocation': {'artifactLocation': {'uri': uri}, 'region': region}}
@@ -5,23 +5,157 @@
 # ======================================================================================================================
 import ast
 import re
-from uuid import UUID
+import threading
 from collections import namedtuple
+from flake8_pytest_mark.scopes import scope_key as _scope_key
+from flake8_pytest_mark.symbols import SymbolTable
 
 # ======================================================================================================================
 # Globals
 # ======================================================================================================================
-_ValueInfo = namedtuple('_ValueInfo', ['node', 'file_path'])
-_unique_value_collision_map = {}     # { str('rule_name'): { str('value': _ValueInfo } }
+_ValueInfo = namedtuple('_ValueInfo', ['name', 'lineno', 'file_path'])
+_unique_value_collision_map = {}     # { str('mark'): { str('value': _ValueInfo } } of the default store
+_default_symbols = SymbolTable()     # only knows 'pytest', used when no table of the module is available
+UNIQUE_VALUE_SHARDS = 16
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class UniqueValueStore(object):
+    """The mark values claimed during a run by the rules configured with 'enforce_unique_value', keyed by the name of
+    the mark so that sub projects configuring the same rule slot for different marks never collide. Registration is
+    atomic and may be called from several threads: every value is guarded by one of a fixed number of locks chosen by
+    its hash, so threads only contend when they register values of the same shard. Rules configured with a
+    'unique_scope' other than 'global' claim values in a partition per scope, released once the scope is checked.
+    """
+
+    def __init__(self, values=None):
+        """Create a store.
+
+        Args:
+            values (dict): { str('mark'): { str('value'): _ValueInfo } } the mapping to store global values in.
+                (Defaults to a new empty mapping)
+        """
+        self.values = {} if values is None else values
+        self.partitions = {}    # { (str('mark'), str('scope key')): { str('value'): _ValueInfo } }
+        self._rules_lock = threading.Lock()
+        self._shard_locks = [threading.Lock() for _ in range(UNIQUE_VALUE_SHARDS)]
+
+    def register(self, mark, value, value_info, scope_key=None):
+        """Record a mark value unless it has already been claimed.
+
+        Args:
+            mark (str): The name of the mark, values are unique per mark whichever rule slot configures it.
+            value (str): The mark value to record.
+            value_info (_ValueInfo): The location of the test carrying the value.
+            scope_key (str): The partition to claim the value in, from 'scopes.scope_key'. (None claims it for the
+                whole run)
+
+        Returns:
+            _ValueInfo: The location that previously claimed the value, otherwise None.
+        """
+        table, key = (self.values, mark) if scope_key is None else (self.partitions, (mark, scope_key))
+        values = table.get(key)
+        if values is None:
+            with self._rules_lock:
+                values = table.setdefault(key, {})
+        with self._shard_locks[hash(value) % UNIQUE_VALUE_SHARDS]:
+            existing = values.get(value)
+            if existing is None:
+                values[value] = value_info
+            return existing
+
+    def release(self, mark, scope_key):
+        """Forget the values claimed in a partition, once every file of its scope has been checked.
+
+        Args:
+            mark (str): The name of the mark.
+            scope_key (str): The partition to release.
+
+        Returns:
+            int: The number of values released.
+        """
+        with self._rules_lock:
+            return len(self.partitions.pop((mark, scope_key), ()))
+
+    def claimed(self, mark):
+        """Collect the values claimed for a mark, over all of its partitions.
+
+        Args:
+            mark (str): The name of the mark.
+
+        Returns:
+            set: str('value') every claimed value.
+        """
+        with self._rules_lock:
+            claimed = set(self.values.get(mark, ()))
+            for (partition_mark, _), values in self.partitions.items():
+                if partition_mark == mark:
+                    claimed.update(values)
+        return claimed
+
+    def counts(self):
+        """Count the values claimed for every mark, over all of its partitions.
+
+        Returns:
+            dict: { str('mark'): int('values') }
+        """
+        with self._rules_lock:
+            mark_values = list(self.values.items())
+            partitions = list(self.partitions.items())
+        counts = {mark: len(values) for mark, values in mark_values}
+        for (mark, _), values in partitions:
+            counts[mark] = counts.get(mark, 0) + len(values)
+        return counts
+
+    def clear(self):
+        """Forget every claimed value."""
+        with self._rules_lock:
+            self.values.clear()
+            self.partitions.clear()
+
+
+class Violation(tuple):
+    """A violation tuple as flake8 expects it, also carrying the structured details of the violation for reports."""
+
+    def __new__(cls, line, col, message, class_type, values=(), related=()):
+        """Create a violation.
+
+        Args:
+            line (int): The line of the violation.
+            col (int): The column of the violation.
+            message (str): The message, starting with the code.
+            class_type (class): The class that reported the violation.
+            values (iterable): The offending mark values.
+            related (iterable): _ValueInfo of the other tests involved, paired with the value they share as
+                (str('value'), _ValueInfo) tuples.
+
+        Returns:
+            Violation: The violation.
+        """
+        violation = tuple.__new__(cls, (line, col, message, class_type))
+        violation.values = list(values)
+        violation.related = list(related)
+        return violation
+
+    def __getnewargs__(self):
+        return tuple(self) + (self.values, self.related)
+
+
+_default_store = UniqueValueStore(_unique_value_collision_map)     # used when a rule is called without a store
+_default_caches = {}    # { str('kind'): the cache used when a rule is called without one, created when first needed }
 
 
 # ======================================================================================================================
 # Rules
 # ======================================================================================================================
 # noinspection PyUnusedLocal
-def rule_m3xx(node, rule_name, rule_conf, class_type, filename, **kwargs):
+def rule_m3xx(node, rule_name, rule_conf, class_type, filename, mark_index=None, unique_values=None,
+              retired_values=None, **kwargs):
     """Validate that pytest mark rules configured with 'enforce_unique_value' option will allow only unique values
-    for the mark across all files being processed during a single flake8 run.
+    for the mark across all files being processed during a single flake8 run, or across the files of the same
+    'unique_scope', and never reuse a value listed in the 'retired_values_file' registry.
 
     Args:
         node (ast.AST): A node in the ast.
@@ -29,64 +163,92 @@ def rule_m3xx(node, rule_name, rule_conf, class_type, filename, **kwargs):
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
         filename (str): The name of the file to evaluate.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
+        unique_values (UniqueValueStore): The values claimed during the run. (Defaults to a store shared by the
+            process)
+        retired_values (registry.RegistryCache): The registries loaded during the run. (Defaults to a cache shared by
+            the process)
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
         tuple: (int, int, str, type) the tuple used by flake8 to construct a violation.
     """
 
-    error_msg = ''
+    errors = []     # joined once so that marks with thousands of duplicate args stay linear
     line_num = node.lineno
     enforce = True if 'enforce_unique_value' in rule_conf and rule_conf['enforce_unique_value'].lower() == 'true' \
         else False
 
+    offending = []
+    related = []
     if enforce:
-        for decorator in _reduce_decorators_by_mark(node.decorator_list, rule_conf['name']):
+        value_info = _ValueInfo(node.name, node.lineno, filename)
+        try:
+            scope_key = _scope_key(rule_conf.get('unique_scope'), filename)
+        except ValueError as e:
+            errors.append('Unique scope {}!'.format(e))
+            scope_key = None
+        registry_file = rule_conf.get('retired_values_file')
+        retired, load_error = None, None
+        if registry_file:
+            retired, load_error = (retired_values or _default_cache('registries')).get(registry_file)
+            if retired is None:
+                errors.append("Retired values file '{}' could not be read: {}".format(registry_file, load_error))
+        for decorator in _marked_decorators(node, rule_conf['name'], mark_index):
             values = _get_decorator_args(decorator)
             for value in values:
-                if rule_name not in _unique_value_collision_map:
-                    _unique_value_collision_map[rule_name] = {value: _ValueInfo(node, filename)}
-                elif value in _unique_value_collision_map[rule_name]:
-                    error_msg += ("The '{}' mark value already specified for the '{}' test at line '{}' found in the "
-                                  "'{}' file! ".format(value,
-                                                       _unique_value_collision_map[rule_name][value].node.name,
-                                                       _unique_value_collision_map[rule_name][value].node.lineno,
-                                                       _unique_value_collision_map[rule_name][value].file_path))
-                else:
-                    _unique_value_collision_map[rule_name][value] = _ValueInfo(node, filename)
-
-    if error_msg:
+                existing = _register_unique_value(rule_conf['name'], value, value_info, unique_values, scope_key)
+                if existing is not None:
+                    errors.append("The '{}' mark value already specified for the '{}' test at line '{}' found in the "
+                                  "'{}' file!".format(value, existing.name, existing.lineno, existing.file_path))
+                    offending.append(value)
+                    related.append((value, existing))
+                if retired is not None and value in retired:
+                    errors.append("The '{}' mark value was retired in '{}' and may not be reused!".format(
+                        value, registry_file))
+                    if value not in offending[-1:]:
+                        offending.append(value)
+
+    if errors:
         code = _generate_mark_code(rule_name)
-        message = "M3{} @pytest.mark.{} value is not unique! {}".format(code, rule_conf['name'], error_msg.rstrip())
-        yield (line_num, 0, message, class_type)
+        message = "M3{} @pytest.mark.{} value is not unique! {}".format(code, rule_conf['name'], ' '.join(errors))
+        yield Violation(line_num, 0, message, class_type, offending, related)
 
 
 # noinspection PyUnusedLocal
-def rule_m5xx(node, rule_name, rule_conf, class_type, **kwargs):
+def rule_m5xx(node, rule_name, rule_conf, class_type, mark_index=None, inherited_marks=frozenset(), **kwargs):
     """Read and validate the input file contents.
     A 5XX rule checks for the presence of a configured 'pytest_mark'
-    Marks may be numbered up to 50, example: 'pytest_mark49'
+    With allow_inherited=true a mark applied by the module or an enclosing class also counts
 
     Args:
         node (ast.AST): A node in the ast.
         rule_name (str): The name of the rule.
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
+        inherited_marks (frozenset): The marks applied to the node by 'pytestmark' and its enclosing classes.
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
         tuple: (int, int, str, type) the tuple used by flake8 to construct a violation.
     """
+    allow_inherited = True if 'allow_inherited' in rule_conf and rule_conf['allow_inherited'].lower() == 'true' \
+        else False
+    if allow_inherited and rule_conf['name'] in inherited_marks:
+        return
     line_num = node.lineno
     code = _generate_mark_code(rule_name)
     message = 'M5{} test definition not marked with {}'.format(code, rule_conf['name'])
-    if not _reduce_decorators_by_mark(node.decorator_list, rule_conf['name']):
+    if not _marked_decorators(node, rule_conf['name'], mark_index):
         yield (line_num, 0, message, class_type)
 
 
 # noinspection PyUnusedLocal
-def rule_m6xx(node, rule_name, rule_conf, class_type, **kwargs):
-    """Validate a value to a given mark against a provided regex
+def rule_m6xx(node, rule_name, rule_conf, class_type, mark_index=None, allowlists=None, **kwargs):
+    """Validate a value to a given mark against a provided regex or allowlist file
     A 6XX requires a configured 5XX rule
     A 6XX rule will not warn if a corresponding 5XX rule validates
 
@@ -95,6 +257,10 @@ def rule_m6xx(node, rule_name, rule_conf, class_type, **kwargs):
         rule_name (str): The name of the rule.
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
+        allowlists (allowlist.AllowlistCache): The allowlist files loaded during the run. (Defaults to a cache shared
+            by the process)
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
@@ -104,11 +270,15 @@ def rule_m6xx(node, rule_name, rule_conf, class_type, **kwargs):
     non_matching_values = []
     detailed_error = None
     line_num = node.lineno
+    allowlist_file = rule_conf.get('value_allowlist_file')
+    allowed, load_error = None, None
+    if allowlist_file:
+        allowed, load_error = (allowlists or _default_cache('allowlists')).get(allowlist_file)
 
-    for decorator in _reduce_decorators_by_mark(node.decorator_list, rule_conf['name']):
+    for decorator in _marked_decorators(node, rule_conf['name'], mark_index):
         values = _get_decorator_args(decorator)
 
-        if any(k in rule_conf for k in ('value_regex', 'value_match')):
+        if any(k in rule_conf for k in ('value_regex', 'value_match', 'value_allowlist_file')):
             if len(values) == 0:
                 non_matching_values.append('')
                 detailed_error = "Validation supplied, but values absent."
@@ -122,6 +292,7 @@ def rule_m6xx(node, rule_name, rule_conf, class_type, **kwargs):
                 # only use match if regex is not supplied
                 if 'value_match' in rule_conf and 'value_regex' not in rule_conf:
                     if rule_conf['value_match'] == 'uuid':
+                        from uuid import UUID   # deferred, importing uuid is slow compared to a short flake8 run
                         try:
                             UUID(value)
                         # excepting Exception intentionally here
@@ -130,16 +301,25 @@ def rule_m6xx(node, rule_name, rule_conf, class_type, **kwargs):
                             non_matching_values.append(value)
                             detailed_error = e
 
+                # a value already rejected by the regex or the match is reported once
+                if allowlist_file and value not in non_matching_values[-1:] and \
+                        (allowed is None or value not in allowed):
+                    non_matching_values.append(value)
+                    if allowed is None:
+                        detailed_error = "Allowlist file '{}' could not be read: {}".format(allowlist_file, load_error)
+                    else:
+                        detailed_error = "Values must be listed in '{}'".format(allowlist_file)
+
     if non_matching_values:
         code = _generate_mark_code(rule_name)
         message = ("M6{} the mark values '{}' "
                    "do not match the configuration "
                    "specified by {}, {}".format(code, non_matching_values, rule_name, detailed_error))
-        yield (line_num, 0, message, class_type)
+        yield Violation(line_num, 0, message, class_type, non_matching_values)
 
 
 # noinspection PyUnusedLocal
-def rule_m7xx(node, rule_name, rule_conf, class_type, **kwargs):
+def rule_m7xx(node, rule_name, rule_conf, class_type, mark_index=None, **kwargs):
     """Validate types of the objects passed as args to a configured mark
     All args must be strings
 
@@ -148,6 +328,8 @@ def rule_m7xx(node, rule_name, rule_conf, class_type, **kwargs):
         rule_name (str): The name of the rule.
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
@@ -157,7 +339,7 @@ def rule_m7xx(node, rule_name, rule_conf, class_type, **kwargs):
     line_num = node.lineno
     code = _generate_mark_code(rule_name)
     message = False
-    for decorator in _reduce_decorators_by_mark(node.decorator_list, rule_conf['name']):
+    for decorator in _marked_decorators(node, rule_conf['name'], mark_index):
         if isinstance(decorator, ast.Call):
             if any(not isinstance(arg, ast.Str) for arg in decorator.args):
                 message = 'M7{} mark values must be strings'.format(code)
@@ -166,7 +348,7 @@ def rule_m7xx(node, rule_name, rule_conf, class_type, **kwargs):
 
 
 # noinspection PyUnusedLocal
-def rule_m8xx(node, rule_name, rule_conf, class_type, **kwargs):
+def rule_m8xx(node, rule_name, rule_conf, class_type, mark_index=None, **kwargs):
     """Validates that @pytest.mark.foo() is only called once for a given test
     On by default, can be turned off with allow_duplicate=true
 
@@ -175,6 +357,8 @@ def rule_m8xx(node, rule_name, rule_conf, class_type, **kwargs):
         rule_name (str): The name of the rule.
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
@@ -185,12 +369,12 @@ def rule_m8xx(node, rule_name, rule_conf, class_type, **kwargs):
     code = _generate_mark_code(rule_name)
     message = 'M8{} @pytest.mark.{} may only be called once for a given test'.format(code, rule_conf['name'])
     allow_dupe = True if 'allow_duplicate' in rule_conf and rule_conf['allow_duplicate'].lower() == 'true' else False
-    if not allow_dupe and len(_reduce_decorators_by_mark(node.decorator_list, rule_conf['name'])) > 1:
+    if not allow_dupe and len(_marked_decorators(node, rule_conf['name'], mark_index)) > 1:
         yield (line_num, 0, message, class_type)
 
 
 # noinspection PyUnusedLocal
-def rule_m9xx(node, rule_name, rule_conf, class_type, **kwargs):
+def rule_m9xx(node, rule_name, rule_conf, class_type, mark_index=None, **kwargs):
     """Validates the number of arguments to @pytest.mark.foo()
     By default we validate that there is only one argument
     can configure to allow multiple with allow_multiple_args=true
@@ -200,6 +384,8 @@ def rule_m9xx(node, rule_name, rule_conf, class_type, **kwargs):
         rule_name (str): The name of the rule.
         rule_conf (dict): The dictionary containing the properties of the rule.
         class_type (class): The class that this rule was called from.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark, built by
+            'SymbolTable.index'. (Defaults to resolving the decorators of the node)
         kwargs (dict): A dictionary of keyword arguments.
 
     Yields:
@@ -211,7 +397,7 @@ def rule_m9xx(node, rule_name, rule_conf, class_type, **kwargs):
     allow_multiple_args = False
     if 'allow_multiple_args' in rule_conf and rule_conf['allow_multiple_args'].lower() == 'true':
         allow_multiple_args = True
-    for decorator in _reduce_decorators_by_mark(node.decorator_list, rule_conf['name']):
+    for decorator in _marked_decorators(node, rule_conf['name'], mark_index):
         if isinstance(decorator, ast.Call):
             if not allow_multiple_args and len(decorator.args) > 1:
                 message = 'M9{} you may only specify one argument to @pytest.mark.{}'.format(code, rule_conf['name'])
@@ -221,7 +407,27 @@ def rule_m9xx(node, rule_name, rule_conf, class_type, **kwargs):
 # ======================================================================================================================
 # Private Functions
 # ======================================================================================================================
-def _reduce_decorators_by_mark(decorators, mark):
+def _default_cache(kind):
+    """Get the value file cache shared by the rules called without one, importing its module when first needed. Most
+    runs configure no value files.
+
+    Args:
+        kind (str): Either 'allowlists' or 'registries'.
+
+    Returns:
+        allowlist.AllowlistCache: The cache. (A registry.RegistryCache for 'registries')
+    """
+    cache = _default_caches.get(kind)
+    if cache is None:
+        if kind == 'allowlists':
+            from flake8_pytest_mark.allowlist import AllowlistCache as cache_class
+        else:
+            from flake8_pytest_mark.registry import RegistryCache as cache_class
+        cache = _default_caches.setdefault(kind, cache_class())
+    return cache
+
+
+def _reduce_decorators_by_mark(decorators, mark, symbols=None):
     """reduces a list of decorators to a list that
     are decorators used by pytest
     are decorators of the mark passed in
@@ -229,25 +435,30 @@ def _reduce_decorators_by_mark(decorators, mark):
     Args:
         decorators (list): A list of decorators from AST
         mark (str): The name of the mark.
+        symbols (SymbolTable): The names bound to pytest by the module. (Defaults to 'pytest' only)
 
     Returns:
         list: decorators that are 'pytest' and the passed mark
     """
-    reduced = []
-    for decorator in decorators:
-        if isinstance(decorator, ast.Call):
-            try:
-                if decorator.func.attr == mark and decorator.func.value.value.id == 'pytest':
-                    reduced.append(decorator)
-            except AttributeError:
-                pass
-        elif isinstance(decorator, ast.Attribute):
-            try:
-                if decorator.attr == mark:
-                    reduced.append(decorator)
-            except AttributeError:
-                pass
-    return reduced
+    resolve = (symbols or _default_symbols).resolve
+    return [decorator for decorator in decorators if resolve(decorator) == mark]
+
+
+def _marked_decorators(node, mark, mark_index):
+    """Get the decorators of a node applying a mark.
+
+    Args:
+        node (ast.stmt): The test definition.
+        mark (str): The name of the mark.
+        mark_index (dict): { str('mark'): list('decorators') } the decorators of the node grouped by mark. (None to
+            resolve the decorators of the node)
+
+    Returns:
+        list: The decorators applying the mark.
+    """
+    if mark_index is None:
+        return _reduce_decorators_by_mark(node.decorator_list, mark)
+    return mark_index.get(mark, [])
 
 
 def _get_decorator_args(decorator):
@@ -268,6 +479,22 @@ def _get_decorator_args(decorator):
     return args
 
 
+def _register_unique_value(mark, value, value_info, store=None, scope_key=None):
+    """Record a mark value for a rule configured with 'enforce_unique_value' unless it has already been seen.
+
+    Args:
+        mark (str): The name of the mark.
+        value (str): The mark value to record.
+        value_info (_ValueInfo): The location of the test carrying the value.
+        store (UniqueValueStore): The store of the run. (Defaults to a store shared by the process)
+        scope_key (str): The partition of the store to claim the value in. (None for the whole run)
+
+    Returns:
+        _ValueInfo: The location that previously claimed the value, otherwise None.
+    """
+    return (store or _default_store).register(mark, value, value_info, scope_key)
+
+
 def _generate_mark_code(rule_name):
     """Generates a two digit string based on a provided string
 
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import threading
+from flake8_pytest_mark import rules
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class RunContext(object):
+    """The configuration and the cross file state of a single run. Checkers only read the configuration once the run
+    has started, and the cross file state is safe to update from several threads, so independent runs can check files
+    concurrently in one process by giving each checker the context of its run.
+    """
+
+    def __init__(self, pytest_marks=None, unique_values=None):
+        """Create a context.
+
+        Args:
+            pytest_marks (dict): { str('pytest_markN'): dict('rule_conf') } the configured marks.
+            unique_values (rules.UniqueValueStore): The values claimed by unique marks. (Defaults to a new store)
+        """
+        self.pytest_marks = {} if pytest_marks is None else pytest_marks
+        self.config_error = ''          # why the TOML configuration could not be loaded
+        self.path_matcher = None        # path_filters.PathMatcher when marks are restricted by path
+        self.config_hierarchy = None    # hierarchy.ConfigHierarchy when sub directories configure their own marks
+        self.changed_files = None       # real paths of the files to check in changed files mode, None checks all
+        self.baseline_file = ''
+        self.baseline_fingerprints = frozenset()    # fingerprints of known violations to suppress
+        self.baseline_error = ''        # why the baseline file could not be read
+        self.update_baseline = False
+        self.max_violations_per_file = 0
+        self.run_budget = None          # budget.RunBudget shared by every file of the run, None when unlimited
+        self.collect_counters = False
+        self.slow_file_threshold = 0.0
+        self.slow_node_threshold = 0.0
+        self.unique_values = rules.UniqueValueStore() if unique_values is None else unique_values
+        self.seeded_unique_values = {}  # { str('mark'): int('values') } seeded by changed files mode before checking
+        self._allowlists = None
+        self._retired_values = None
+        self._caches_lock = threading.Lock()
+
+    @property
+    def allowlists(self):
+        """allowlist.AllowlistCache: The allowlist files, each loaded when a rule first needs it. The cache is only
+        created, and its module imported, when a mark configures a 'value_allowlist_file'.
+        """
+        if self._allowlists is None:
+            with self._caches_lock:
+                if self._allowlists is None:
+                    from flake8_pytest_mark import allowlist
+                    self._allowlists = allowlist.AllowlistCache()
+        return self._allowlists
+
+    @property
+    def retired_values(self):
+        """registry.RegistryCache: The retired value registries, loaded like the allowlists."""
+        if self._retired_values is None:
+            with self._caches_lock:
+                if self._retired_values is None:
+                    from flake8_pytest_mark import registry
+                    self._retired_values = registry.RegistryCache()
+        return self._retired_values
+
+    def resolve_marks(self, filename):
+        """Resolve the marks configured for the directory of a file and select the ones applying to the file.
+
+        Args:
+            filename (str): The name of the file.
+
+        Returns:
+            tuple: (dict, dict, str) every mark configured for the directory, the marks applying to the file and why
+                the configuration could not be loaded
+        """
+        pytest_marks, matcher, error = self.pytest_marks, self.path_matcher, self.config_error
+        if self.config_hierarchy is not None:
+            pytest_marks, matcher, error, _ = self.config_hierarchy.plan_for(filename)
+        return pytest_marks, pytest_marks if matcher is None else matcher.marks_for(filename), error
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import os
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+GLOBAL = 'global'
+SCOPES = (GLOBAL, 'package', 'directory', 'file')
+_package_roots = {}     # { str('directory'): str('top level package directory') }, filled as directories are seen
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def scope_key(scope, filename):
+    """Determine the partition of the unique value store a file contributes to.
+
+    Args:
+        scope (str): One of SCOPES. (None is 'global')
+        filename (str): The name of the file.
+
+    Returns:
+        str: The directory or file shared by the files of the partition, None for the global partition.
+
+    Raises:
+        ValueError: The scope is unknown.
+    """
+    scope = scope or GLOBAL
+    if scope == GLOBAL:
+        return None
+    path = os.path.abspath(filename)
+    if scope == 'file':
+        return path
+    if scope == 'directory':
+        return os.path.dirname(path)
+    if scope == 'package':
+        return package_root(os.path.dirname(path))
+    raise ValueError("'{}' is not one of {}".format(scope, ', '.join(SCOPES)))
+
+
+def package_root(directory):
+    """Find the top level package containing a directory, walking up while the parents hold an '__init__.py'.
+
+    Args:
+        directory (str): An absolute directory.
+
+    Returns:
+        str: The directory of the top level package, the directory itself when it is not a package.
+    """
+    root = _package_roots.get(directory)
+    if root is None:
+        parent = os.path.dirname(directory)
+        if parent != directory and os.path.isfile(os.path.join(directory, '__init__.py')) and \
+                os.path.isfile(os.path.join(parent, '__init__.py')):
+            root = package_root(parent)
+        else:
+            root = directory
+        _package_roots[directory] = root
+    return root
+
+
+def coarsest(scopes):
+    """Select the widest of several scopes, other than 'global', that the files of a run can be grouped by.
+
+    Args:
+        scopes (iterable): Scopes from SCOPES.
+
+    Returns:
+        str: The widest partitioned scope, None when no scope is partitioned.
+    """
+    partitioned = [scope for scope in scopes if scope in SCOPES and scope != GLOBAL]
+    return min(partitioned, key=SCOPES.index) if partitioned else None
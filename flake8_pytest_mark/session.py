@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import atexit
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# flake8 has no end of run hook for plugins and with '--jobs' files are checked in forked worker processes. Records
+# produced while checking a file are buffered in the worker, appended to a per process spool file once the file is
+# done and replayed to the subscribed handlers by the main process when flake8 exits.
+_main_pid = None
+_spool_dir = None
+_handlers = {}      # { str('kind'): [ callable(payload) ] }
+_finishers = []     # [ callable() ]
+_buffer = []
+_buffer_lock = threading.Lock()     # files may be checked by several threads of a process
+_atexit_registered = False
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def start():
+    """Begin a new run. Must be called by the main process before any file is checked."""
+    global _main_pid, _atexit_registered
+
+    reset()
+    _main_pid = os.getpid()
+    if not _atexit_registered:
+        atexit.register(finish)
+        _atexit_registered = True
+
+
+def reset():
+    """Discard all subscriptions and spooled records."""
+    global _main_pid, _spool_dir, _handlers, _finishers, _buffer
+
+    if _spool_dir is not None and _main_pid == os.getpid():
+        shutil.rmtree(_spool_dir, ignore_errors=True)
+    _main_pid = None
+    _spool_dir = None
+    _handlers = {}
+    _finishers = []
+    _buffer = []
+
+
+def subscribe(kind, handler, finisher=None):
+    """Register a main process handler for the records of a given kind. A kind may have several handlers.
+
+    Args:
+        kind (str): The kind of record to receive.
+        handler (callable): Called once with the payload of every record of the kind.
+        finisher (callable): Called without arguments after every record has been handled.
+    """
+    global _spool_dir
+
+    if _spool_dir is None:
+        _spool_dir = tempfile.mkdtemp(prefix='flake8-pytest-mark-')
+    _handlers.setdefault(kind, []).append(handler)
+    if finisher is not None:
+        _finishers.append(finisher)
+
+
+def is_subscribed(kind):
+    """Check whether records of a given kind are being collected.
+
+    Args:
+        kind (str): The kind of record.
+
+    Returns:
+        bool: True if a handler is registered for the kind.
+    """
+    return kind in _handlers
+
+
+def emit(kind, payload):
+    """Buffer a record for the main process. Records of kinds nobody subscribed to are dropped.
+
+    Args:
+        kind (str): The kind of record.
+        payload (object): A JSON serializable payload.
+    """
+    if kind in _handlers:
+        record = json.dumps([kind, payload])
+        with _buffer_lock:
+            _buffer.append(record)
+
+
+def flush():
+    """Append the buffered records of this process to its spool file."""
+    if _buffer and _spool_dir is not None:
+        with _buffer_lock:
+            with io.open(os.path.join(_spool_dir, '{}.jsonl'.format(os.getpid())), 'a', encoding='utf-8') as f:
+                f.write(u'\n'.join(_buffer) + u'\n')
+            del _buffer[:]
+
+
+def finish():
+    """Replay every spooled record to its handler and run the finishers. Only acts in the main process."""
+    if _main_pid != os.getpid() or _spool_dir is None:
+        return
+
+    flush()
+    try:
+        for name in sorted(os.listdir(_spool_dir)):
+            with io.open(os.path.join(_spool_dir, name), encoding='utf-8') as f:
+                for line in f:
+                    kind, payload = json.loads(line)
+                    for handler in _handlers[kind]:
+                        handler(payload)
+        for finisher in _finishers:
+            finisher()
+    finally:
+        reset()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+from collections import namedtuple
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+PYTEST = 'pytest'
+MARK = 'mark'
+PYTESTMARK = 'pytestmark'
+PytestMark = namedtuple('PytestMark', ['name', 'lineno'])
+# Stands for a 'pytestmark' assignment when the rules check the values of the marks it applies.
+_COMPOUND_STATEMENTS = tuple(getattr(ast, name) for name in ('If', 'Try', 'TryExcept', 'TryFinally', 'With')
+                             if hasattr(ast, name))
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class SymbolTable(object):
+    """The names a module binds to 'pytest', to 'pytest.mark' and to specific marks, built by a single pass over the
+    module level statements. Resolving a decorator to the name of its mark is then a lookup instead of probing
+    attribute chains.
+
+    Recognized bindings:
+        import pytest / import pytest as pt
+        from pytest import mark / from pytest import mark as m
+        m = pytest.mark / m = pt.mark
+        test_id = pytest.mark.test_id / test_id = m.test_id
+
+    It also records the marks the module applies to all of its tests with 'pytestmark'.
+    """
+
+    def __init__(self, tree=None):
+        """Build the table of a module.
+
+        Args:
+            tree (ast.AST): The module. (None only knows the 'pytest' name)
+        """
+        self.modules = {PYTEST}     # names bound to the pytest module, 'pytest' is assumed even when not imported
+        self.mark_generators = set()    # names bound to 'pytest.mark'
+        self.marks = {}     # { str('alias'): str('mark') } names bound to a specific mark
+        self.module_mark_index = {}     # { str('mark'): list('mark expressions') } assigned to the module 'pytestmark'
+        if tree is not None:
+            for statement in _iter_module_statements(tree):
+                self._bind(statement)
+        self.module_marks = frozenset(self.module_mark_index)   # marks applied to every test of the module
+
+    def resolve(self, decorator):
+        """Get the name of the mark a decorator applies.
+
+        Args:
+            decorator (ast.AST): A decorator from the AST.
+
+        Returns:
+            str: The name of the mark. (None if the decorator is not a pytest mark)
+        """
+        call = isinstance(decorator, ast.Call)
+        target = decorator.func if call else decorator
+        if isinstance(target, ast.Name):
+            return self.marks.get(target.id)
+        if not isinstance(target, ast.Attribute):
+            return None
+
+        base = target.value
+        if isinstance(base, ast.Name):
+            if base.id in self.mark_generators or not call:
+                # Attribute decorators such as '@marks.test_id' have always been accepted whatever their base.
+                return target.attr
+        elif isinstance(base, ast.Attribute) and isinstance(base.value, ast.Name) and base.value.id in self.modules:
+            return target.attr
+        elif not call:
+            return target.attr
+        return None
+
+    def index(self, decorators):
+        """Group decorators by the mark they apply, so every rule finds its decorators with a single lookup.
+
+        Args:
+            decorators (list): The decorators of a test definition.
+
+        Returns:
+            dict: { str('mark'): list('decorators') } in the order they are applied.
+        """
+        index = {}
+        for decorator in decorators:
+            mark = self.resolve(decorator)
+            if mark is not None:
+                index.setdefault(mark, []).append(decorator)
+        return index
+
+    def class_marks(self, node, index=None):
+        """Get the marks a class applies to every test it contains, from its decorators and its 'pytestmark'.
+
+        Args:
+            node (ast.ClassDef): The class.
+            index (dict): The decorators of the class grouped by mark. (Defaults to indexing them)
+
+        Returns:
+            frozenset: The names of the marks.
+        """
+        return frozenset(self.index(node.decorator_list) if index is None else index) | \
+            frozenset(self.pytestmark_index(node.body))
+
+    def pytestmark_index(self, statements):
+        """Group the marks assigned to 'pytestmark' by a block of statements, like 'index' groups decorators.
+
+        Args:
+            statements (list): The statements of a class body.
+
+        Returns:
+            dict: { str('mark'): list('mark expressions') } in the order they are applied.
+        """
+        index = {}
+        for statement in statements:
+            index = self._pytestmark(statement, index)
+        return index
+
+    def _pytestmark(self, statement, index):
+        """Apply a statement to the marks held by a 'pytestmark' variable.
+
+        Args:
+            statement (ast.stmt): The statement.
+            index (dict): The marks held before the statement, grouped by mark.
+
+        Returns:
+            dict: The marks held after the statement, grouped by mark.
+        """
+        if isinstance(statement, ast.Assign):
+            if any(isinstance(target, ast.Name) and target.id == PYTESTMARK for target in statement.targets):
+                return self._index_many(statement.value)
+        elif isinstance(statement, ast.AugAssign):
+            if isinstance(statement.target, ast.Name) and statement.target.id == PYTESTMARK:
+                extended = {mark: list(expressions) for mark, expressions in index.items()}
+                for mark, expressions in self._index_many(statement.value).items():
+                    extended.setdefault(mark, []).extend(expressions)
+                return extended
+        return index
+
+    def _index_many(self, value):
+        """Resolve a mark or a list or tuple of marks, as assigned to 'pytestmark'.
+
+        Args:
+            value (ast.expr): The assigned expression.
+
+        Returns:
+            dict: { str('mark'): list('mark expressions') }
+        """
+        return self.index(value.elts if isinstance(value, (ast.List, ast.Tuple)) else [value])
+
+    def _bind(self, statement):
+        """Record the names bound by a module level statement.
+
+        Args:
+            statement (ast.stmt): The statement.
+        """
+        self.module_mark_index = self._pytestmark(statement, self.module_mark_index)
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                if alias.name == PYTEST:
+                    self.modules.add(alias.asname or PYTEST)
+        elif isinstance(statement, ast.ImportFrom):
+            if statement.module == PYTEST and not statement.level:
+                for alias in statement.names:
+                    if alias.name == MARK:
+                        self.mark_generators.add(alias.asname or MARK)
+        elif isinstance(statement, ast.Assign):
+            kind, value = self._classify(statement.value)
+            for target in statement.targets:
+                if isinstance(target, ast.Name):
+                    self._forget(target.id)
+                    if kind == 'module':
+                        self.modules.add(target.id)
+                    elif kind == 'mark_generator':
+                        self.mark_generators.add(target.id)
+                    elif kind == 'mark':
+                        self.marks[target.id] = value
+
+    def _classify(self, value):
+        """Classify the value of an assignment.
+
+        Args:
+            value (ast.expr): The assigned expression.
+
+        Returns:
+            tuple: (str, str) one of 'module', 'mark_generator', 'mark' or None and the name of the mark for 'mark'
+        """
+        if isinstance(value, ast.Name):
+            if value.id in self.modules:
+                return 'module', None
+            if value.id in self.mark_generators:
+                return 'mark_generator', None
+            if value.id in self.marks:
+                return 'mark', self.marks[value.id]
+        elif isinstance(value, ast.Attribute) and isinstance(value.value, ast.Name):
+            if value.value.id in self.modules and value.attr == MARK:
+                return 'mark_generator', None
+            if value.value.id in self.mark_generators:
+                return 'mark', value.attr
+        elif isinstance(value, ast.Attribute) and isinstance(value.value, ast.Attribute):
+            inner = value.value
+            if isinstance(inner.value, ast.Name) and inner.value.id in self.modules and inner.attr == MARK:
+                return 'mark', value.attr
+        return None, None
+
+    def _forget(self, name):
+        """Drop a name that is being rebound.
+
+        Args:
+            name (str): The name.
+        """
+        if name != PYTEST:
+            self.modules.discard(name)
+        self.mark_generators.discard(name)
+        self.marks.pop(name, None)
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _iter_module_statements(tree):
+    """Iterate over the statements executed at module level, including those nested in 'if', 'try' and 'with' blocks,
+    but not the bodies of functions and classes.
+
+    Args:
+        tree (ast.AST): The module.
+
+    Yields:
+        ast.stmt: Every module level statement in source order.
+    """
+    todo = list(reversed(getattr(tree, 'body', [])))
+    while todo:
+        statement = todo.pop()
+        yield statement
+        if isinstance(statement, _COMPOUND_STATEMENTS):
+            nested = []
+            for field in ('body', 'orelse', 'finalbody'):
+                nested.extend(getattr(statement, field, []))
+            for handler in getattr(statement, 'handlers', []):
+                nested.extend(handler.body)
+            todo.extend(reversed(nested))
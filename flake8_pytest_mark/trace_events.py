@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import json
+import os
+import threading
+import time
+from flake8_pytest_mark import instrumentation
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class FileTracer(object):
+    """Buffers the trace events recorded while checking a single file."""
+
+    def __init__(self, filename):
+        """Start tracing a file.
+
+        Args:
+            filename (str): The name of the file being checked.
+        """
+        self.filename = filename
+        self.events = []
+        self._pid = os.getpid()
+        self._tid = threading.current_thread().ident
+        self._start = time.time()
+
+    def add_span(self, name, category, start, end, args=None):
+        """Record a complete event.
+
+        Args:
+            name (str): The name of the span.
+            category (str): The category of the span. ('file', 'node' or 'rule')
+            start (float): The start of the span in seconds since the epoch.
+            end (float): The end of the span in seconds since the epoch.
+            args (dict): Additional details shown for the span.
+        """
+        self.events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': self._pid, 'tid': self._tid,
+                            'ts': int(start * 1e6), 'dur': int((end - start) * 1e6), 'args': args or {}})
+
+    def add_rule(self, rule_func, mark, start, end, violations):
+        """Record the evaluation of a rule.
+
+        Args:
+            rule_func (callable): The rule function that was evaluated.
+            mark (str): The name of the mark the rule was evaluated for.
+            start (float): The start of the evaluation in seconds since the epoch.
+            end (float): The end of the evaluation in seconds since the epoch.
+            violations (int): The number of violations produced.
+        """
+        name = '{}[{}]'.format(instrumentation.rule_family(rule_func), mark)
+        self.add_span(name, 'rule', start, end, {'violations': violations})
+
+    def finish(self):
+        """Stop tracing the file.
+
+        Returns:
+            list: The trace events of the file, beginning with the span covering the whole file.
+        """
+        self.events.insert(0, {'name': self.filename, 'cat': 'file', 'ph': 'X', 'pid': self._pid, 'tid': self._tid,
+                               'ts': int(self._start * 1e6), 'dur': int((time.time() - self._start) * 1e6),
+                               'args': {}})
+        return self.events
+
+
+class TraceWriter(object):
+    """Streams trace events to a file in the Chrome trace event format (viewable in chrome://tracing or Perfetto)."""
+
+    def __init__(self, path):
+        """Open the trace file for writing.
+
+        Args:
+            path (str): The path of the trace file.
+        """
+        self._file = io.open(path, 'w', encoding='utf-8')
+        self._file.write(u'{"traceEvents": [\n')
+        self._separator = u''
+        self._pids = set()
+
+    def write(self, events):
+        """Write the trace events of a single file.
+
+        Args:
+            events (list): The events returned by 'FileTracer.finish'.
+        """
+        for event in events:
+            if event['pid'] not in self._pids:
+                self._pids.add(event['pid'])
+                self._write_event({'name': 'process_name', 'ph': 'M', 'pid': event['pid'],
+                                   'args': {'name': 'flake8 worker {}'.format(event['pid'])}})
+            self._write_event(event)
+
+    def close(self):
+        """Terminate the JSON document and close the trace file."""
+        self._file.write(u'\n], "displayTimeUnit": "ms"}\n')
+        self._file.close()
+
+    def _write_event(self, event):
+        """Write a single event.
+
+        Args:
+            event (dict): The trace event.
+        """
+        self._file.write(self._separator + json.dumps(event, sort_keys=True))
+        self._separator = u',\n'
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import heapq
+import sys
+import time
+from flake8_pytest_mark import instrumentation
+
+
+# ======================================================================================================================
+# Classes
+# ======================================================================================================================
+class FileWatchdog(object):
+    """Times a single file and its test definitions and warns about the ones exceeding the configured thresholds."""
+
+    def __init__(self, filename, file_threshold=0, node_threshold=0, stream=None):
+        """Start timing a file.
+
+        Args:
+            filename (str): The name of the file being checked.
+            file_threshold (float): Warn when checking the file takes longer than this many seconds. (0 never warns)
+            node_threshold (float): Warn when a test definition takes longer than this many seconds. (0 never warns)
+            stream (file): The stream to write warnings to. (Defaults to stderr)
+        """
+        self.filename = filename
+        self.file_threshold = file_threshold
+        self.node_threshold = node_threshold
+        self.stream = stream
+        self.slowest_node = None    # (float('seconds'), str('qualname'), int('line'), str('dominant rule'))
+        self._node_rules = {}       # { str('rule'): float('seconds') } for the current test definition
+        self._file_rules = {}       # { str('rule'): float('seconds') } for the whole file
+        self._start = time.time()
+
+    def add_rule(self, rule_func, mark, seconds):
+        """Record the evaluation of a rule for the current test definition.
+
+        Args:
+            rule_func (callable): The rule function that was evaluated.
+            mark (str): The name of the mark the rule was evaluated for.
+            seconds (float): The duration of the evaluation.
+        """
+        rule = '{}[{}]'.format(instrumentation.rule_family(rule_func), mark)
+        self._node_rules[rule] = self._node_rules.get(rule, 0.0) + seconds
+
+    def end_node(self, qualname, line, seconds):
+        """Finish timing a test definition.
+
+        Args:
+            qualname (str): The dotted name of the test definition.
+            line (int): The line of the test definition.
+            seconds (float): The time spent checking the test definition.
+        """
+        rule = _dominant(self._node_rules)
+        for name, value in self._node_rules.items():
+            self._file_rules[name] = self._file_rules.get(name, 0.0) + value
+        self._node_rules = {}
+
+        if self.slowest_node is None or seconds > self.slowest_node[0]:
+            self.slowest_node = (seconds, qualname, line, rule)
+        if self.node_threshold and seconds > self.node_threshold:
+            self._warn('slow test definition {}:{} {} took {:.3f}s (dominant rule {})'.format(
+                self.filename, line, qualname, seconds, rule))
+
+    def finish(self):
+        """Stop timing the file.
+
+        Returns:
+            dict: The timing record of the file.
+        """
+        seconds = time.time() - self._start
+        record = {'path': self.filename, 'seconds': seconds, 'rule': _dominant(self._file_rules),
+                  'node': list(self.slowest_node) if self.slowest_node else None}
+        if self.file_threshold and seconds > self.file_threshold:
+            self._warn('slow file {} took {:.3f}s ({})'.format(self.filename, seconds, describe(record)))
+        return record
+
+    def _warn(self, message):
+        """Write a warning.
+
+        Args:
+            message (str): The warning.
+        """
+        (self.stream or sys.stderr).write(u'flake8-pytest-mark: {}\n'.format(message))
+
+
+class SlowestFilesReport(object):
+    """Keeps the slowest files of a run and reports them at the end of the run."""
+
+    def __init__(self, count, stream=None):
+        """Create an empty report.
+
+        Args:
+            count (int): The number of files to report.
+            stream (file): The stream to print the report to. (Defaults to stdout)
+        """
+        self.count = count
+        self.stream = stream
+        self._heap = []     # min heap of (float('seconds'), int('order'), dict('record'))
+        self._order = 0
+
+    def add(self, record):
+        """Consider a file for the report.
+
+        Args:
+            record (dict): A record created by 'FileWatchdog.finish'.
+        """
+        self._order += 1
+        item = (record['seconds'], self._order, record)
+        if len(self._heap) < self.count:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def report(self):
+        """Print the slowest files, slowest first."""
+        stream = self.stream or sys.stdout
+        stream.write(u'slowest {} files checked by flake8-pytest-mark:\n'.format(len(self._heap)))
+        for seconds, _, record in sorted(self._heap, reverse=True):
+            stream.write(u'{:>10.3f}s {} ({})\n'.format(seconds, record['path'], describe(record)))
+
+
+# ======================================================================================================================
+# Public Functions
+# ======================================================================================================================
+def describe(record):
+    """Describe where the time of a file was spent.
+
+    Args:
+        record (dict): A record created by 'FileWatchdog.finish'.
+
+    Returns:
+        str: The slowest test definition and the dominant rule of the file.
+    """
+    if record['node'] is None:
+        return 'no test definitions'
+    seconds, qualname, line, _ = record['node']
+    return 'slowest test definition {}:{} {:.3f}s, dominant rule {}'.format(qualname, line, seconds, record['rule'])
+
+
+# ======================================================================================================================
+# Private Functions
+# ======================================================================================================================
+def _dominant(rule_seconds):
+    """Find the rule that took the most time.
+
+    Args:
+        rule_seconds (dict): The seconds spent per rule.
+
+    Returns:
+        str: The name of the rule or None if no rule was evaluated.
+    """
+    return max(rule_seconds, key=rule_seconds.get) if rule_seconds else None
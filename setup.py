@@ -21,12 +21,21 @@ setup(
         'flake8.extension': [
             'M = flake8_pytest_mark:MarkChecker',
         ],
+        'console_scripts': [
+            'flake8-pytest-mark = flake8_pytest_mark.cli:main',
+        ],
     },
     packages=['flake8_pytest_mark'],
     include_package_data=True,
     install_requires=[
         'flake8>=3.5.0',
     ],
+    extras_require={
+        'toml': [
+            'tomli; python_version >= "3.6" and python_version < "3.11"',
+            'toml; python_version < "3.6"',
+        ],
+    },
     python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*',
     license='Apache Software License 2.0',
     zip_safe=False,
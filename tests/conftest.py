@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import pytest
 from flake8_pytest_mark import MarkChecker
+from flake8_pytest_mark.run_context import RunContext
 
 pytest_plugins = ['helpers_namespace']
 
@@ -26,5 +27,5 @@ def run_around_tests():
     Code before the yield will run before each test.
     Code after the yield will run after each test.
     """
-    MarkChecker.pytest_marks = dict.fromkeys(["pytest_mark{}".format(x) for x in range(1, 50)], {})
+    MarkChecker.context = RunContext()
     yield
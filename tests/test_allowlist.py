@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for validating mark values against the values listed in an allowlist file."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+from flake8_pytest_mark import allowlist, config
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+marked = """
+    @pytest.mark.jira('JIRA-1')
+    def test_listed():
+        pass
+
+    @pytest.mark.jira('JIRA-3')
+    def test_not_listed():
+        pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_values_must_be_listed(flake8dir):
+    """Verify that values missing from the allowlist file are reported."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=jira,value_allowlist_file=jira_ids.txt
+    """)
+    flake8dir.make_file('jira_ids.txt', """
+        # open tickets
+        JIRA-1
+
+        JIRA-2
+    """)
+    flake8dir.make_example_py(marked)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    expected = ["./example.py:5:1: M601 the mark values '['JIRA-3']' do not match the configuration specified by "
+                "pytest_mark1, Values must be listed in 'jira_ids.txt'"]
+    pytest.helpers.assert_lines(expected, result.out_lines)
+
+
+def test_combined_with_regex(flake8dir):
+    """Verify that a value must match the regex and be listed, and is reported once when it does neither."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=jira,value_regex=JIRA-\\d+,value_allowlist_file=jira_ids.txt
+    """)
+    flake8dir.make_file('jira_ids.txt', 'JIRA-1\nold-1\n')
+    flake8dir.make_example_py("""
+        @pytest.mark.jira('JIRA-1')
+        def test_valid():
+            pass
+
+        @pytest.mark.jira('old-1')
+        def test_listed_but_malformed():
+            pass
+
+        @pytest.mark.jira('bad')
+        def test_neither():
+            pass
+
+        @pytest.mark.jira('JIRA-9')
+        def test_well_formed_but_not_listed():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    expected = ["./example.py:5:1: M601 the mark values '['old-1']' do not match the configuration specified by "
+                "pytest_mark1, Configured regex: 'JIRA-\\d+'",
+                "./example.py:9:1: M601 the mark values '['bad']' do not match the configuration specified by "
+                "pytest_mark1, Configured regex: 'JIRA-\\d+'",
+                "./example.py:13:1: M601 the mark values '['JIRA-9']' do not match the configuration specified by "
+                "pytest_mark1, Values must be listed in 'jira_ids.txt'"]
+    pytest.helpers.assert_lines(expected, result.out_lines)
+
+
+def test_missing_file(flake8dir):
+    """Verify that every value is reported when the allowlist file cannot be read."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=jira,value_allowlist_file=missing.txt
+    """)
+    flake8dir.make_example_py(marked)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert [line.split(':')[1] for line in result.out_lines] == ['1', '5']
+    assert all("Allowlist file 'missing.txt' could not be read" in line for line in result.out_lines)
+
+
+def test_toml_path_is_relative_to_the_table(tmpdir):
+    """Verify that an allowlist file configured in TOML is found next to the file holding the table."""
+
+    # Setup
+    source = tmpdir.join('configs', 'marks.toml')
+    table = {'marks': [{'name': 'jira', 'value_allowlist_file': 'jira_ids.txt'}]}
+
+    # Test
+    marks = config.compile_marks(table, str(source))
+    assert marks == [[None, {'name': 'jira', 'value_allowlist_file': str(tmpdir.join('configs', 'jira_ids.txt'))}]]
+    with pytest.raises(config.ConfigError):
+        config.compile_marks({'marks': [{'name': 'jira', 'value_allowlist_file': ''}]}, str(source))
+
+
+def test_large_files_are_searched_on_disk(tmpdir, monkeypatch):
+    """Verify that files above the size threshold are sorted once into the cache and searched by bisection."""
+
+    # Setup
+    monkeypatch.setattr(allowlist, 'SET_INDEX_MAX_BYTES', 0)
+    values = ['ID-{}'.format(i) for i in range(500)] + [u'ñ-1', 'a', 'zzz']
+    source = tmpdir.join('ids.txt')
+    source.write_text(u'# header\n' + u'\n'.join(reversed(values)) + u'\n\n', encoding='utf-8')
+    cache_dir = tmpdir.join('cache')
+
+    # Test
+    index = allowlist.load_index(str(source), str(cache_dir))
+    assert isinstance(index, allowlist.SortedFileIndex)
+    assert len(cache_dir.listdir()) == 1
+    assert all(value in index for value in values)
+    assert not any(value in index for value in ('', 'ID-', 'ID-5000', 'A', 'zzzz', '# header', u'ñ'))
+    assert allowlist.load_index(str(source), str(cache_dir)) is not index
+    assert len(cache_dir.listdir()) == 1
+
+
+def test_small_files_are_held_in_memory(tmpdir):
+    """Verify that files below the size threshold are loaded in a set, and that a run loads each file once."""
+
+    # Setup
+    source = tmpdir.join('ids.txt')
+    source.write('JIRA-1\r\nJIRA-2\r\n')
+    cache = allowlist.AllowlistCache(str(tmpdir.join('cache')))
+
+    # Test
+    index, error = cache.get(str(source))
+    assert isinstance(index, allowlist.SetIndex)
+    assert error is None
+    assert 'JIRA-2' in index and 'JIRA-3' not in index
+    assert cache.get(str(source))[0] is index
+    assert cache.get(str(tmpdir.join('missing.txt')))[0] is None
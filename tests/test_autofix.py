@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the 'fix' command, adding generated values for missing 'value_match=uuid' marks."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import subprocess
+import sys
+import uuid
+import pytest
+from flake8_pytest_mark import autofix, run_context, scopes
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+config = """
+[flake8]
+pytest_mark1 = name=test_id,value_match=uuid,enforce_unique_value=true
+pytest_mark2 = name=jira,value_regex=^JIRA-\\d+$
+"""
+EXISTING = '5b8bd7a0-ef1d-4f4d-9bd0-1f9e77e5a1aa'
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def run_fix(flake8dir, *args):
+    """Run the 'fix' command in the flake8dir.
+
+    Returns:
+        tuple: (str, str) the standard output and error.
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'flake8_pytest_mark.cli', 'fix'] + list(args),
+                               cwd=str(flake8dir.tmpdir), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    assert process.returncode == 0, err
+    return out.decode('utf-8'), err.decode('utf-8')
+
+
+def context_for(**marks):
+    """Create a run context configuring marks by number."""
+    return run_context.RunContext({'pytest_mark{}'.format(n): conf for n, conf in
+                                   ((int(key[1:]), conf) for key, conf in marks.items())})
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_fix_tree(flake8dir):
+    """Verify that every missing mark is added in a process pool and that the tree then only misses other marks."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('unit/test_a.py', """
+        import pytest
+
+
+        @pytest.mark.jira('JIRA-1')
+        def test_function():
+            pass
+
+
+        class TestClass(object):
+
+            @pytest.mark.test_id('{}')
+            def test_marked(self):
+                pass
+
+            def test_method(self):
+                pass
+    """.format(EXISTING))
+    for i in range(6):
+        flake8dir.make_file('unit/test_{}.py'.format(i), """
+            import pytest as pt
+
+
+            def test_one():
+                pass
+        """)
+
+    # Test
+    out, err = run_fix(flake8dir, '--jobs', '3')
+    assert out == ''
+    assert err.strip() == 'Added 9 marks to 7 files'
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 9
+    assert all(line.endswith('M502 test definition not marked with jira') for line in result.out_lines)
+
+    fixed = flake8dir.tmpdir.join('unit', 'test_a.py').read().splitlines()
+    assert fixed[3].startswith("@pytest.mark.test_id('")
+    assert fixed[4:6] == ["@pytest.mark.jira('JIRA-1')", 'def test_function():']
+    assert fixed[9].startswith("@pytest.mark.test_id('")
+    assert fixed[10] == 'class TestClass(object):'
+    assert fixed[16].startswith("    @pytest.mark.test_id('")
+    assert fixed[17] == '    def test_method(self):'
+    assert flake8dir.tmpdir.join('unit', 'test_0.py').read().splitlines()[3].startswith("@pt.mark.test_id('")
+
+
+def test_dry_run(flake8dir):
+    """Verify that a dry run prints a diff and leaves the files untouched."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    source = "def test_example():\n    pass\n"
+    flake8dir.make_file('test_example.py', source)
+
+    # Test
+    out, err = run_fix(flake8dir, '--dry-run')
+    assert err.strip() == 'Would add 1 marks to 1 files'
+    lines = out.splitlines()
+    assert lines[:3] == ['--- a/test_example.py', '+++ b/test_example.py', '@@ -1,2 +1,6 @@']
+    assert lines[3:6] == ['+import pytest', '+', '+']
+    assert lines[6].startswith("+@pytest.mark.test_id('")
+    assert flake8dir.tmpdir.join('test_example.py').read() == source
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_outputs_are_untouched(flake8dir, jobs):
+    """Verify that fixing never opens the report, inventory and baseline the flake8 configuration names."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config + 'pytest_mark_report = report.json\n'
+                                      'pytest_mark_inventory = inventory.jsonl\n'
+                                      'pytest_mark_baseline = baseline.json\n'
+                                      'pytest_mark_update_baseline = true\n')
+    flake8dir.make_file('test_a.py', "def test_a():\n    pass\n")
+    flake8dir.make_file('test_b.py', "def test_b():\n    pass\n")
+    outputs = ('report.json', 'inventory.jsonl', 'baseline.json')
+    for name in outputs:
+        flake8dir.make_file(name, '{"kept": true}\n')
+
+    # Test
+    for args in (['--dry-run', '-j', jobs], ['-j', jobs]):
+        run_fix(flake8dir, *args)
+        assert [flake8dir.tmpdir.join(name).read() for name in outputs] == ['{"kept": true}\n'] * len(outputs)
+    assert "@pytest.mark.test_id('" in flake8dir.tmpdir.join('test_a.py').read()
+
+
+def test_formatting_is_preserved(tmpdir):
+    """Verify that line endings, docstrings and future imports are kept and 'import pytest' is added after them."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write_binary(b'"""Tests."""\r\nfrom __future__ import print_function\r\nX = 1\r\n\r\n\r\n'
+                      b'def test_example():\r\n    pass')
+    context = context_for(m1={'name': 'test_id', 'value_match': 'uuid'})
+
+    # Test
+    plan = autofix.plan_file(str(path), context)
+    result = autofix.apply_plan(plan, ['generated'])
+    assert result.added == 1
+    assert path.read_binary() == (b'"""Tests."""\r\nfrom __future__ import print_function\r\nimport pytest\r\nX = 1\r\n'
+                                  b"\r\n\r\n@pytest.mark.test_id('generated')\r\ndef test_example():\r\n    pass")
+
+
+def test_only_generated_marks_are_fixed(tmpdir):
+    """Verify that marks whose values cannot be generated are left alone, as are excluded definitions."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write('import pytest\n\n\nclass TestClass(object):\n    def test_method(self):\n        pass\n')
+    context = context_for(m1={'name': 'jira', 'value_match': 'uuid', 'value_regex': '^JIRA'},
+                          m2={'name': 'owner', 'value_match': 'uuid', 'value_allowlist_file': 'owners.txt'},
+                          m3={'name': 'test_id', 'value_match': 'uuid', 'exclude_classes': 'true'})
+
+    # Test
+    plan = autofix.plan_file(str(path), context)
+    assert [(slot.line, slot.indent, slot.decorator) for slot in plan.slots] == [(4, '    ', '@pytest.mark.test_id')]
+    assert plan.import_line is None
+
+
+def test_values_never_collide(tmpdir, mocker):
+    """Verify that generated values skip the ones used in the planned files and the ones collected by the run."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write("import pytest\n\n\n@pytest.mark.test_id('{}')\ndef test_a():\n    pass\n\n\n"
+               "def test_b():\n    pass\n".format(EXISTING))
+    context = context_for(m1={'name': 'test_id', 'value_match': 'uuid'})
+    collected = '0d5b7a4e-5e4b-4d8f-8f43-3c1d2a0b9c11'
+    context.unique_values.register('test_id', collected, None)
+    fresh = '7c9e6679-7425-40de-944b-e07fc1f90ae7'
+    mocker.patch.object(uuid, 'uuid4', side_effect=[uuid.UUID(EXISTING), uuid.UUID(collected), uuid.UUID(fresh)])
+
+    # Test
+    plan = autofix.plan_file(str(path), context)
+    assert autofix.assign_values([plan], context) == {str(path): [fresh]}
+
+
+def test_values_never_collide_with_scoped_values(tmpdir, mocker):
+    """Verify that generated values skip the ones collected in the partitions of a 'unique_scope'."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write("import pytest\n\n\ndef test_a():\n    pass\n")
+    context = context_for(m1={'name': 'test_id', 'value_match': 'uuid', 'enforce_unique_value': 'true',
+                              'unique_scope': 'directory'})
+    context.unique_values.register('test_id', EXISTING, None, scopes.scope_key('directory', str(path)))
+    fresh = '7c9e6679-7425-40de-944b-e07fc1f90ae7'
+    mocker.patch.object(uuid, 'uuid4', side_effect=[uuid.UUID(EXISTING), uuid.UUID(fresh)])
+
+    # Test
+    plan = autofix.plan_file(str(path), context)
+    assert autofix.assign_values([plan], context) == {str(path): [fresh]}
+
+
+def test_values_never_collide_with_other_files(tmpdir, mocker):
+    """Verify that generated values skip the ones used by the files left out of a partial fix."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write("import pytest\n\n\ndef test_a():\n    pass\n")
+    other = tmpdir.join('other', 'test_other.py')
+    other.write("import pytest\n\n\n@pytest.mark.test_id('{}')\ndef test_b():\n    pass\n".format(EXISTING),
+                ensure=True)
+    context = context_for(m1={'name': 'test_id', 'value_match': 'uuid'})
+    fresh = '7c9e6679-7425-40de-944b-e07fc1f90ae7'
+    mocker.patch.object(uuid, 'uuid4', side_effect=[uuid.UUID(EXISTING), uuid.UUID(fresh)])
+
+    # Test
+    plan = autofix.plan_file(str(path), context)
+    indexed = autofix.index_values([str(other), str(tmpdir.join('missing.py'))], {'test_id'})
+    assert indexed == {'test_id': {EXISTING}}
+    assert autofix.assign_values([plan], context, indexed) == {str(path): [fresh]}
+
+
+def test_changed_files_are_not_rewritten(tmpdir):
+    """Verify that a file changed between planning and rewriting is reported instead of being overwritten."""
+
+    # Setup
+    path = tmpdir.join('test_example.py')
+    path.write('import pytest\n\n\ndef test_example():\n    pass\n')
+    plan = autofix.plan_file(str(path), context_for(m1={'name': 'test_id', 'value_match': 'uuid'}))
+    path.write('import pytest\n\n\ndef test_renamed():\n    pass\n')
+
+    # Test
+    result = autofix.apply_plan(plan, ['generated'])
+    assert result.error == 'the file changed since it was planned'
+    assert 'generated' not in path.read()
+
+
+@pytest.mark.parametrize('exclude, expected', [((), ['a/test_a.py', 'b/test_b.py']),
+                                               (('b',), ['a/test_a.py']),
+                                               (('test_a.py',), ['b/test_b.py'])])
+def test_iter_python_files(tmpdir, exclude, expected):
+    """Verify that directories are expanded to their Python files, skipping the excluded ones."""
+
+    # Setup
+    for name in ('a/test_a.py', 'a/notes.txt', 'b/test_b.py'):
+        tmpdir.join(name).ensure()
+
+    # Test
+    found = [p.replace(str(tmpdir) + '/', '') for p in autofix.iter_python_files([str(tmpdir)], exclude)]
+    assert found == expected
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for suppressing known violations with a baseline file. (Driven by the 'pytest_mark_baseline' and
+'pytest_mark_update_baseline' options.)
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M', '--pytest-mark-baseline', 'baseline.txt']
+
+config = """
+[flake8]
+pytest_mark1 = name=test_id
+"""
+
+legacy = """
+def test_legacy_function():
+    pass
+
+class TestLegacy(object):
+    @pytest.mark.test_id('marked')
+    def test_legacy_method(self):
+        pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_update_baseline(flake8dir):
+    """Verify that updating the baseline records every violation as a sorted fingerprint instead of reporting it."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(legacy)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-update-baseline'])
+    lines = flake8dir.tmpdir.join('baseline.txt').read().splitlines()
+    assert [] == result.out_lines
+    assert lines[0].startswith('#')
+    assert 2 == len(lines[1:])
+    assert sorted(lines[1:]) == lines[1:]
+
+
+def test_known_violations_suppressed(flake8dir):
+    """Verify that violations recorded in the baseline are not reported even after their line numbers shift, while
+    new violations still are.
+    """
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(legacy)
+    flake8dir.run_flake8(extra_args + ['--pytest-mark-update-baseline'])
+    flake8dir.make_example_py("""
+import pytest
+
+
+def test_new_function():
+    pass
+""" + legacy)
+
+    # Expectations
+    exp_out_lines = ['./example.py:4:1: M501 test definition not marked with test_id']
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
+
+
+def test_baseline_is_per_test(flake8dir):
+    """Verify that a baselined violation on one test does not suppress the same violation on a renamed test."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(legacy)
+    flake8dir.run_flake8(extra_args + ['--pytest-mark-update-baseline'])
+    flake8dir.make_example_py(legacy.replace('test_legacy_function', 'test_renamed_function'))
+
+    # Expectations
+    exp_out_lines = ['./example.py:1:1: M501 test definition not marked with test_id']
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
+
+
+def test_missing_baseline(flake8dir):
+    """Verify that a baseline file that does not exist yet is an empty baseline."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(legacy)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./example.py:1:1: M501 test definition not marked with test_id',
+                                 './example.py:4:1: M501 test definition not marked with test_id'],
+                                result.out_lines)
+
+
+def test_unreadable_baseline(flake8dir):
+    """Verify that a baseline file that cannot be read is reported instead of aborting the run."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(legacy)
+    flake8dir.tmpdir.join('baseline.txt').ensure_dir()
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 3
+    assert result.out_lines[0].startswith("./example.py:0:1: M405 invalid configuration: baseline file "
+                                          "'baseline.txt' could not be read:")
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the synthetic corpus used by the benchmarks."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import json
+import pytest
+from benchmarks import corpus, harness
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_corpus_violations(tmpdir, mocker):
+    """Verify that the corpus produces one violation per invalid and duplicate value, in process and through flake8."""
+
+    # Setup
+    directory = str(tmpdir.join('corpus'))
+    generator = corpus.CorpusGenerator(tests=10, decorators=3, invalid=0.2, duplicate=0.2, seed=1)
+    summary = corpus.write_corpus(directory, 5, generator)
+
+    # Mock
+    mocker.patch.dict('flake8_pytest_mark.rules._unique_value_collision_map', {})
+
+    # Test
+    harness.configure_checker(directory)
+    _, violations = harness.check_trees(harness.parse_files(corpus.iter_corpus_files(directory)))
+    _, lines = harness.run_flake8(directory)
+    assert 5 == summary.files
+    assert 55 == summary.tests     # 10 test definitions and a method container per file
+    assert summary.tests == summary.valid + summary.invalid + summary.duplicate
+    assert summary.invalid + summary.duplicate == violations == len(lines)
+    assert summary.invalid == len([line for line in lines if ' M601 ' in line])
+
+
+def test_corpus_is_reproducible():
+    """Verify that the same parameters and seed generate the same modules."""
+
+    # Test
+    assert corpus.CorpusGenerator(duplicate=0.5, seed=3).source(0) == corpus.CorpusGenerator(duplicate=0.5,
+                                                                                             seed=3).source(0)
+
+
+def test_corpus_rejects_invalid_fractions():
+    """Verify that the fractions of invalid and duplicate values cannot exceed the whole corpus."""
+
+    # Test
+    with pytest.raises(ValueError):
+        corpus.CorpusGenerator(invalid=0.6, duplicate=0.6)
+
+
+def test_compare_results_in_another_environment(tmpdir, capsys):
+    """Verify that results recorded in another environment are compared for information only."""
+
+    # Setup
+    path = str(tmpdir.join('results.json'))
+    harness.write_results(path, 'throughput', {'files': 1}, {'checker': {'tests_per_second': 100.0}})
+    slower = {'checker': {'tests_per_second': 50.0}}
+
+    # Test
+    assert ['checker'] == harness.compare_results(path, 'throughput', {'files': 1}, slower, 'tests_per_second', 0.1)
+    recorded = json.loads(tmpdir.join('results.json').read())
+    recorded['environment']['python'] = '0.0.0'
+    tmpdir.join('results.json').write(json.dumps(recorded))
+    assert [] == harness.compare_results(path, 'throughput', {'files': 1}, slower, 'tests_per_second', 0.1)
+    assert 'recorded in another environment (python: 0.0.0 != ' in capsys.readouterr().out
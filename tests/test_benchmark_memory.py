@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the memory scaling benchmark."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+
+pytest.importorskip('tracemalloc')
+from benchmarks import bench_memory, corpus  # noqa: E402
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_measure_worker(tmpdir, mocker):
+    """Verify that the memory retained by the unique values is attributed to the tracked values and files."""
+
+    # Setup
+    directory = str(tmpdir.join('corpus'))
+    corpus.write_corpus(directory, 4, corpus.CorpusGenerator(tests=5, kinds=('function',)))
+
+    # Mock
+    mocker.patch.dict('flake8_pytest_mark.rules._unique_value_collision_map', {})
+
+    # Test
+    result = bench_memory.measure_worker(directory, 3)
+    assert 3 == result['files']
+    assert 15 == result['tracked_values']
+    assert result['retained_bytes'] > 0
+    assert result['bytes_per_file'] == pytest.approx(result['retained_bytes'] / 3.0)
+
+
+def test_find_superlinear():
+    """Verify that only growth beyond the growth of the number of files is flagged."""
+
+    # Setup
+    results = {'files_10': {'retained_bytes': 1000},
+               'files_100': {'retained_bytes': 11000},
+               'files_1000': {'retained_bytes': 200000}}
+
+    # Test
+    assert ['100 -> 1000 files: retained memory grew 18.2x for 10.0x the files'] == \
+        bench_memory.find_superlinear(results, [10, 100, 1000], 0.25)
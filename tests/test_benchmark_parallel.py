@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the parallel scaling and thread pool benchmarks."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+from benchmarks import bench_parallel, bench_threads
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_violation_set():
+    """Verify that only violations reported by the plugin are compared."""
+
+    # Test
+    assert frozenset(['./a.py:1:1: M501 test definition not marked with test_id']) == bench_parallel.violation_set(
+        ['./a.py:1:1: M501 test definition not marked with test_id', './a.py:2:1: E302 expected 2 blank lines',
+         'Traceback (most recent call last):'])
+
+
+def test_find_differences():
+    """Verify that violations missing or unexpected compared to a single job are described."""
+
+    # Setup
+    serial = frozenset(['./a.py:1:1: M301 duplicate', './b.py:1:1: M501 missing'])
+    violations = {1: serial, 2: serial, 4: frozenset(['./b.py:1:1: M501 missing', './c.py:1:1: M301 duplicate'])}
+
+    # Test
+    assert ['--jobs 4: 1 violations missing and 1 unexpected compared to --jobs 1',
+            '    missing    ./a.py:1:1: M301 duplicate',
+            '    unexpected ./c.py:1:1: M301 duplicate'] == bench_parallel.find_differences(violations)
+
+
+def test_threads_summarize():
+    """Verify that uniqueness violations are counted apart from the ones that do not depend on other files."""
+
+    # Test
+    assert (frozenset([('./a.py', 1, 'M501 missing')]), 2) == bench_threads.summarize(
+        {'./a.py': [(1, 0, 'M501 missing'), (2, 0, 'M301 duplicate')], './b.py': [(3, 0, 'M301 duplicate')]})
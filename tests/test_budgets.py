@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for stopping early once a budget is spent. (Driven by the 'pytest_mark_max_violations_per_file',
+'pytest_mark_max_violations' and 'pytest_mark_time_budget' options.)
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+
+unmarked = """
+def test_one():
+    pass
+
+def test_two():
+    pass
+
+def test_three():
+    pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_max_violations_per_file(flake8dir):
+    """Verify that a file stops being checked once it reaches the configured number of violations."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark_max_violations_per_file = 2
+    """)
+    flake8dir.make_example_py(unmarked)
+
+    # Expectations
+    exp_out_lines = ['./example.py:1:1: M501 test definition not marked with test_id',
+                     './example.py:4:1: M501 test definition not marked with test_id',
+                     './example.py:7:1: M402 stopped checking this file after 2 violations '
+                     '(pytest_mark_max_violations_per_file)']
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
+
+
+def test_max_violations(flake8dir):
+    """Verify that the whole run stops being checked once it reaches the configured number of violations and that the
+    summary violation is only reported once.
+    """
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark_max_violations = 4
+    """)
+    flake8dir.make_py_files(example1=unmarked, example2=unmarked)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert 4 == len([line for line in result.out_lines if ' M501 ' in line])
+    summary = ' M403 stopped checking after 4 violations (pytest_mark_max_violations)'
+    assert 1 == len([line for line in result.out_lines if line.endswith(summary)])
+    assert 5 == len(result.out_lines)
+
+
+def test_time_budget(flake8dir):
+    """Verify that no rules are evaluated once the time budget is spent and that the summary violation is only
+    reported once.
+    """
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark_time_budget = 0.000001
+    """)
+    flake8dir.make_py_files(example1=unmarked, example2=unmarked)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert 1 == len(result.out_lines)
+    assert result.out_lines[0].endswith(':1:1: M404 stopped checking after exceeding the time budget of 1e-06 seconds '
+                                        '(pytest_mark_time_budget)')
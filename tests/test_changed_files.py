@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for changed files mode. (Driven by the 'pytest_mark_changed_since', 'pytest_mark_changed_staged' and
+'pytest_mark_unique_index' options.)
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import subprocess
+import sys
+import pytest
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+
+config = """
+[flake8]
+pytest_mark1 = name=test_id,enforce_unique_value=true
+"""
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def git(flake8dir, *args):
+    """Run a git command inside the flake8dir."""
+    cmd = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + list(args)
+    subprocess.check_call(cmd, cwd=str(flake8dir.tmpdir), stdout=subprocess.PIPE)
+
+
+@pytest.fixture
+def repo(flake8dir):
+    """A flake8dir initialized as a git repository with a committed test file that is missing marks."""
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_py_files(
+        committed="""
+            @pytest.mark.test_id('Unique!')
+            def test_committed():
+                pass
+
+            def test_unmarked():
+                pass
+        """)
+    git(flake8dir, 'init', '-q')
+    git(flake8dir, 'add', '.')
+    git(flake8dir, 'commit', '-q', '-m', 'base')
+    return flake8dir
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_collision_with_unchanged_file(repo):
+    """Verify that a changed file is checked against the mark values of unchanged files which are not checked."""
+
+    # Setup
+    repo.make_py_files(
+        changed="""
+            @pytest.mark.test_id('Unique!')
+            def test_changed():
+                pass
+        """)
+
+    # Expectations
+    exp_out_lines = ["./changed.py:1:1: M301 @pytest.mark.test_id value is not unique! "
+                     "The 'Unique!' mark value already specified for the 'test_committed' test at line '1' "
+                     "found in the './committed.py' file!"]
+
+    # Test
+    result = repo.run_flake8(extra_args + ['--pytest-mark-changed-since', 'HEAD'])
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
+
+
+def test_modified_file_is_not_checked_against_itself(repo):
+    """Verify that the base version of a modified file does not collide with its current version."""
+
+    # Setup
+    repo.make_py_files(
+        committed="""
+            @pytest.mark.test_id('Unique!')
+            def test_committed():
+                pass
+        """)
+
+    # Test
+    result = repo.run_flake8(extra_args + ['--pytest-mark-changed-since', 'HEAD'])
+    assert [] == result.out_lines
+
+
+def test_staged_files(repo):
+    """Verify that only staged files are checked when configured to use the staging area."""
+
+    # Setup
+    repo.make_setup_cfg(config + "pytest_mark_changed_staged = true\n")
+    repo.make_py_files(
+        staged="""
+            @pytest.mark.test_id('Unique!')
+            def test_staged():
+                pass
+        """,
+        unstaged="""
+            def test_unstaged():
+                pass
+        """)
+    git(repo, 'add', 'staged.py')
+
+    # Expectations
+    exp_out_lines = ["./staged.py:1:1: M301 @pytest.mark.test_id value is not unique! "
+                     "The 'Unique!' mark value already specified for the 'test_committed' test at line '1' "
+                     "found in the './committed.py' file!"]
+
+    # Test
+    result = repo.run_flake8(extra_args)
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
+
+
+def test_prebuilt_index(repo):
+    """Verify that mark values of unchanged files can be loaded from an index built by 'build-index'."""
+
+    # Setup
+    subprocess.check_call([sys.executable, '-m', 'flake8_pytest_mark.cli', 'build-index', '-o', 'marks.idx'],
+                          cwd=str(repo.tmpdir))
+    repo.make_py_files(
+        changed="""
+            @pytest.mark.test_id('Unique!')
+            def test_changed():
+                pass
+        """)
+
+    # Expectations
+    exp_out_lines = ["./changed.py:1:1: M301 @pytest.mark.test_id value is not unique! "
+                     "The 'Unique!' mark value already specified for the 'test_committed' test at line '1' "
+                     "found in the './committed.py' file!"]
+
+    # Test
+    result = repo.run_flake8(extra_args + ['--pytest-mark-changed-since', 'HEAD',
+                                           '--pytest-mark-unique-index', 'marks.idx'])
+    # noinspection PyUnresolvedReferences
+    pytest.helpers.assert_lines(exp_out_lines, result.out_lines)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for marks inherited from class decorators and 'pytestmark'."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+config = """
+    [flake8]
+    pytest_mark1 = name=suite,allow_inherited=true
+    pytest_mark2 = name=test_id
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_class_decorators_are_inherited(flake8dir):
+    """Verify that the methods of a marked class inherit its marks, including through nested classes."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py("""
+        @pytest.mark.suite('api')
+        @pytest.mark.test_id('a')
+        class TestClass(object):
+            @pytest.mark.test_id('b')
+            def test_method(self):
+                pass
+
+            class TestNested(object):
+                @pytest.mark.test_id('c')
+                def test_nested(self):
+                    pass
+
+            def test_unmarked(self):
+                pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./example.py:8:1: M502 test definition not marked with test_id',
+                                 './example.py:13:1: M502 test definition not marked with test_id'],
+                                result.out_lines)
+
+
+def test_pytestmark_is_inherited(flake8dir):
+    """Verify that module and class level 'pytestmark' apply to every test they contain."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=suite,allow_inherited=true
+        pytest_mark2 = name=speed,allow_inherited=true
+    """)
+    flake8dir.make_example_py("""
+        from pytest import mark
+        pytestmark = [mark.suite('api')]
+
+        def test_function():
+            pass
+
+        class TestClass(object):
+            pytestmark = mark.speed('slow')
+
+            def test_method(self):
+                pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./example.py:4:1: M502 test definition not marked with speed',
+                                 './example.py:7:1: M502 test definition not marked with speed'],
+                                result.out_lines)
+
+
+def test_inheritance_is_opt_in(flake8dir):
+    """Verify that marks without 'allow_inherited' must decorate every test definition."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_example_py("""
+        pytestmark = pytest.mark.test_id('a')
+
+        @pytest.mark.test_id('b')
+        class TestClass(object):
+            def test_method(self):
+                pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert result.out_lines == ['./example.py:5:1: M501 test definition not marked with test_id']
+
+
+def test_pytestmark_values_are_checked(flake8dir):
+    """Verify that the values assigned by 'pytestmark' are validated and claimed once, where they are assigned."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,value_match=uuid,enforce_unique_value=true,allow_inherited=true,
+                       exclude_classes=true
+    """)
+    flake8dir.make_file('test_a.py', """
+        import pytest
+        pytestmark = pytest.mark.test_id('not-a-uuid')
+
+        def test_one():
+            pass
+
+        def test_two():
+            pass
+    """)
+    flake8dir.make_file('test_b.py', """
+        import pytest
+
+
+        class TestClass(object):
+            pytestmark = [pytest.mark.test_id('5b8bd7a0-ef1d-4f4d-9bd0-1f9e77e5a1aa')]
+
+            def test_method(self):
+                pass
+
+        @pytest.mark.test_id('5b8bd7a0-ef1d-4f4d-9bd0-1f9e77e5a1aa')
+        def test_function():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--jobs', '1'])
+    lines = sorted(result.out_lines)
+    assert len(lines) == 2
+    assert lines[0].startswith("./test_a.py:2:1: M601 the mark values '['not-a-uuid']' do not match")
+    assert lines[1].startswith('./test_b.py:10:1: M301 @pytest.mark.test_id value is not unique! The '
+                               "'5b8bd7a0-ef1d-4f4d-9bd0-1f9e77e5a1aa' mark value already specified for "
+                               "the 'TestClass.pytestmark' test at line '5'")
+
+
+def test_pytestmark_values_of_other_marks_are_not_checked(flake8dir):
+    """Verify that the values assigned by 'pytestmark' are only checked for the marks accepting inherited marks."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,value_match=uuid
+        pytest_mark2 = name=suite,allow_inherited=true
+    """)
+    flake8dir.make_example_py("""
+        pytestmark = [pytest.mark.test_id('not-a-uuid'), pytest.mark.suite('api')]
+
+        @pytest.mark.test_id('5b8bd7a0-ef1d-4f4d-9bd0-1f9e77e5a1aa')
+        def test_one():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert result.out_lines == []
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for per rule timing and counters. (Driven by the 'pytest_mark_instrument' option and flake8's '--benchmark'
+option.)
+"""
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+
+config = """
+[flake8]
+pytest_mark1 = name=test_id
+pytest_mark2 = name=jira,exclude_classes=true
+"""
+
+example = """
+class TestExample(object):
+    @pytest.mark.test_id('b360c12d-0d47-4cfc-9f9e-5d86c315b1e4')
+    def test_method(self):
+        pass
+"""
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def parse_benchmarks(out_lines):
+    """Map the statistic names of the instrumentation report to their values."""
+    benchmarks = {}
+    for line in out_lines:
+        value, _, statistic = line.partition(' ')
+        if statistic.strip().startswith('pytest-mark '):
+            benchmarks[statistic.strip()] = float(value)
+    return benchmarks
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_instrumentation_counters(flake8dir):
+    """Verify that nodes, rule calls and violations are counted per rule family and per mark."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-instrument'])
+    benchmarks = parse_benchmarks(result.out_lines)
+    assert 1 == benchmarks['pytest-mark files']
+    assert 2 == benchmarks['pytest-mark test definitions']
+    assert 6 == benchmarks['pytest-mark rule evaluations skipped']    # jira on the class for all six families
+    assert 2 == benchmarks['pytest-mark m5xx[test_id] calls']
+    assert 1 == benchmarks['pytest-mark m5xx[test_id] violations']
+    assert 1 == benchmarks['pytest-mark m5xx[jira] calls']
+    assert 1 == benchmarks['pytest-mark m5xx[jira] violations']
+    assert 0 <= benchmarks['pytest-mark m5xx seconds']
+
+
+def test_benchmark_enables_instrumentation(flake8dir):
+    """Verify that flake8's '--benchmark' output includes the instrumentation report."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--benchmark'])
+    assert 'pytest-mark m3xx[test_id] calls' in parse_benchmarks(result.out_lines)
+
+
+def test_instrumentation_disabled(flake8dir):
+    """Verify that nothing is reported unless instrumentation is requested."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert {} == parse_benchmarks(result.out_lines)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for exporting the mark inventory. (Driven by the 'pytest_mark_inventory' option.)"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import json
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M', '--pytest-mark-inventory', 'inventory.jsonl']
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_inventory(flake8dir):
+    """Verify that every test definition is written to the inventory with the values of every configured mark while
+    violations are still reported.
+    """
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark2 = name=jira,allow_multiple_args=true
+    """)
+    flake8dir.make_example_py("""
+        @pytest.mark.jira('ASC-1', 'ASC-2')
+        class TestInventory(object):
+            @pytest.mark.test_id('b360c12d-0d47-4cfc-9f9e-5d86c315b1e4')
+            @pytest.mark.jira
+            def test_method(self):
+                pass
+
+        def helper():
+            pass
+    """)
+
+    # Expectations
+    exp_records = [
+        {'path': './example.py', 'qualname': 'TestInventory', 'kind': 'class', 'line': 1,
+         'marks': {'jira': ['ASC-1', 'ASC-2'], 'test_id': None}},
+        {'path': './example.py', 'qualname': 'TestInventory.test_method', 'kind': 'method', 'line': 3,
+         'marks': {'jira': [], 'test_id': ['b360c12d-0d47-4cfc-9f9e-5d86c315b1e4']}},
+    ]
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    records = [json.loads(line) for line in flake8dir.tmpdir.join('inventory.jsonl').read().splitlines()]
+    assert ['./example.py:1:1: M501 test definition not marked with test_id'] == result.out_lines
+    assert exp_records == records
+
+
+def test_inventory_multiple_files(flake8dir):
+    """Verify that the inventory covers every checked file."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_py_files(
+        example1="""
+            def test_one():
+                pass
+        """,
+        example2="""
+            def test_two():
+                pass
+        """)
+
+    # Test
+    flake8dir.run_flake8(extra_args)
+    records = [json.loads(line) for line in flake8dir.tmpdir.join('inventory.jsonl').read().splitlines()]
+    assert ['test_one', 'test_two'] == sorted(record['qualname'] for record in records)
+
+
+def test_inventory_stopped_by_budget(flake8dir):
+    """Verify that a record marks where a budget stopped checking a file, so the inventory is not silently truncated."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark_max_violations_per_file = 1
+    """)
+    flake8dir.make_example_py("""
+        def test_one():
+            pass
+
+        def test_two():
+            pass
+
+        def test_three():
+            pass
+    """)
+
+    # Test
+    flake8dir.run_flake8(extra_args)
+    records = [json.loads(line) for line in flake8dir.tmpdir.join('inventory.jsonl').read().splitlines()]
+    assert ['test_one', 'test_two'] == [record['qualname'] for record in records[:-1]]
+    assert {'path': './example.py', 'line': 4, 'stopped': 'M402'} == records[-1]
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for loading mark definitions from numbered keys and the 'pytest_marks' option."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import optparse
+import subprocess
+import sys
+import pytest
+from flake8_pytest_mark import config
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+example = """
+    def test_example():
+        pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_numbered_keys_are_unlimited(flake8dir):
+    """Verify that numbered keys above 50 are honored and produce three digit codes."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark75 = name=test_id
+        pytest_mark120 = name=jira
+    """)
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./example.py:1:1: M575 test definition not marked with test_id',
+                                 './example.py:1:1: M5120 test definition not marked with jira'], result.out_lines)
+
+
+def test_pytest_marks_option(flake8dir):
+    """Verify that every name parameter of 'pytest_marks' starts a new mark, numbered after the numbered keys."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark3 = name=test_id
+        pytest_marks =
+            name=jira,value_regex=^JIRA-\\d+$
+            name=owner
+                allow_duplicate=true
+    """)
+    flake8dir.make_example_py("""
+        @pytest.mark.jira('nope')
+        @pytest.mark.owner('me')
+        @pytest.mark.owner('you')
+        def test_example():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(["./example.py:1:1: M503 test definition not marked with test_id",
+                                 "./example.py:1:1: M604 the mark values '['nope']' do not match the configuration "
+                                 "specified by pytest_mark4, Configured regex: '^JIRA-\\d+$'"], result.out_lines)
+
+
+def test_pytest_marks_command_line(flake8dir):
+    """Verify that marks can be defined on the command line."""
+
+    # Setup
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-marks', 'name=test_id name=jira'])
+    pytest.helpers.assert_lines(['./example.py:1:1: M501 test definition not marked with test_id',
+                                 './example.py:1:1: M502 test definition not marked with jira'], result.out_lines)
+
+
+def test_deprecated_numbered_flags(flake8dir):
+    """Verify that the '--pytest-markN' flags are still accepted, override the configuration and print a warning."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=jira
+    """)
+    flake8dir.make_example_py(example)
+    args = extra_args + ['--pytest-mark1', 'name=test_id,value_match=uuid']
+
+    # Test
+    result = flake8dir.run_flake8(args)
+    pytest.helpers.assert_lines(['./example.py:1:1: M501 test definition not marked with test_id'], result.out_lines)
+    process = subprocess.Popen([sys.executable, '-m', 'flake8'] + args, cwd=str(flake8dir.tmpdir),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert 'the --pytest-markN flags are deprecated' in process.communicate()[1].decode('utf-8')
+
+
+def test_legacy_flag_numbers():
+    """Verify that only the '--pytest-markN' flags given on the command line are found."""
+
+    # Test
+    assert [1, 7] == config.legacy_flag_numbers(['--pytest-mark7=name=a', '--pytest-marks', 'name=b', '--pytest-mark1',
+                                                 'name=c', '--pytest-mark-inventory', 'x', '--pytest-mark7', 'name=d'])
+
+
+def test_isolated_ignores_numbered_keys(flake8dir):
+    """Verify that '--isolated' ignores the configuration files like it does for every other option."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_example_py(example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--isolated'])
+    assert [line.split(' ', 2)[1] for line in result.out_lines] == ['M401']
+
+
+def test_numbered_keys_from_local_config(tmpdir):
+    """Verify that numbered keys are found like flake8 finds its configuration when '--config' is not given."""
+
+    # Setup
+    tmpdir.join('tox.ini').write('[flake8]\npytest_mark7 = name=test_id\n                value_match=uuid\n')
+    options = optparse.Values({'config': None, 'isolated': False, 'append_config': [], 'pytest_marks': ''})
+
+    # Test
+    with tmpdir.as_cwd():
+        assert {'pytest_mark7': {'name': 'test_id', 'value_match': 'uuid'}} == config.load_marks(options)
+
+
+def test_parse_mark_definitions():
+    """Verify that unknown parameters and definitions without parameters are dropped."""
+
+    # Test
+    assert [{'name': 'a', 'allow_duplicate': 'true'}, {'name': 'b'}] == \
+        config.parse_mark_definitions('name=a,allow_duplicate=true,bogus=1 name=b,, ,')
+
+
+def test_numbered_keys_from_flake8_discovery(mocker):
+    """Verify that numbered keys are read from the configuration found by 'load_config' where flake8 provides it."""
+
+    # Setup
+    parser = config.configparser.RawConfigParser()
+    parser.read_string(u'[flake8]\npytest_mark3 = name=test_id\n')
+    load_config = mocker.patch('flake8.options.config.load_config', create=True, return_value=(parser, '.'))
+    options = optparse.Values({'config': 'setup.cfg', 'isolated': False, 'append_config': ['extra.cfg']})
+
+    # Test
+    assert {3: 'name=test_id'} == config.read_legacy_marks(options)
+    load_config.assert_called_once_with('setup.cfg', ['extra.cfg'], isolated=False)
+
+
+def test_plugin_import_skips_flake8_config_discovery():
+    """Verify that importing the plugin does not import flake8's configuration discovery, which is not public API."""
+
+    # Test
+    out = subprocess.check_output([sys.executable, '-c', 'import sys, flake8_pytest_mark; '
+                                   'print("flake8.options.config" in sys.modules)'])
+    assert out.strip() == b'False'
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the Prometheus metrics export. (Driven by the 'pytest_mark_metrics' option.)"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import subprocess
+from flake8_pytest_mark import metrics
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M', '--pytest-mark-metrics', 'metrics.prom']
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def parse_samples(text):
+    """Map the samples of a Prometheus text file to their values."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_metrics(flake8dir):
+    """Verify that counts, violations, unique values and the file duration histogram are written."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true
+    """)
+    flake8dir.make_py_files(
+        example1="""
+            @pytest.mark.test_id('one')
+            def test_one():
+                pass
+
+            def test_two():
+                pass
+        """,
+        example2="""
+            @pytest.mark.test_id('two')
+            def test_three():
+                pass
+        """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    text = flake8dir.tmpdir.join('metrics.prom').read()
+    samples = parse_samples(text)
+    assert 1 == len(result.out_lines)
+    assert '# TYPE flake8_pytest_mark_file_duration_seconds histogram' in text.splitlines()
+    assert 2 == samples['flake8_pytest_mark_files_total']
+    assert 3 == samples['flake8_pytest_mark_test_definitions_total']
+    assert 1 == samples['flake8_pytest_mark_violations_total{family="m5xx",mark="test_id"}']
+    assert 2 == samples['flake8_pytest_mark_unique_values{mark="test_id"}']
+    assert 2 == samples['flake8_pytest_mark_file_duration_seconds_bucket{le="+Inf"}']
+    assert 2 == samples['flake8_pytest_mark_file_duration_seconds_count']
+    assert not flake8dir.tmpdir.join('metrics.prom.tmp').exists()
+
+
+def test_metrics_baseline_hits(flake8dir):
+    """Verify that violations suppressed by a baseline are counted as baseline hits and not as violations."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark_baseline = baseline.txt
+    """)
+    flake8dir.make_example_py("""
+        def test_one():
+            pass
+    """)
+    flake8dir.run_flake8(['--pytest-mark-update-baseline'])
+    flake8dir.make_example_py("""
+        def test_one():
+            pass
+
+        def test_two():
+            pass
+    """)
+
+    # Test
+    flake8dir.run_flake8(extra_args)
+    samples = parse_samples(flake8dir.tmpdir.join('metrics.prom').read())
+    assert 2 == samples['flake8_pytest_mark_baseline_lookups_total']
+    assert 1 == samples['flake8_pytest_mark_baseline_hits_total']
+    assert 0.5 == samples['flake8_pytest_mark_baseline_hit_ratio']
+    assert 1 == samples['flake8_pytest_mark_violations_total{family="m5xx",mark="test_id"}']
+
+
+def test_metrics_seeded_unique_values(flake8dir):
+    """Verify that the values seeded by changed files mode are counted once, however many workers check files."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true
+    """)
+    flake8dir.make_py_files(
+        committed="""
+            @pytest.mark.test_id('committed')
+            def test_committed():
+                pass
+        """)
+    for args in (['init', '-q'], ['add', '.'], ['commit', '-q', '-m', 'base']):
+        subprocess.check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + args,
+                              cwd=str(flake8dir.tmpdir), stdout=subprocess.PIPE)
+    # Enough changed files for both workers to check some of them.
+    flake8dir.make_py_files(**{'example{}'.format(n): """
+        @pytest.mark.test_id('{}')
+        def test_changed():
+            pass
+    """.format(n) for n in range(8)})
+
+    # Test
+    for jobs in ('1', '2'):
+        flake8dir.run_flake8(extra_args + ['--pytest-mark-changed-since', 'HEAD', '--jobs', jobs])
+        samples = parse_samples(flake8dir.tmpdir.join('metrics.prom').read())
+        assert 9 == samples['flake8_pytest_mark_unique_values{mark="test_id"}']
+
+
+def test_metrics_writer_counts_seeded_values_once():
+    """Verify that the seeded values are added once to the values claimed by every worker process."""
+
+    # Setup
+    writer = metrics.MetricsWriter('metrics.prom', {'test_id': 3})
+    record = {'seconds': 0.0, 'nodes': {}, 'rules': {}, 'reported': {}, 'baseline': {}}
+
+    # Test
+    writer.add(dict(record, pid=1, unique_values={'test_id': 1}))
+    writer.add(dict(record, pid=2, unique_values={'test_id': 2, 'jira': 1}))
+    samples = parse_samples(u''.join(writer.lines()))
+    assert 6 == samples['flake8_pytest_mark_unique_values{mark="test_id"}']
+    assert 1 == samples['flake8_pytest_mark_unique_values{mark="jira"}']
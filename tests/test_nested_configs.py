@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for resolving the marks of sub directories from their own configurations."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+from flake8_pytest_mark import hierarchy
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+example = """
+    def test_example():
+        pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_sub_projects_override_their_parent(flake8dir):
+    """Verify that sub directories inherit, replace, remove and add marks."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark_nested_configs = true
+        pytest_mark1 = name=test_id
+        pytest_mark2 = name=jira
+    """)
+    flake8dir.make_file('test_root.py', example)
+    flake8dir.make_file('billing/tox.ini', """
+        [flake8]
+        pytest_mark1 = name=case_id
+        pytest_mark2 =
+        pytest_marks = name=owner
+    """)
+    flake8dir.make_file('billing/tests/test_billing.py', example)
+    flake8dir.make_file('search/test_search.py', example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./test_root.py:1:1: M501 test definition not marked with test_id',
+                                 './test_root.py:1:1: M502 test definition not marked with jira',
+                                 './billing/tests/test_billing.py:1:1: M501 test definition not marked with case_id',
+                                 './billing/tests/test_billing.py:1:1: M502 test definition not marked with owner',
+                                 './search/test_search.py:1:1: M501 test definition not marked with test_id',
+                                 './search/test_search.py:1:1: M502 test definition not marked with jira'],
+                                result.out_lines)
+
+
+def test_sub_directories_ignored_by_default(flake8dir):
+    """Verify that the configurations of sub directories are only read when enabled."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_file('billing/setup.cfg', """
+        [flake8]
+        pytest_mark1 = name=case_id
+    """)
+    flake8dir.make_file('billing/test_billing.py', example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert result.out_lines == ['./billing/test_billing.py:1:1: M501 test definition not marked with test_id']
+
+
+def test_invalid_sub_project(flake8dir):
+    """Verify that an invalid configuration is reported for the files of its directory only."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark_nested_configs = true
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_file('billing/pyproject.toml', """
+        [tool.flake8-pytest-mark]
+        unknown = 1
+    """)
+    flake8dir.make_file('billing/test_billing.py', example)
+    flake8dir.make_file('test_root.py', example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 2
+    assert './test_root.py:1:1: M501 test definition not marked with test_id' in result.out_lines
+    assert [line for line in result.out_lines if line.startswith('./billing/test_billing.py:0:1: M405 invalid')]
+
+
+def test_unique_values_are_tracked_per_mark(flake8dir):
+    """Verify that sub projects configuring the same rule slot for different marks do not share unique values."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark_nested_configs = true
+        pytest_mark1 = name=test_id,enforce_unique_value=true
+    """)
+    flake8dir.make_file('b/setup.cfg', """
+        [flake8]
+        pytest_mark1 = name=case_id,enforce_unique_value=true
+    """)
+    flake8dir.make_file('a/test_a.py', """
+        @pytest.mark.test_id('1')
+        def test_a():
+            pass
+    """)
+    flake8dir.make_file('b/test_b.py', """
+        @pytest.mark.case_id('1')
+        def test_b():
+            pass
+    """)
+    flake8dir.make_file('b/test_c.py', """
+        @pytest.mark.case_id('2')
+        def test_c():
+            pass
+    """)
+    flake8dir.make_file('c/test_d.py', """
+        @pytest.mark.test_id('1')
+        def test_d():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--jobs', '1'])
+    assert len(result.out_lines) == 1
+    assert "M301 @pytest.mark.test_id value is not unique! The '1' mark value already specified" in result.out_lines[0]
+    assert result.out_lines[0].split(':')[0] in ('./a/test_a.py', './c/test_d.py')
+
+
+def test_plans_are_cached_per_directory(tmpdir):
+    """Verify that plans are resolved once per directory and shared by directories without a configuration."""
+
+    # Setup
+    tmpdir.join('a', 'setup.cfg').write('[flake8]\npytest_mark1 = name=case_id,include=unit\n', ensure=True)
+    tmpdir.join('a', 'b', 'c').ensure_dir()
+    configs = hierarchy.ConfigHierarchy({'pytest_mark1': {'name': 'test_id'}}, root=str(tmpdir))
+
+    # Test
+    plan = configs.plan_for(str(tmpdir.join('a', 'b', 'c', 'test_x.py')))
+    assert plan.marks == {'pytest_mark1': {'name': 'case_id', 'include': ['a/unit']}}
+    assert configs.plan_for(str(tmpdir.join('a', 'b', 'test_y.py'))) is plan
+    assert configs.plan_for(str(tmpdir.join('a', 'test_z.py'))) is plan
+    assert configs.plan_for(str(tmpdir.join('test_root.py'))) is configs.root_plan
+    assert plan.matcher.marks_for(str(tmpdir.join('a', 'unit', 'test_u.py'))) == plan.marks
+    assert plan.matcher.marks_for(str(tmpdir.join('a', 'b', 'test_y.py'))) == {}
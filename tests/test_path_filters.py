@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for restricting marks to the files matching their 'include' and 'exclude' path globs."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+from flake8_pytest_mark import config, path_filters
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+example = """
+    def test_example():
+        pass
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_include_and_exclude(flake8dir):
+    """Verify that a mark is only checked in the files it is included in and not excluded from."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+        pytest_mark2 = name=jira,include=integration,include=smoke/test_*.py,exclude=integration/legacy/**
+    """)
+    for path in ('unit/test_a.py', 'integration/api/test_b.py', 'integration/legacy/test_c.py', 'smoke/test_d.py',
+                 'smoke/helpers.py'):
+        flake8dir.make_file(path, example)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(['./unit/test_a.py:1:1: M501 test definition not marked with test_id',
+                                 './integration/api/test_b.py:1:1: M501 test definition not marked with test_id',
+                                 './integration/api/test_b.py:1:1: M502 test definition not marked with jira',
+                                 './integration/legacy/test_c.py:1:1: M501 test definition not marked with test_id',
+                                 './smoke/test_d.py:1:1: M501 test definition not marked with test_id',
+                                 './smoke/test_d.py:1:1: M502 test definition not marked with jira',
+                                 './smoke/helpers.py:1:1: M501 test definition not marked with test_id'],
+                                result.out_lines)
+
+
+def test_excluded_files_do_not_claim_unique_values(flake8dir):
+    """Verify that the values found in files a mark does not apply to are not checked for uniqueness."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true,exclude=vendor/
+    """)
+    marked = """
+        @pytest.mark.test_id('same')
+        def test_example():
+            pass
+    """
+    flake8dir.make_file('test_a.py', marked)
+    flake8dir.make_file('vendor/test_b.py', marked)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert result.out_lines == []
+
+
+@pytest.mark.parametrize('glob, path, expected', [
+    ('integration', 'integration/api/test_a.py', True),
+    ('integration/', 'integration_tests/test_a.py', False),
+    ('*/test_a.py', 'unit/test_a.py', True),
+    ('*/test_a.py', 'unit/deep/test_a.py', False),
+    ('**/test_a.py', 'unit/deep/test_a.py', True),
+    ('**/test_a.py', 'test_a.py', True),
+    ('unit/**/test_?.py', 'unit/test_a.py', True),
+    ('unit/**/test_?.py', 'unit/x/y/test_ab.py', False),
+    ('unit/test_[ab].py', 'unit/test_b.py', True),
+    ('unit/test_[!ab].py', 'unit/test_b.py', False),
+    ('./unit/*', 'unit/test_a.py', True),
+])
+def test_glob_semantics(glob, path, expected, tmpdir):
+    """Verify how path globs match files relative to the root."""
+
+    # Setup
+    matcher = path_filters.PathMatcher({'pytest_mark1': {'name': 'test_id', 'include': [glob]}}, str(tmpdir))
+
+    # Test
+    assert bool(matcher.marks_for(str(tmpdir.join(path)))) is expected
+
+
+def test_trie_only_yields_candidates_on_the_path():
+    """Verify that globs stored under other directories are never evaluated for a file."""
+
+    # Setup
+    trie = path_filters.PathTrie()
+    for glob in ('a/b/*.py', 'a/c/*.py', '**/x.py', 'd'):
+        prefix, regex = path_filters.compile_glob(glob)
+        trie.add(prefix, glob)
+
+    # Test
+    assert sorted(trie.candidates(['a', 'b', 'test_x.py'])) == ['**/x.py', 'a/b/*.py']
+    assert sorted(trie.candidates(['d', 'test_x.py'])) == ['**/x.py', 'd']
+
+
+def test_structured_globs():
+    """Verify that TOML marks accept a glob or an array of globs and reject anything else."""
+
+    # Test
+    compiled = config.compile_marks({'marks': [{'name': 'test_id', 'include': 'unit', 'exclude': ['a', 'b']}]}, 'x')
+    assert compiled == [[None, {'name': 'test_id', 'include': ['unit'], 'exclude': ['a', 'b']}]]
+    with pytest.raises(config.ConfigError) as e:
+        config.compile_marks({'marks': [{'name': 'test_id', 'include': [1]}]}, 'x')
+    assert 'include must be a path glob or an array of path globs' in str(e.value)
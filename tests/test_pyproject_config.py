@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the structured '[tool.flake8-pytest-mark]' configuration and its cache."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import os
+import pytest
+from flake8_pytest_mark import config
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+pytestmark = pytest.mark.skipif(config.load_toml_parser() is None, reason='no TOML parser installed')
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(autouse=True)
+def cache_home(tmpdir, monkeypatch):
+    """Keep the parsed configuration cache out of the home directory."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    return tmpdir.join('cache', 'flake8-pytest-mark')
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_pyproject_marks(flake8dir):
+    """Verify that typed marks are read from pyproject.toml, including regexes with commas and spaces."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_file('pyproject.toml', """
+        [[tool.flake8-pytest-mark.marks]]
+        name = "jira"
+        value_regex = '^JIRA-\\d{1,5}( , JIRA-\\d+)*$'
+        allow_multiple_args = true
+
+        [[tool.flake8-pytest-mark.marks]]
+        name = "owner"
+        number = 10
+        exclude_functions = true
+    """)
+    flake8dir.make_example_py("""
+        @pytest.mark.test_id('1')
+        @pytest.mark.jira('JIRA-1 , JIRA-2', 'JIRA 3')
+        def test_example():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    pytest.helpers.assert_lines(["./example.py:1:1: M611 the mark values '['JIRA 3']' do not match the configuration "
+                                 "specified by pytest_mark11, Configured regex: '^JIRA-\\d{1,5}( , JIRA-\\d+)*$'"],
+                                result.out_lines)
+
+
+def test_invalid_configuration(flake8dir):
+    """Verify that invalid values are reported once per file instead of being silently ignored."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+    """)
+    flake8dir.make_file('pyproject.toml', """
+        [[tool.flake8-pytest-mark.marks]]
+        name = "test_id"
+        allow_duplicate = "yes"
+    """)
+    flake8dir.make_example_py("""
+        def test_example():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert 1 == len(result.out_lines)
+    assert result.out_lines[0].startswith('./example.py:0:1: M405 invalid configuration: ')
+    assert result.out_lines[0].endswith('pyproject.toml: marks[0]: allow_duplicate must be true or false')
+
+
+def test_dedicated_file(flake8dir):
+    """Verify that a dedicated file may hold the marks at its top level."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark_config = marks.toml
+    """)
+    flake8dir.make_file('marks.toml', """
+        [[marks]]
+        name = "test_id"
+    """)
+    flake8dir.make_example_py("""
+        def test_example():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert ['./example.py:1:1: M501 test definition not marked with test_id'] == result.out_lines
+
+
+def test_number_collision(tmpdir):
+    """Verify that explicit numbers may not be reused."""
+
+    # Setup
+    path = tmpdir.join('marks.toml')
+    path.write('[[marks]]\nname = "a"\nnumber = 2\n\n[[marks]]\nname = "b"\nnumber = 2\n')
+
+    # Test
+    with pytest.raises(config.ConfigError, match='mark numbers must be unique'):
+        config.load_structured_marks(str(path))
+
+
+def test_cache(tmpdir, cache_home, mocker):
+    """Verify that an unchanged file is served from the cache and a changed one is parsed again."""
+
+    # Setup
+    path = tmpdir.join('pyproject.toml')
+    path.write('[[tool.flake8-pytest-mark.marks]]\nname = "test_id"\nenforce_unique_value = true\n')
+    expected = [[None, {'name': 'test_id', 'enforce_unique_value': 'true'}]]
+
+    # Test
+    assert expected == config.load_structured_marks(str(path))
+    assert 1 == len(cache_home.listdir())
+    read_table = mocker.patch('flake8_pytest_mark.config._read_table', side_effect=AssertionError('parsed again'))
+    assert expected == config.load_structured_marks(str(path))
+
+    path.write('[[tool.flake8-pytest-mark.marks]]\nname = "jira"\n')
+    os.utime(str(path), (1, 1))
+    read_table.side_effect = None
+    read_table.return_value = {'marks': [{'name': 'jira'}]}
+    assert [[None, {'name': 'jira'}]] == config.load_structured_marks(str(path))
+    assert 1 == read_table.call_count
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the structured violation report. (Driven by the 'pytest_mark_report' and 'pytest_mark_report_format'
+options.)
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+import json
+from flake8_pytest_mark import report
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+config = """
+[flake8]
+pytest_mark1 = name=test_id,enforce_unique_value=true
+pytest_mark2 = name=jira,value_regex=^JIRA-\\d+$
+"""
+first = """
+@pytest.mark.jira('JIRA-1')
+@pytest.mark.test_id('shared')
+def test_first():
+    pass
+"""
+second = """
+@pytest.mark.jira('bad')
+@pytest.mark.test_id('shared')
+def test_second():
+    pass
+"""
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def read_records(flake8dir, name):
+    """Read the records of a JSON lines report, sorted by code."""
+    with io.open(str(flake8dir.tmpdir.join(name)), encoding='utf-8') as f:
+        return sorted((json.loads(line) for line in f), key=lambda record: (record['code'], record['path']))
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_json_report(flake8dir):
+    """Verify that every reported violation is written with its mark, its values and the tests it collides with."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('test_a.py', first)
+    flake8dir.make_file('test_b.py', second)
+    flake8dir.make_file('test_c.py', 'def test_unmarked():\n    pass\n')
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--jobs', '1', '--pytest-mark-report', 'report.jsonl'])
+    records = read_records(flake8dir, 'report.jsonl')
+    assert len(records) == len(result.out_lines) == 4
+    unique = records[0]
+    assert unique['code'] == 'M301'
+    assert unique['family'] == 'M3'
+    assert unique['mark'] == 'test_id'
+    assert (unique['line'], unique['column']) == (1, 1)
+    assert unique['values'] == ['shared']
+    # Either file may be checked first.
+    claimed = {'./test_a.py': 'test_first', './test_b.py': 'test_second'}
+    other = [path for path in claimed if path != unique['path']][0]
+    assert unique['related'] == [{'value': 'shared', 'name': claimed[other], 'path': other, 'line': 1}]
+    assert unique['message'].startswith('@pytest.mark.test_id value is not unique!')
+    assert [(r['code'], r['mark'], r['path'], r['values'], r['related']) for r in records[1:]] == [
+        ('M501', 'test_id', './test_c.py', [], []),
+        ('M502', 'jira', './test_c.py', [], []),
+        ('M602', 'jira', './test_b.py', ['bad'], [])]
+
+
+def test_run_violations_are_reported(flake8dir):
+    """Verify that violations that do not belong to a mark are reported too."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark_report = report.jsonl
+    """)
+    flake8dir.make_example_py('def test_example():\n    pass\n')
+
+    # Test
+    flake8dir.run_flake8(extra_args)
+    records = read_records(flake8dir, 'report.jsonl')
+    assert [(r['code'], r['family'], r['mark'], r['line']) for r in records] == [('M401', 'M4', None, 0)]
+
+
+def test_suppressed_violations_are_not_reported(flake8dir):
+    """Verify that violations flake8 does not print, because of '# noqa' comments or ignored codes, are left out."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('test_a.py', """
+        def test_one():  # noqa
+            pass
+
+
+        def test_two():  # noqa: M502
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-report', 'report.jsonl'])
+    records = read_records(flake8dir, 'report.jsonl')
+    assert [(r['code'], r['line']) for r in records] == [('M501', 5)]
+    assert len(result.out_lines) == 1
+
+    result = flake8dir.run_flake8(extra_args + ['--ignore', 'M501', '--pytest-mark-report', 'report.jsonl'])
+    assert result.out_lines == []
+    assert read_records(flake8dir, 'report.jsonl') == []
+
+
+def test_per_file_ignores_are_not_reported(flake8dir):
+    """Verify that violations ignored for a file by 'per-file-ignores' are left out."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config + 'per-file-ignores = test_b.py: M6\n')
+    flake8dir.make_file('test_b.py', second)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-report', 'report.jsonl'])
+    assert result.out_lines == []
+    assert read_records(flake8dir, 'report.jsonl') == []
+
+
+def test_sarif_report(flake8dir):
+    """Verify that the SARIF log is valid JSON holding a result per violation, with related locations for M3XX."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('test_a.py', first)
+    flake8dir.make_file('test_b.py', second)
+
+    # Test
+    flake8dir.run_flake8(extra_args + ['--jobs', '1', '--pytest-mark-report', 'report.sarif',
+                                       '--pytest-mark-report-format', 'sarif'])
+    with io.open(str(flake8dir.tmpdir.join('report.sarif')), encoding='utf-8') as f:
+        log = json.load(f)
+    assert log['version'] == '2.1.0'
+    run = log['runs'][0]
+    assert run['tool']['driver']['name'] == 'flake8-pytest-mark'
+    results = sorted(run['results'], key=lambda result: result['ruleId'])
+    assert [result['ruleId'] for result in results] == ['M301', 'M602']
+    unique = results[0]
+    claimed = {'test_a.py': 'test_first', 'test_b.py': 'test_second'}
+    location = unique['locations'][0]['physicalLocation']
+    other = [path for path in claimed if path != location['artifactLocation']['uri']][0]
+    assert location['region'] == {'startLine': 1, 'startColumn': 1}
+    assert unique['relatedLocations'] == [{'id': 1,
+                                           'message': {'text': "'shared' is already used by " + claimed[other]},
+                                           'physicalLocation': {'artifactLocation': {'uri': other},
+                                                                'region': {'startLine': 1}}}]
+    assert unique['properties'] == {'family': 'M3', 'category': 'unique value', 'mark': 'test_id',
+                                    'values': ['shared']}
+
+
+def test_empty_sarif_report(tmpdir):
+    """Verify that a SARIF log without results is valid."""
+
+    # Setup
+    path = tmpdir.join('report.sarif')
+
+    # Test
+    report.ReportWriter(str(path), 'sarif', '1.0.0').close()
+    assert json.loads(path.read())['runs'][0]['results'] == []
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for refusing to reuse the unique values listed in a retired value registry."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import subprocess
+import sys
+import pytest
+from flake8_pytest_mark import allowlist, registry
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+config = """
+[flake8]
+pytest_mark1 = name=test_id,enforce_unique_value=true,retired_values_file=retired.txt
+"""
+
+
+# ======================================================================================================================
+# Fixtures
+# ======================================================================================================================
+@pytest.fixture(autouse=True)
+def cache_home(tmpdir, monkeypatch):
+    """Keep the Bloom filters out of the home directory."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmpdir.join('cache')))
+    return tmpdir.join('cache', 'flake8-pytest-mark')
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def git(flake8dir, *args):
+    """Run a git command inside the flake8dir."""
+    cmd = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + list(args)
+    subprocess.check_call(cmd, cwd=str(flake8dir.tmpdir), stdout=subprocess.PIPE)
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_retired_values_are_not_reused(flake8dir):
+    """Verify that a value listed in the registry is reported even though no other test uses it."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('retired.txt', 'old-1\nold-2\n')
+    flake8dir.make_example_py("""
+        @pytest.mark.test_id('old-2')
+        def test_restored():
+            pass
+
+        @pytest.mark.test_id('new-1')
+        def test_new():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    expected = ["./example.py:1:1: M301 @pytest.mark.test_id value is not unique! The 'old-2' mark value was retired "
+                "in 'retired.txt' and may not be reused!"]
+    pytest.helpers.assert_lines(expected, result.out_lines)
+
+
+def test_missing_registry(flake8dir):
+    """Verify that a registry that cannot be read is reported."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py("""
+        @pytest.mark.test_id('new-1')
+        def test_new():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 1
+    assert "M301 @pytest.mark.test_id value is not unique! Retired values file 'retired.txt' could not be read" in \
+        result.out_lines[0]
+
+
+def test_bloom_filter():
+    """Verify that a filter never misses a value it holds, rarely holds others and survives a round trip."""
+
+    # Setup
+    bloom = registry.BloomFilter.for_capacity(1000)
+    for i in range(1000):
+        bloom.add('ID-{}'.format(i))
+
+    # Test
+    assert all('ID-{}'.format(i) in bloom for i in range(1000))
+    assert sum('other-{}'.format(i) in bloom for i in range(10000)) < 300
+
+
+def test_sorted_registry_is_searched_in_place(tmpdir, cache_home):
+    """Verify that the filter of a registry is built once and that a sorted registry needs no copy."""
+
+    # Setup
+    path = tmpdir.join('retired.txt')
+    assert registry.append_values(str(path), ['b', 'a', 'c', 'a', ' ']) == 3
+    assert path.read() == 'a\nb\nc\n'
+
+    # Test
+    retired = registry.load_registry(str(path))
+    assert retired.sorted_path == str(path)
+    assert [value in retired for value in ('a', 'b', 'c', 'd', '')] == [True, True, True, False, False]
+    assert sorted(f.basename[-6:] for f in cache_home.listdir()) == ['.bloom']
+
+    reloaded = registry.load_registry(str(path))
+    assert reloaded.bloom.bits == retired.bloom.bits
+    assert 'b' in reloaded
+
+
+def test_unsorted_registry_is_copied(tmpdir, cache_home, mocker):
+    """Verify that a registry edited by hand is searched through a sorted copy, built with its filter."""
+
+    # Setup
+    path = tmpdir.join('retired.txt')
+    path.write('# imported\nzz\r\nyy\n\nxx')
+    read_registry = mocker.spy(registry, '_read_registry')
+
+    # Test
+    retired = registry.load_registry(str(path))
+    assert retired.sorted_path.endswith(registry.SORTED_SUFFIX)
+    assert all(value in retired for value in ('xx', 'yy', 'zz'))
+    assert '# imported' not in retired
+    assert registry.load_registry(str(path)).sorted_path == retired.sorted_path
+    assert read_registry.call_count == 1
+
+
+def test_append_to_unsorted_registry(tmpdir):
+    """Verify that appending to a registry edited by hand sorts it and only counts values that were not retired."""
+
+    # Setup
+    path = tmpdir.join('retired.txt')
+    path.write('zz\nxx\n')
+
+    # Test
+    assert registry.append_values(str(path), ['xx', u'ñ', 'aa\n']) == 2
+    assert path.read_binary() == u'aa\nxx\nzz\nñ\n'.encode('utf-8')
+
+
+def test_unwritable_cache_falls_back_to_memory(tmpdir):
+    """Verify that a registry is held in memory when its filter cannot be cached."""
+
+    # Setup
+    path = tmpdir.join('retired.txt')
+    path.write('b\na\n')
+    blocker = tmpdir.join('blocker')
+    blocker.write('')
+
+    # Test
+    retired = registry.load_registry(str(path), str(blocker.join('cache')))
+    assert isinstance(retired, allowlist.SetIndex)
+    assert 'a' in retired and 'c' not in retired
+
+
+def test_retire_values_since_ref(flake8dir):
+    """Verify that the values removed since a git ref are added to the registry by 'retire-values'."""
+
+    # Setup
+    flake8dir.make_py_files(
+        test_a="""
+            @pytest.mark.test_id('kept')
+            def test_kept():
+                pass
+
+            @pytest.mark.test_id('deleted')
+            def test_deleted():
+                pass
+        """)
+    git(flake8dir, 'init', '-q')
+    git(flake8dir, 'add', '.')
+    git(flake8dir, 'commit', '-q', '-m', 'base')
+    git(flake8dir, 'tag', 'base')
+    flake8dir.make_py_files(
+        test_a="""
+            @pytest.mark.test_id('kept')
+            def test_kept():
+                pass
+        """)
+    git(flake8dir, 'commit', '-q', '-am', 'delete a test')
+    flake8dir.make_file('imported.txt', 'legacy-1\nlegacy-2\n')
+
+    # Test
+    output = subprocess.check_output([sys.executable, '-m', 'flake8_pytest_mark.cli', 'retire-values', 'retired.txt',
+                                      '--mark', 'test_id', '--since', 'base', '--values', 'imported.txt'],
+                                     cwd=str(flake8dir.tmpdir))
+    assert output.decode('utf-8').strip() == '3 values retired in retired.txt'
+    assert flake8dir.tmpdir.join('retired.txt').read() == 'deleted\nlegacy-1\nlegacy-2\n'
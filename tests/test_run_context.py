@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for checking files concurrently in one process with explicit run contexts."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import subprocess
+import sys
+import threading
+from benchmarks import corpus
+from flake8_pytest_mark import executor, rules
+from flake8_pytest_mark.run_context import RunContext
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+UNIQUE_MARK = {'pytest_mark1': {'name': 'test_id', 'enforce_unique_value': 'true'}}
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_concurrent_registration_claims_each_value_once():
+    """Verify that exactly one of many threads registering the same values claims each of them."""
+
+    # Setup
+    store = rules.UniqueValueStore()
+    claimed = []
+    barrier = threading.Event()
+
+    def register(thread):
+        barrier.wait()
+        for value in range(500):
+            if store.register('pytest_mark1', str(value), rules._ValueInfo(thread, value, 'a.py')) is None:
+                claimed.append(value)
+
+    threads = [threading.Thread(target=register, args=('t{}'.format(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Test
+    barrier.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(500))
+    assert store.counts() == {'pytest_mark1': 500}
+
+
+def test_thread_pool_matches_serial_check(tmpdir):
+    """Verify that a thread pool reports the same violations as checking the files one by one."""
+
+    # Setup
+    generator = corpus.CorpusGenerator(tests=10, invalid=0.1, duplicate=0.2, seed=3)
+    corpus.write_corpus(str(tmpdir), 40, generator)
+    paths = list(corpus.iter_corpus_files(str(tmpdir)))
+    rule_conf = {'name': corpus.MARK_NAME, 'value_regex': corpus.VALUE_REGEX, 'enforce_unique_value': 'true'}
+
+    # Test
+    serial = executor.check_files(paths, RunContext({'pytest_mark1': rule_conf}))
+    threaded = executor.check_files(paths, RunContext({'pytest_mark1': rule_conf}), threads=4)
+    # Which of two files holding the same value reports the duplicate depends on scheduling, the totals do not.
+    codes = sorted(message[:4] for violations in serial.values() for _, _, message in violations)
+    assert codes.count('M301') == generator.summary_counts['duplicate']
+    assert codes == sorted(message[:4] for violations in threaded.values() for _, _, message in violations)
+
+
+def test_independent_runs_do_not_share_state(tmpdir):
+    """Verify that runs with their own contexts neither share configuration nor claimed values."""
+
+    # Setup
+    path = tmpdir.join('test_a.py')
+    path.write("@pytest.mark.test_id('a')\ndef test_a():\n    pass\n")
+    first = RunContext(UNIQUE_MARK)
+    second = RunContext({'pytest_mark7': {'name': 'jira'}})
+
+    # Test
+    assert executor.check_file(str(path), first) == []
+    assert executor.check_file(str(path), second) == [(1, 0, 'M507 test definition not marked with jira')]
+    assert executor.check_file(str(path), RunContext(UNIQUE_MARK)) == []
+    assert executor.check_file(str(path), first)[0][2].startswith('M301 @pytest.mark.test_id value is not unique!')
+
+
+def test_unreadable_files(tmpdir):
+    """Verify that files that cannot be parsed are reported like flake8 does."""
+
+    # Setup
+    path = tmpdir.join('test_a.py')
+    path.write('def test_a(:\n')
+
+    # Test
+    violations = executor.check_file(str(path), RunContext(UNIQUE_MARK))
+    assert [(line, message[:4]) for line, _, message in violations] == [(1, 'E999')]
+    assert executor.check_file(str(tmpdir.join('missing.py')), RunContext(UNIQUE_MARK))[0][2].startswith('E902')
+
+
+def test_value_file_caches_are_created_when_needed():
+    """Verify that the allowlist and registry modules are only imported once a run needs their caches."""
+
+    # Setup
+    probe = ('import sys; from flake8_pytest_mark import MarkChecker, run_context; context = run_context.RunContext(); '
+             'loaded = lambda: sorted(name for name in ("flake8_pytest_mark.allowlist", "flake8_pytest_mark.registry") '
+             'if name in sys.modules); before = loaded(); context.retired_values; print(before, loaded())')
+
+    # Test
+    out = subprocess.check_output([sys.executable, '-c', probe])
+    assert out.decode('utf-8').strip() == "[] ['flake8_pytest_mark.allowlist', 'flake8_pytest_mark.registry']"
+
+
+def test_value_file_caches_belong_to_the_run():
+    """Verify that each run creates its own value file caches once."""
+
+    # Setup
+    first, second = RunContext(), RunContext()
+
+    # Test
+    assert first.allowlists is first.allowlists
+    assert first.allowlists is not second.allowlists
+    assert first.retired_values is not second.retired_values
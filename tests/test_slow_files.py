@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the slow file watchdog. (Driven by the 'pytest_mark_slow_*' options.)"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import io
+from flake8_pytest_mark import rules
+from flake8_pytest_mark.watchdog import FileWatchdog, SlowestFilesReport
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M', '--pytest-mark-slowest-files', '2']
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_slowest_files_report(flake8dir):
+    """Verify that only the requested number of files is reported, slowest first."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_py_files(
+        example1="""
+            class TestExample(object):
+                def test_method(self):
+                    pass
+        """,
+        example2="""
+            def test_function():
+                pass
+        """,
+        example3="""
+            VALUE = 1
+        """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    report = result.out_lines[result.out_lines.index('slowest 2 files checked by flake8-pytest-mark:') + 1:]
+    seconds = [float(line.split('s ', 1)[0]) for line in report]
+    assert 2 == len(report)
+    assert sorted(seconds, reverse=True) == seconds
+    assert all('dominant rule m' in line or 'no test definitions' in line for line in report)
+
+
+def test_watchdog_thresholds():
+    """Verify that the file, test definition and dominant rule are named once a threshold is exceeded."""
+
+    # Setup
+    stream = io.StringIO()
+    watchdog = FileWatchdog('./example.py', file_threshold=0.5, node_threshold=0.1, stream=stream)
+
+    # Test
+    watchdog.add_rule(rules.rule_m5xx, 'test_id', 0.05)
+    watchdog.add_rule(rules.rule_m6xx, 'test_id', 0.15)
+    watchdog.end_node('TestExample.test_method', 5, 0.2)
+    watchdog.add_rule(rules.rule_m5xx, 'test_id', 0.01)
+    watchdog.end_node('test_function', 9, 0.01)
+    record = watchdog.finish()
+    assert 'm6xx[test_id]' == record['rule']
+    assert [0.2, 'TestExample.test_method', 5, 'm6xx[test_id]'] == record['node']
+    assert ['flake8-pytest-mark: slow test definition ./example.py:5 TestExample.test_method took 0.200s '
+            '(dominant rule m6xx[test_id])'] == stream.getvalue().splitlines()
+
+
+def test_slowest_files_report_keeps_top_files():
+    """Verify that the report only keeps the slowest files."""
+
+    # Setup
+    stream = io.StringIO()
+    report = SlowestFilesReport(2, stream=stream)
+
+    # Test
+    for i, seconds in enumerate((0.3, 0.1, 0.5, 0.2)):
+        report.add({'path': './example{}.py'.format(i), 'seconds': seconds, 'rule': None, 'node': None})
+    report.report()
+    assert ['slowest 2 files checked by flake8-pytest-mark:',
+            '     0.500s ./example2.py (no test definitions)',
+            '     0.300s ./example0.py (no test definitions)'] == stream.getvalue().splitlines()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for mark coverage statistics. (Driven by the 'pytest_mark_statistics' and 'pytest_mark_statistics_format'
+options.)
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import json
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+
+config = """
+[flake8]
+pytest_mark1 = name=test_id,value_match=uuid
+pytest_mark2 = name=jira,exclude_classes=true
+"""
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_statistics_json(flake8dir):
+    """Verify that marked, unmarked and invalid test definitions are counted per mark for every directory prefix."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_file('unit/test_unit.py', """
+        @pytest.mark.test_id('b360c12d-0d47-4cfc-9f9e-5d86c315b1e4')
+        def test_marked():
+            pass
+
+        @pytest.mark.test_id('not a uuid')
+        @pytest.mark.jira('ASC-1')
+        def test_invalid():
+            pass
+    """)
+    flake8dir.make_file('unit/deep/test_deep.py', """
+        class TestUnmarked(object):
+            def test_method(self):
+                pass
+    """)
+
+    # Expectations
+    exp_directories = {
+        '.': {'test_id': {'marked': 1, 'unmarked': 2, 'invalid': 1},
+              'jira': {'marked': 1, 'unmarked': 2, 'invalid': 0}},
+        'unit': {'test_id': {'marked': 1, 'unmarked': 2, 'invalid': 1},
+                 'jira': {'marked': 1, 'unmarked': 2, 'invalid': 0}},
+        'unit/deep': {'test_id': {'marked': 0, 'unmarked': 2, 'invalid': 0},
+                      'jira': {'marked': 0, 'unmarked': 1, 'invalid': 0}},
+    }
+
+    # Test
+    flake8dir.run_flake8(extra_args + ['--pytest-mark-statistics', 'stats.json',
+                                       '--pytest-mark-statistics-format', 'json'])
+    assert {'directories': exp_directories} == json.loads(flake8dir.tmpdir.join('stats.json').read())
+
+
+def test_statistics_table(flake8dir):
+    """Verify that the statistics table is printed after the violations."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py("""
+        @pytest.mark.test_id('b360c12d-0d47-4cfc-9f9e-5d86c315b1e4')
+        def test_marked():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-statistics', '-'])
+    assert ['./example.py:1:1: M502 test definition not marked with jira'] == result.out_lines[:1]
+    assert ['directory', 'mark', 'marked', 'unmarked', 'invalid', 'coverage'] == result.out_lines[1].split()
+    assert ['.', 'jira', '0', '1', '0', '0.0%'] == result.out_lines[2].split()
+    assert ['.', 'test_id', '1', '0', '0', '100.0%'] == result.out_lines[3].split()
+
+
+def test_statistics_stopped_by_budget(flake8dir):
+    """Verify that the statistics are marked as partial when a budget stopped checking files."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config + 'pytest_mark_max_violations_per_file = 1\n')
+    flake8dir.make_example_py("""
+        def test_one():
+            pass
+
+        def test_two():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-statistics', 'stats.json',
+                                                '--pytest-mark-statistics-format', 'json'])
+    assert {'M402': 1} == json.loads(flake8dir.tmpdir.join('stats.json').read())['stopped']
+    result = flake8dir.run_flake8(extra_args + ['--pytest-mark-statistics', '-'])
+    assert 'partial: M402 stopped checking 1 file(s) early' == result.out_lines[-1]
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""Worst case inputs with upper bounds on time and memory. Time is checked by growing an input fourfold and requiring
+the duration to grow roughly linearly, so quadratic behaviour fails here instead of stalling a CI job. Wall clock
+bounds depend on the load of the machine, so they only run with PYTEST_MARK_TIMING=1 ('make bench-stress').
+"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import os
+import time
+import pytest
+from flake8_pytest_mark import MarkChecker, rules
+from flake8_pytest_mark.run_context import RunContext
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+GROWTH = 4              # how much larger the large input is
+MAX_TIME_RATIO = 8      # linear growth gives 4, quadratic growth gives 16
+MAX_SECONDS = 10        # absolute bound for the large input
+UUID = '6f0b8e52-4c1f-4a8e-9c6b-2a7c1e5d3f90'
+timing = pytest.mark.skipif(not os.environ.get('PYTEST_MARK_TIMING'),
+                            reason='wall clock bounds only run with PYTEST_MARK_TIMING=1 (make bench-stress)')
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def configure(**rule_conf):
+    """Configure a single 'test_id' mark for in process checking.
+
+    Args:
+        rule_conf (dict): Additional options of the mark.
+    """
+    rule_conf['name'] = 'test_id'
+    MarkChecker.context = RunContext({'pytest_mark1': rule_conf})
+
+
+def check(tree):
+    """Check a module in process.
+
+    Args:
+        tree (ast.Module): The module.
+
+    Returns:
+        list: The violations.
+    """
+    MarkChecker.context.unique_values.clear()
+    return list(MarkChecker(tree, './stress.py').run())
+
+
+def assert_linear(func, size):
+    """Assert that a function does not slow down faster than its input grows.
+
+    Args:
+        func (callable): Called with the size of the input. Any preparation not to be timed must be done before.
+        size (int): The size of the small input.
+    """
+    def best(n):
+        durations = []
+        for _ in range(3):
+            start = time.time()
+            func(n)
+            durations.append(time.time() - start)
+        return max(min(durations), 0.001)
+
+    small = best(size)
+    large = best(size * GROWTH)
+    assert large < MAX_SECONDS
+    assert large / small < MAX_TIME_RATIO, 'x{} input took x{:.1f} time ({:.3f}s -> {:.3f}s)'.format(
+        GROWTH, large / small, small, large)
+
+
+def timed_check(build, size):
+    """Build the small and large trees ahead of time so that only the checker is measured.
+
+    Args:
+        build (callable): Builds a tree of a given size.
+        size (int): The size of the small tree.
+
+    Returns:
+        callable: Checks the tree of the requested size.
+    """
+    trees = {n: build(n) for n in (size, size * GROWTH)}
+    return lambda n: check(trees[n])
+
+
+def stacked_decorators(count):
+    """A test with many decorators, the checked mark being the last one."""
+    decorators = ''.join("@pytest.mark.tag{}('value')\n".format(i) for i in range(count))
+    return ast.parse("{}@pytest.mark.test_id('{}')\ndef test_stacked():\n    pass\n".format(decorators, UUID))
+
+
+def many_args(count, value=None):
+    """A test with a mark called with many arguments, all distinct unless a value is given. The arguments are added to
+    the tree directly since Python < 3.7 refuses to compile calls with more than 255 arguments.
+    """
+    tree = ast.parse("@pytest.mark.test_id()\ndef test_args():\n    pass\n")
+    tree.body[0].decorator_list[0].args = [ast.Str(s=value or '{:08x}-0000-0000-0000-000000000000'.format(i))
+                                           for i in range(count)]
+    return tree
+
+
+def huge_class(count):
+    """A test class with many methods."""
+    methods = ''.join("    @pytest.mark.test_id('{:08x}-0000-0000-0000-000000000000')\n    def test_{}(self):\n"
+                      "        pass\n".format(i, i) for i in range(count))
+    return ast.parse("@pytest.mark.test_id('{}')\nclass TestHuge(object):\n{}".format(UUID, methods))
+
+
+def duplicate_tests(count):
+    """Many tests sharing the same value."""
+    return ast.parse(''.join("@pytest.mark.test_id('{}')\ndef test_{}():\n    pass\n".format(UUID, i)
+                             for i in range(count)))
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_stacked_decorators():
+    """Verify that hundreds of stacked decorators are checked."""
+
+    # Setup
+    configure(enforce_unique_value='true', value_match='uuid')
+
+    # Test
+    assert [] == check(stacked_decorators(500))
+
+
+@timing
+def test_stacked_decorators_are_linear():
+    """Verify that hundreds of stacked decorators are checked in linear time."""
+
+    # Setup
+    configure(enforce_unique_value='true', value_match='uuid')
+
+    # Test
+    assert_linear(timed_check(stacked_decorators, 500), 500)
+
+
+def test_many_args():
+    """Verify that marks with thousands of arguments are checked."""
+
+    # Setup
+    configure(enforce_unique_value='true', allow_multiple_args='true', value_match='uuid')
+
+    # Test
+    assert [] == check(many_args(2000))
+
+
+@timing
+def test_many_args_are_linear():
+    """Verify that marks with thousands of arguments are checked in linear time."""
+
+    # Setup
+    configure(enforce_unique_value='true', allow_multiple_args='true', value_match='uuid')
+
+    # Test
+    assert_linear(timed_check(many_args, 2000), 2000)
+
+
+def test_many_duplicate_args():
+    """Verify that the M3xx message of thousands of duplicate arguments lists every duplicate."""
+
+    # Setup
+    configure(enforce_unique_value='true', allow_multiple_args='true')
+    size = 2000
+
+    # Test
+    errors = check(many_args(size, UUID))
+    assert 1 == len(errors)
+    assert size - 1 == errors[0][2].count('already specified')
+
+
+@timing
+def test_many_duplicate_args_are_linear():
+    """Verify that the M3xx message of thousands of duplicate arguments is built in linear time."""
+
+    # Setup
+    configure(enforce_unique_value='true', allow_multiple_args='true')
+
+    # Test
+    assert_linear(timed_check(lambda n: many_args(n, UUID), 2000), 2000)
+
+
+def test_duplicate_tests():
+    """Verify that M3xx is reported on every test sharing a value."""
+
+    # Setup
+    configure(enforce_unique_value='true')
+    size = 500
+
+    # Test
+    assert size - 1 == len([e for e in check(duplicate_tests(size)) if e[2].startswith('M301')])
+
+
+@timing
+def test_duplicate_tests_are_linear():
+    """Verify that reporting M3xx on every test stays linear."""
+
+    # Setup
+    configure(enforce_unique_value='true')
+
+    # Test
+    assert_linear(timed_check(duplicate_tests, 500), 500)
+
+
+def test_huge_class():
+    """Verify that a class with thousands of test methods is checked."""
+
+    # Setup
+    configure(enforce_unique_value='true', value_match='uuid')
+
+    # Test
+    assert [] == check(huge_class(500))
+
+
+@timing
+def test_huge_class_is_linear():
+    """Verify that a class with thousands of test methods is checked in linear time."""
+
+    # Setup
+    configure(enforce_unique_value='true', value_match='uuid')
+
+    # Test
+    assert_linear(timed_check(huge_class, 500), 500)
+
+
+def test_reduce_and_get_args():
+    """Verify that the decorator helpers find the mark and every argument."""
+
+    # Test
+    assert 1 == len(rules._reduce_decorators_by_mark(stacked_decorators(2000).body[0].decorator_list, 'test_id'))
+    assert 5000 == len(rules._get_decorator_args(many_args(5000).body[0].decorator_list[0]))
+
+
+@timing
+def test_reduce_and_get_args_are_linear():
+    """Verify that the decorator helpers are linear in the number of decorators and arguments."""
+
+    # Setup
+    decorators = {n: stacked_decorators(n).body[0].decorator_list for n in (2000, 2000 * GROWTH)}
+    calls = {n: many_args(n).body[0].decorator_list[0] for n in (5000, 5000 * GROWTH)}
+
+    # Test
+    assert_linear(lambda n: rules._reduce_decorators_by_mark(decorators[n], 'test_id'), 2000)
+    assert_linear(lambda n: rules._get_decorator_args(calls[n]), 5000)
+
+
+def test_megabyte_values():
+    """Verify that megabyte long values are neither copied over and over nor slow to check."""
+
+    # Setup
+    tracemalloc = pytest.importorskip('tracemalloc')
+    configure(enforce_unique_value='true', value_regex='[a-f0-9]{8}-')
+    size = 2 ** 20
+    source = "@pytest.mark.test_id('{}')\ndef test_big():\n    pass\n".format('x' * size)
+    duplicated = source + source.replace('test_big', 'test_big_again')
+    tree = ast.parse(duplicated)
+
+    # Test
+    tracemalloc.start()
+    errors = check(tree)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert ['M601', 'M301', 'M601'] == [e[2][:4] for e in errors]
+    assert peak < 8 * size     # the M3xx and M6xx messages hold a few copies of the value
+
+
+@timing
+def test_megabyte_values_are_fast():
+    """Verify that megabyte long values are checked in well under a second."""
+
+    # Setup
+    configure(enforce_unique_value='true', value_regex='[a-f0-9]{8}-')
+    source = "@pytest.mark.test_id('{}')\ndef test_big():\n    pass\n".format('x' * 2 ** 20)
+    tree = ast.parse(source + source.replace('test_big', 'test_big_again'))
+
+    # Test
+    start = time.time()
+    check(tree)
+    assert time.time() - start < 1
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for resolving marks applied through imported names and aliases."""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import ast
+import textwrap
+import pytest
+from flake8_pytest_mark.symbols import SymbolTable
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+config = """
+    [flake8]
+    pytest_mark1 = name=test_id,value_match=uuid
+"""
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def decorator_marks(source):
+    """Resolve the decorators of the last definition of a module.
+
+    Args:
+        source (str): The source of the module.
+
+    Returns:
+        list: The mark of every decorator, None for the decorators that are not marks.
+    """
+    tree = ast.parse(textwrap.dedent(source))
+    symbols = SymbolTable(tree)
+    return [symbols.resolve(decorator) for decorator in tree.body[-1].decorator_list]
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+@pytest.mark.parametrize('source', [
+    """
+    from pytest import mark
+    @mark.test_id('0a4bd1b5-0e1c-4f3b-9c4f-3d2b1e1b6a01')
+    def test_example():
+        pass
+    """,
+    """
+    import pytest as pt
+    @pt.mark.test_id('0a4bd1b5-0e1c-4f3b-9c4f-3d2b1e1b6a01')
+    def test_example():
+        pass
+    """,
+    """
+    import pytest
+    test_id = pytest.mark.test_id
+    @test_id('0a4bd1b5-0e1c-4f3b-9c4f-3d2b1e1b6a01')
+    def test_example():
+        pass
+    """,
+    """
+    from pytest import mark as m
+    try:
+        tid = m.test_id
+    except AttributeError:
+        raise
+    @tid('0a4bd1b5-0e1c-4f3b-9c4f-3d2b1e1b6a01')
+    def test_example():
+        pass
+    """,
+])
+def test_aliases_are_resolved(source, flake8dir):
+    """Verify that marks applied through imported names and aliases satisfy the rules."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py(source)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert result.out_lines == []
+
+
+def test_aliased_values_are_validated(flake8dir):
+    """Verify that values applied through an alias are validated like any other."""
+
+    # Setup
+    flake8dir.make_setup_cfg(config)
+    flake8dir.make_example_py("""
+        from pytest import mark
+        @mark.test_id('not a uuid')
+        def test_example():
+            pass
+    """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 1
+    assert result.out_lines[0].startswith("./example.py:2:1: M601 the mark values '['not a uuid']' do not match")
+
+
+def test_resolution():
+    """Verify which decorator shapes resolve to a mark."""
+
+    # Test
+    assert decorator_marks("""
+        import pytest as pt
+        from pytest import mark
+        m = mark
+        jira = m.jira
+        @pt.mark.a('x')
+        @pytest.mark.b('x')
+        @mark.c('x')
+        @m.d
+        @jira('x')
+        @other.e('x')
+        @unknown('x')
+        @staticmethod
+        def test_example():
+            pass
+    """) == ['a', 'b', 'c', 'd', 'jira', None, None, None]
+
+
+def test_rebinding_forgets_aliases():
+    """Verify that a name rebound to something else no longer resolves to a mark."""
+
+    # Test
+    assert decorator_marks("""
+        from pytest import mark
+        tid = mark.test_id
+        tid = object()
+        mark = object()
+        @tid('x')
+        @mark.test_id('x')
+        def test_example():
+            pass
+    """) == [None, None]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the Chrome trace event export. (Driven by the 'pytest_mark_trace' option.)"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import json
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M', '--pytest-mark-trace', 'trace.json']
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+def test_trace_events(flake8dir):
+    """Verify that spans are written for every file, test definition and rule evaluation."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id
+    """)
+    flake8dir.make_py_files(
+        example1="""
+            class TestExample(object):
+                def test_method(self):
+                    pass
+        """,
+        example2="""
+            def test_function():
+                pass
+        """)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    trace = json.loads(flake8dir.tmpdir.join('trace.json').read())
+    events = trace['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert 3 == len(result.out_lines)
+    assert ['process_name'] == [event['name'] for event in events if event['ph'] == 'M']
+    assert ['./example1.py', './example2.py'] == sorted(e['name'] for e in spans if e['cat'] == 'file')
+    assert ['TestExample', 'TestExample.test_method', 'test_function'] == \
+        sorted(e['name'] for e in spans if e['cat'] == 'node')
+    assert 3 == len([e for e in spans if e['name'] == 'm5xx[test_id]'])
+    assert 18 == len([e for e in spans if e['cat'] == 'rule'])
+    assert all(e['dur'] >= 0 for e in spans)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for partitioning the values of unique marks by scope. (Driven by the 'unique_scope' option)"""
+
+# ======================================================================================================================
+# Imports
+# ======================================================================================================================
+import pytest
+from flake8_pytest_mark import config, executor, rules, scopes
+from flake8_pytest_mark.run_context import RunContext
+
+# ======================================================================================================================
+# Globals
+# ======================================================================================================================
+# args to only use checks that raise an 'M' prefixed error
+extra_args = ['--select', 'M']
+shared = """
+@pytest.mark.test_id('shared')
+def test_shared():
+    pass
+"""
+LAYOUT = {'pkg/__init__.py': '',
+          'pkg/sub/__init__.py': '',
+          'pkg/test_a.py': shared,
+          'pkg/sub/test_b.py': shared,
+          'other/test_c.py': shared,
+          'other/test_d.py': shared}
+
+
+# ======================================================================================================================
+# Helpers
+# ======================================================================================================================
+def make_layout(root):
+    """Create two packages holding the same value in every test file.
+
+    Returns:
+        list: str('path') the test files.
+    """
+    for name, source in sorted(LAYOUT.items()):
+        root.join(name).write(source.lstrip('\n'), ensure=True)
+    return [str(root.join(name)) for name in sorted(LAYOUT) if 'test_' in name]
+
+
+def unique_context(scope):
+    """Create a run context with a unique 'test_id' mark of a scope."""
+    return RunContext({'pytest_mark1': {'name': 'test_id', 'enforce_unique_value': 'true', 'unique_scope': scope}})
+
+
+# ======================================================================================================================
+# Tests
+# ======================================================================================================================
+@pytest.mark.parametrize('scope, expected', [('global', 3), ('package', 2), ('directory', 1), ('file', 0)])
+def test_duplicates_per_scope(flake8dir, scope, expected):
+    """Verify that a value is only required to be unique among the files sharing its scope."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true,unique_scope={}
+    """.format(scope))
+    make_layout(flake8dir.tmpdir)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args + ['--jobs', '1'])
+    assert len(result.out_lines) == expected
+    assert all('M301' in line for line in result.out_lines)
+
+
+def test_duplicates_within_a_file(flake8dir):
+    """Verify that a file scope still reports a value used twice in the same file."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true,unique_scope=file
+    """)
+    flake8dir.make_example_py(shared + '\n' + shared.replace('test_shared', 'test_again'))
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    assert len(result.out_lines) == 1
+    assert "M301 @pytest.mark.test_id value is not unique! The 'shared' mark value already specified for the " \
+        "'test_shared' test" in result.out_lines[0]
+
+
+def test_unknown_scope(flake8dir):
+    """Verify that an unknown scope in a flake8 config is reported by the rule."""
+
+    # Setup
+    flake8dir.make_setup_cfg("""
+        [flake8]
+        pytest_mark1 = name=test_id,enforce_unique_value=true,unique_scope=module
+    """)
+    flake8dir.make_example_py(shared)
+
+    # Test
+    result = flake8dir.run_flake8(extra_args)
+    expected = ["./example.py:1:1: M301 @pytest.mark.test_id value is not unique! Unique scope 'module' is not one of "
+                "global, package, directory, file!"]
+    pytest.helpers.assert_lines(expected, result.out_lines)
+
+
+def test_unknown_scope_in_pyproject():
+    """Verify that an unknown scope in a [tool.flake8-pytest-mark] table is a configuration error."""
+
+    # Setup
+    table = {'marks': [{'name': 'test_id', 'unique_scope': 'module'}]}
+
+    # Test
+    with pytest.raises(config.ConfigError, match='unique_scope must be one of global, package, directory, file'):
+        config.compile_marks(table, 'pyproject.toml')
+
+
+def test_package_root(tmpdir):
+    """Verify that files of nested packages share the top level package and other files their directory."""
+
+    # Setup
+    paths = make_layout(tmpdir)
+
+    # Test
+    assert [scopes.scope_key('package', path) for path in paths] == \
+        [str(tmpdir.join('other'))] * 2 + [str(tmpdir.join('pkg'))] * 2
+    assert scopes.scope_key('global', paths[0]) is None
+    assert scopes.coarsest(['file', 'global', 'directory']) == 'directory'
+    assert scopes.coarsest(['global']) is None
+
+
+def test_partitions_are_released(tmpdir, mocker):
+    """Verify that the executor checks a scope at a time and releases its values once its files are checked."""
+
+    # Setup
+    paths = make_layout(tmpdir)
+    context = unique_context('package')
+    release = mocker.spy(context.unique_values, 'release')
+
+    # Test
+    for threads in (1, 2):
+        results = executor.check_files(paths, context, threads=threads)
+        assert sorted(message[:4] for violations in results.values() for _, _, message in violations) == \
+            ['M301', 'M301']
+        assert context.unique_values.counts() == {}
+    assert sorted(call[0][1] for call in release.call_args_list) == sorted([str(tmpdir.join('other')),
+                                                                            str(tmpdir.join('pkg'))] * 2)
+
+
+def test_store_partitions():
+    """Verify that partitions only collide with themselves and are counted with the global values of their rule."""
+
+    # Setup
+    store = rules.UniqueValueStore()
+    info = rules._ValueInfo('test_a', 1, 'a.py')
+
+    # Test
+    assert store.register('pytest_mark1', 'v', info) is None
+    assert store.register('pytest_mark1', 'v', info, 'pkg') is None
+    assert store.register('pytest_mark1', 'v', info, 'other') is None
+    assert store.register('pytest_mark1', 'v', None, 'pkg') == info
+    assert store.counts() == {'pytest_mark1': 3}
+    assert store.release('pytest_mark1', 'pkg') == 1
+    assert store.release('pytest_mark1', 'pkg') == 0
+    assert store.counts() == {'pytest_mark1': 2}
+    assert store.register('pytest_mark1', 'w', info, 'other') is None
+    assert store.claimed('pytest_mark1') == {'v', 'w'}
+    assert store.claimed('pytest_mark2') == set()